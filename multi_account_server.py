@@ -296,7 +296,7 @@ def receive_messages():
         for msg in messages:
             messages_data.append({
                 "message_id": msg.message_id,
-                "account_id": getattr(msg, 'account_id', 'unknown'),
+                "account_id": msg.account_id or 'unknown',
                 "contact_id": msg.contact_id,
                 "contact_name": msg.contact_name,
                 "content": msg.content,
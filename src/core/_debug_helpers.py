@@ -0,0 +1,227 @@
+"""消息处理器的调试辅助模块。
+
+包含只在排查页面结构时使用的诊断代码，由 MessageHandler 在调用时按需导入，
+不参与消息收发的常规导入路径。
+"""
+
+from src.core.message_handler import _UNKNOWN_FRAME, MessageHandler
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 调试用：列出当前文档的全部iframe，返回 [{id, src, element}]
+_DEBUG_IFRAMES_JS = """
+return Array.prototype.map.call(document.getElementsByTagName('iframe'), function (frame) {
+    return {id: frame.id, src: frame.getAttribute('src'), element: frame};
+});
+"""
+
+# 调试用：arguments = [最多返回的数量]，返回 [会话项总数, 前N个会话项的 {id, name, desc}]
+_DEBUG_CONVERSATIONS_JS = """
+var items = document.getElementsByClassName('conversation-item');
+var result = Array.prototype.slice.call(items, 0, arguments[0]).map(function (item) {
+    var name = item.querySelector('.name'), desc = item.querySelector('.desc');
+    return {
+        id: item.id,
+        name: name ? name.innerText.trim() : null,
+        desc: desc ? desc.innerText.trim().slice(0, 30) : null
+    };
+});
+return [items.length, result];
+"""
+
+# 调试用：arguments = [列表容器的候选选择器, 最多返回的子元素数量]
+# 返回第一个匹配的容器信息 {count, descendantCount, children}，都没有匹配时返回null
+_DEBUG_LIST_JS = """
+var selectors = arguments[0], limit = arguments[1];
+var dataNames = ['data-id', 'data-user-id', 'data-contact-id', 'data-userid', 'data-nick'];
+for (var i = 0; i < selectors.length; i++) {
+    var lists;
+    try {
+        lists = document.querySelectorAll(selectors[i]);
+    } catch (e) {
+        continue;
+    }
+    if (!lists.length) {
+        continue;
+    }
+    var descendants = lists[0].querySelectorAll('*');
+    return {
+        count: lists.length,
+        descendantCount: descendants.length,
+        children: Array.prototype.slice.call(descendants, 0, limit).map(function (child) {
+            return {
+                tag: child.tagName.toLowerCase(),
+                cls: child.getAttribute('class'),
+                id: child.id,
+                text: child.innerText ? child.innerText.trim().slice(0, 50) : '',
+                dataAttrs: dataNames.filter(function (name) {
+                    return child.getAttribute(name);
+                }).map(function (name) {
+                    return name + '=' + child.getAttribute(name);
+                })
+            };
+        })
+    };
+}
+return null;
+"""
+
+# 调试用：arguments = [最多返回的数量]，返回 [候选元素总数, 前N个 input/textarea/可编辑元素的属性]
+_DEBUG_INPUTS_JS = """
+var elements = document.querySelectorAll("input, textarea, [contenteditable='true']");
+var result = Array.prototype.slice.call(elements, 0, arguments[0]).map(function (el) {
+    var rect = el.getBoundingClientRect();
+    return {
+        tag: el.tagName.toLowerCase(),
+        type: el.getAttribute('type'),
+        cls: el.getAttribute('class'),
+        placeholder: el.getAttribute('placeholder'),
+        editable: el.getAttribute('contenteditable'),
+        visible: rect.width > 0 && rect.height > 0,
+        disabled: !!el.disabled
+    };
+});
+return [elements.length, result];
+"""
+
+
+def debug_contact_list(handler: MessageHandler) -> None:
+    """打印当前页面的联系人列表结构。
+    
+    用于帮助开发者了解实际的DOM结构，以便调整选择器。
+    
+    Args:
+        handler: 消息处理器实例
+    """
+    try:
+        logger.info("=== 开始调试联系人列表结构 ===")
+
+        # 等待页面加载
+        logger.info("等待页面加载...")
+        handler.browser.wait_for_page_ready(timeout=2)
+
+        # 检查是否有iframe（一次脚本调用取回全部iframe的属性）
+        logger.info("\n检查页面iframe结构:")
+        try:
+            iframes = handler.browser.execute_pinned_script(_DEBUG_IFRAMES_JS)
+            logger.info(f"找到 {len(iframes)} 个iframe")
+
+            for i, iframe in enumerate(iframes):
+                iframe_src = iframe["src"] or "无src"
+                iframe_id = iframe["id"] or "无ID"
+                logger.info(f"  [{i + 1}] iframe: id={iframe_id}, src={iframe_src[:100]}")
+
+                # 如果是旺旺聊天的iframe，切换进去
+                if "1688" in iframe_src and "im" in iframe_src.lower():
+                    logger.info(f"  ✓ 找到旺旺聊天iframe，尝试切换...")
+                    try:
+                        handler._current_frame = _UNKNOWN_FRAME
+                        handler.browser.driver.switch_to.frame(iframe["element"])
+                        logger.info("  ✓ 成功切换到iframe")
+                        break
+                    except Exception as e:
+                        logger.warning(f"  ✗ 切换iframe失败: {str(e)}")
+                        continue
+        except Exception as e:
+            logger.debug(f"检查iframe失败: {str(e)}")
+
+        # 首先尝试查找旺旺特定的.conversation-item元素
+        logger.info("\n检查旺旺会话列表 (.conversation-item):")
+        try:
+            # 等待元素出现，最多等待10秒
+            logger.info("  等待联系人列表加载...")
+            handler.browser.wait_for_presence(".conversation-item", timeout=10)
+            item_count, items = handler.browser.execute_pinned_script(_DEBUG_CONVERSATIONS_JS, 5)
+
+            if item_count:
+                logger.info(f"✓ 找到 {item_count} 个会话项 (.conversation-item)")
+
+                # 打印前5个会话项的详细信息
+                for i, item in enumerate(items):
+                    name_text = item["name"] if item["name"] is not None else "未找到.name元素"
+                    desc_text = item["desc"] if item["desc"] is not None else "无描述"
+
+                    logger.info(f"\n  [{i + 1}] 会话项:")
+                    logger.info(f"      ID: {item['id'] or '无ID'}")
+                    logger.info(f"      联系人名称: {name_text}")
+                    logger.info(f"      最后消息: {desc_text}")
+
+                logger.info("\n" + "=" * 60)
+                # 切换回主文档
+                handler._switch_frame(None)
+                return  # 找到了旺旺结构，直接返回
+            else:
+                logger.info("未找到.conversation-item元素")
+        except Exception as e:
+            logger.debug(f"查找.conversation-item失败: {str(e)}")
+
+        # 如果没有找到旺旺特定结构，尝试通用的联系人列表选择器
+        logger.info("\n检查通用联系人列表结构:")
+        list_selectors = [
+            ".contact-list",
+            ".user-list",
+            ".session-list",
+            "[class*='contact-list']",
+            "[class*='user-list']",
+            "[class*='session-list']",
+            "[class*='conversation']",
+            "ul[class*='list']",
+        ]
+
+        try:
+            list_info = handler.browser.execute_pinned_script(_DEBUG_LIST_JS, list_selectors, 5)
+            if list_info is not None:
+                logger.info(f"\n✓ 找到列表容器 (数量: {list_info['count']})")
+                logger.info(f"  列表包含 {list_info['descendantCount']} 个子元素")
+
+                # 打印前5个子元素的信息
+                for i, child in enumerate(list_info["children"]):
+                    logger.info(f"\n  [{i + 1}] <{child['tag']}>")
+                    logger.info(f"      class: {child['cls'] or '无class'}")
+                    logger.info(f"      id: {child['id'] or '无ID'}")
+                    logger.info(f"      text: {child['text'] or '无文本'}")
+                    if child["dataAttrs"]:
+                        logger.info(f"      data属性: {', '.join(child['dataAttrs'])}")
+        except Exception as e:
+            logger.debug(f"查找联系人列表容器失败: {str(e)}")
+
+        logger.info("\n" + "=" * 60)
+        logger.info("联系人列表结构调试完成")
+        logger.info("=" * 60)
+
+        # 切换回主文档
+        try:
+            handler._switch_frame(None)
+        except Exception:
+            pass
+
+    except Exception as e:
+        logger.error(f"调试联系人列表时出错: {str(e)}")
+        # 确保切换回主文档
+        try:
+            handler._switch_frame(None)
+        except Exception:
+            pass
+
+
+def debug_dump_inputs(handler: MessageHandler, limit: int = 20) -> None:
+    """打印当前frame中全部输入类元素的属性，用于排查找不到消息输入框的原因。
+    
+    所有属性在页面内一次读取。
+    
+    Args:
+        handler: 消息处理器实例
+        limit: 最多打印的元素数量，默认20
+    """
+    try:
+        total, inputs = handler.browser.execute_pinned_script(_DEBUG_INPUTS_JS, limit)
+        logger.debug(f"=== 当前frame的输入类元素（共 {total} 个，显示前 {len(inputs)} 个） ===")
+        for idx, info in enumerate(inputs):
+            logger.debug(
+                f"  元素[{idx}]: tag={info['tag']}, type={info['type']}, class={info['cls']}, "
+                f"placeholder={info['placeholder']}, contenteditable={info['editable']}, "
+                f"visible={info['visible']}, disabled={info['disabled']}"
+            )
+    except Exception as e:
+        logger.debug(f"列出输入类元素失败: {str(e)}")
@@ -3,6 +3,7 @@
 每个账号在独立进程中运行，负责该账号的消息收发。
 """
 
+import queue
 import time
 import multiprocessing as mp
 from datetime import datetime
@@ -36,7 +37,7 @@ def account_worker_process(
         user_data_dir: 浏览器用户数据目录
         headless: 是否使用无头模式
         send_queue: 发送消息队列
-        receive_queue: 接收消息队列
+        receive_queue: 接收消息队列，每个元素是一轮检查得到的消息列表
         control_queue: 控制命令队列
         status_queue: 状态报告队列
     """
@@ -130,13 +131,13 @@ def account_worker_process(
                         for msg in new_messages:
                             # 添加账号信息
                             msg.account_id = account_id
-                            
-                            # 放入接收队列
-                            try:
-                                receive_queue.put_nowait(msg)
-                                message_count += 1
-                            except:
-                                logger.error("接收队列已满，消息被丢弃")
+                        
+                        # 整批放入接收队列，一次序列化和管道写入
+                        try:
+                            receive_queue.put_nowait(new_messages)
+                            message_count += len(new_messages)
+                        except queue.Full:
+                            logger.error(f"接收队列已满，{len(new_messages)} 条消息被丢弃")
                 except Exception as e:
                     logger.error(f"检查消息异常: {str(e)}")
                 
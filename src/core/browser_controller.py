@@ -3,9 +3,12 @@
 提供浏览器自动化控制功能，包括启动、关闭、导航、元素定位等操作。
 """
 
+import hashlib
+import json
 import pickle
+import re
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 from selenium import webdriver
 from selenium.common.exceptions import (
@@ -32,6 +35,122 @@ from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 登录页面（淘宝登录和1688登录）和1688错误页面（404）的URL特征，不区分大小写
+_LOGIN_URL_RE = re.compile(r"login\.taobao\.com|login\.1688\.com|/login", re.IGNORECASE)
+_ERROR_URL_RE = re.compile(r"page\.1688\.com/shtml/static/wrongpage\.html|wrongpage\.html|/wrongpage", re.IGNORECASE)
+
+# 在根节点下查找元素：简单选择器走 getElementsByClassName/getElementById/getElementsByTagName，
+# 其余选择器回退到 querySelectorAll
+_QUERY_FUNCTION_JS = r"""
+function query(root, selector) {
+    var match = /^([.#]?)([\w-]+)$/.exec(selector);
+    if (match && match[1] === '#' && root.getElementById) {
+        var found = root.getElementById(match[2]);
+        return found ? [found] : [];
+    }
+    if (match && match[1] === '.') {
+        return Array.prototype.slice.call(root.getElementsByClassName(match[2]));
+    }
+    if (match && match[1] === '') {
+        return Array.prototype.slice.call(root.getElementsByTagName(match[2]));
+    }
+    return Array.prototype.slice.call(root.querySelectorAll(selector));
+}
+"""
+
+# 按顺序尝试多个CSS选择器，返回第一个有匹配结果的选择器及其元素（单次往返完成）
+_FIND_FIRST_MATCHING_JS = _QUERY_FUNCTION_JS + """
+var selectors = arguments[0];
+for (var i = 0; i < selectors.length; i++) {
+    try {
+        var found = query(document, selectors[i]);
+        if (found.length) {
+            return [selectors[i], found];
+        }
+    } catch (e) {}
+}
+return [null, []];
+"""
+
+# 元素是否可见（近似 Selenium 的 is_displayed：有布局尺寸、未被 visibility/opacity 隐藏）
+_IS_VISIBLE_FUNCTION_JS = """
+function isVisible(el) {
+    if (!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)) {
+        return false;
+    }
+    var style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.opacity !== '0';
+}
+"""
+
+# 让元素获得焦点：arguments = [元素]
+_FOCUS_JS = "arguments[0].focus();"
+
+# 按顺序检查多个选择器（// 开头为XPath，其余为CSS），返回第一个存在可见元素的选择器
+_FIRST_VISIBLE_MATCH_JS = _QUERY_FUNCTION_JS + _IS_VISIBLE_FUNCTION_JS + """
+var selectors = arguments[0];
+for (var i = 0; i < selectors.length; i++) {
+    var found = [];
+    try {
+        if (selectors[i].indexOf('//') === 0) {
+            var snapshot = document.evaluate(
+                selectors[i], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (var j = 0; j < snapshot.snapshotLength; j++) {
+                found.push(snapshot.snapshotItem(j));
+            }
+        } else {
+            found = query(document, selectors[i]);
+        }
+    } catch (e) {
+        continue;
+    }
+    if (found.some(isVisible)) {
+        return selectors[i];
+    }
+}
+return null;
+"""
+
+
+# 等待选择器匹配的元素出现：arguments = [CSS选择器, 最长等待时间（毫秒）, 回调]
+# 由 MutationObserver 在DOM变化时检查，元素出现即回调true，超时回调false；
+# 每次DOM变化都会检查，简单选择器走 getElementsByClassName 等原生接口
+_WAIT_FOR_SELECTOR_JS = _QUERY_FUNCTION_JS + """
+var selector = arguments[0], done = arguments[arguments.length - 1];
+function present() {
+    try {
+        return query(document, selector).length > 0;
+    } catch (e) {
+        return document.querySelector(selector) !== null;
+    }
+}
+if (present()) {
+    done(true);
+    return;
+}
+var timer;
+var observer = new MutationObserver(function () {
+    if (present()) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(true);
+    }
+});
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+timer = setTimeout(function () {
+    observer.disconnect();
+    done(false);
+}, arguments[1]);
+"""
+# 读取当前文档的加载状态，complete 表示文档和子资源都已加载完成
+_READY_STATE_JS = "return document.readyState;"
+
+# 固定脚本在页面内以函数形式保存在该对象上，之后每次调用只需发送很短的调用桩
+_PINNED_SCRIPTS_OBJECT = "window.__autoimScripts"
+
+# 当前文档中还没有定义该固定脚本时（新文档、尚未执行过的iframe），调用桩返回的标记
+_PINNED_MISSING = "__autoim_pinned_missing__"
+
 
 class BrowserController:
     """浏览器控制器类。
@@ -54,9 +173,18 @@ class BrowserController:
         self.headless = headless
         self.user_data_dir = user_data_dir
         self.driver: Optional[webdriver.Chrome] = None
+        # 已固定的脚本，key为脚本源码，value为 (调用桩, 定义并调用的完整脚本)
+        self._pinned_scripts: Dict[str, Tuple[str, str]] = {}
+        # 当前设置的异步脚本超时（秒），相同时不再重复发送设置命令
+        self._script_timeout: Optional[float] = None
 
         logger.info(f"初始化浏览器控制器 - 无头模式: {headless}, 数据目录: {user_data_dir}")
 
+    @property
+    def supports_cdp(self) -> bool:
+        """当前驱动是否支持 Chrome DevTools Protocol 命令。"""
+        return self.driver is not None and hasattr(self.driver, "execute_cdp_cmd")
+
     def start(self) -> None:
         """启动Chrome浏览器。
         
@@ -120,6 +248,8 @@ class BrowserController:
                 logger.info("正在关闭浏览器...")
                 self.driver.quit()
                 self.driver = None
+                self._pinned_scripts.clear()
+                self._script_timeout = None
                 logger.info("浏览器已关闭")
             except Exception as e:
                 logger.error(f"关闭浏览器时发生错误: {str(e)}")
@@ -165,7 +295,7 @@ class BrowserController:
 
         try:
             by_type = By.CSS_SELECTOR if by == "css" else By.XPATH
-            logger.debug(f"查找元素: {selector} (方式: {by})")
+            logger.debug("查找元素: %s (方式: %s)", selector, by)
             element = self.driver.find_element(by_type, selector)
             return element
         except NoSuchElementException as e:
@@ -195,15 +325,351 @@ class BrowserController:
 
         try:
             by_type = By.CSS_SELECTOR if by == "css" else By.XPATH
-            logger.debug(f"查找多个元素: {selector} (方式: {by})")
+            logger.debug("查找多个元素: %s (方式: %s)", selector, by)
             elements = self.driver.find_elements(by_type, selector)
-            logger.debug(f"找到 {len(elements)} 个元素")
+            logger.debug("找到 %s 个元素", len(elements))
             return elements
         except Exception as e:
             error_msg = f"查找元素时发生错误: {str(e)}"
             logger.error(error_msg)
             raise BrowserException(error_msg) from e
 
+    def find_first_matching(self, selectors: Sequence[str]) -> Tuple[Optional[str], List[WebElement]]:
+        """按优先级查找元素，并返回命中的选择器。
+        
+        依次尝试多个CSS选择器，返回第一个有匹配结果的选择器及其对应的全部元素。
+        与逐个调用 find_elements 的语义相同，但整个过程只需一次 execute_script 往返。
+        
+        Args:
+            selectors: 按优先级排列的CSS选择器列表
+            
+        Returns:
+            (命中的选择器, 元素列表) 元组，如果所有选择器都没有匹配则返回 (None, [])
+            
+        Raises:
+            BrowserException: 当浏览器未启动或脚本执行失败时抛出
+        """
+        if not self.driver:
+            raise BrowserException("浏览器未启动，无法查找元素")
+
+        try:
+            selector, elements = self.execute_pinned_script(_FIND_FIRST_MATCHING_JS, list(selectors))
+            if selector:
+                logger.debug("选择器 '%s' 匹配到 %s 个元素", selector, len(elements))
+            return selector, elements
+        except Exception as e:
+            error_msg = f"查找元素时发生错误: {str(e)}"
+            logger.error(error_msg)
+            raise BrowserException(error_msg) from e
+
+    def find_first_visible(self, selectors: Sequence[str]) -> Optional[str]:
+        """检查是否存在可见元素，返回第一个命中的选择器。
+        
+        只在页面内判断，不返回元素本身，适合"是否存在"类的检测；
+        整个过程只需一次 execute_script 往返。
+        
+        Args:
+            selectors: 按优先级排列的选择器列表，以 // 开头的视为XPath，其余视为CSS
+            
+        Returns:
+            第一个匹配到可见元素的选择器，都没有则返回None
+            
+        Raises:
+            BrowserException: 当浏览器未启动或脚本执行失败时抛出
+        """
+        if not self.driver:
+            raise BrowserException("浏览器未启动，无法查找元素")
+
+        try:
+            return self.execute_pinned_script(_FIRST_VISIBLE_MATCH_JS, list(selectors))
+        except Exception as e:
+            error_msg = f"查找元素时发生错误: {str(e)}"
+            logger.error(error_msg)
+            raise BrowserException(error_msg) from e
+
+    def _pin_script(self, script: str) -> Tuple[str, str]:
+        """将脚本固定为页面内的函数，返回调用桩和完整脚本。
+        
+        Selenium 的 pin_script 只在客户端保存脚本，每次执行仍会发送完整源码；
+        这里改为在页面内定义一次函数，之后只发送几十字节的调用桩。
+        支持CDP时同时注册为新文档脚本，之后加载的文档（包括iframe）无需再补发定义。
+        
+        Args:
+            script: JavaScript脚本源码
+            
+        Returns:
+            (调用桩, 定义函数后调用的完整脚本)，页面内缺少定义时调用桩返回 _PINNED_MISSING
+        """
+        pinned = self._pinned_scripts.get(script)
+        if pinned is None:
+            key = hashlib.blake2b(script.encode("utf-8"), digest_size=8).hexdigest()
+            slot = f'{_PINNED_SCRIPTS_OBJECT}["{key}"]'
+            definition = (
+                f"{_PINNED_SCRIPTS_OBJECT} = {_PINNED_SCRIPTS_OBJECT} || {{}};\n"
+                f"{slot} = function () {{\n{script}\n}};"
+            )
+            stub = (
+                f"var pinned = {_PINNED_SCRIPTS_OBJECT} && {slot};\n"
+                f"return pinned ? pinned.apply(this, arguments) : '{_PINNED_MISSING}';"
+            )
+            pinned = (stub, f"{definition}\nreturn {slot}.apply(this, arguments);")
+            self._pinned_scripts[script] = pinned
+            if self.supports_cdp:
+                try:
+                    self.add_init_script(definition)
+                except WebDriverException as e:
+                    # 注册失败只影响新文档首次调用时多发送一次完整脚本
+                    logger.debug("注册固定脚本失败: %s", e)
+
+        return pinned
+
+    def execute_pinned_script(self, script: str, *args: Any) -> Any:
+        """执行固定（pin）过的JavaScript脚本。
+        
+        首次执行时在页面内定义脚本函数，之后只发送调用桩，
+        供轮询等高频路径反复调用同一段脚本。当前文档中没有该函数时补发完整脚本。
+        
+        Args:
+            script: JavaScript脚本源码
+            *args: 传递给脚本的参数（脚本内通过 arguments[i] 访问）
+            
+        Returns:
+            脚本的返回值
+            
+        Raises:
+            BrowserException: 当浏览器未启动时抛出
+        """
+        if not self.driver:
+            raise BrowserException("浏览器未启动，无法执行脚本")
+
+        stub, full_script = self._pin_script(script)
+        result = self.driver.execute_script(stub, *args)
+        if isinstance(result, str) and result == _PINNED_MISSING:
+            result = self.driver.execute_script(full_script, *args)
+        return result
+
+    def execute_async_script(self, script: str, *args: Any, timeout: float) -> Any:
+        """执行异步JavaScript脚本，脚本调用最后一个参数（回调函数）时返回。
+        
+        适合在页面内轮询等待条件成立：整个等待过程只需一次 WebDriver 往返。
+        
+        Args:
+            script: JavaScript脚本源码，通过 arguments[arguments.length - 1] 取得回调函数
+            *args: 传递给脚本的参数
+            timeout: 脚本最长执行时间（秒），脚本自身的等待时间应小于该值
+            
+        Returns:
+            脚本传给回调函数的值
+            
+        Raises:
+            BrowserException: 当浏览器未启动时抛出
+        """
+        if not self.driver:
+            raise BrowserException("浏览器未启动，无法执行脚本")
+
+        if self._script_timeout != timeout:
+            self.driver.set_script_timeout(timeout)
+            self._script_timeout = timeout
+
+        return self.driver.execute_async_script(script, *args)
+
+    def cdp_extract(self, script: str, *args: Any, await_promise: bool = False) -> Any:
+        """通过 CDP Runtime.evaluate 在顶层文档中执行脚本并按值返回结果。
+        
+        绕过 WebDriver 的 execute_script 命令封装，直接发送一条 CDP 消息，
+        适合只读取数据、参数和返回值都可JSON序列化的高频脚本。
+        脚本始终在顶层文档中执行，与 driver 当前切换到的 frame 无关；
+        参数不能包含 WebElement。驱动不支持 CDP 时回退到 execute_pinned_script。
+        
+        Args:
+            script: JavaScript脚本源码，写法与 execute_script 相同（通过 arguments[i] 访问参数）
+            *args: 传递给脚本的参数，必须可JSON序列化
+            await_promise: 脚本返回 Promise 时是否等待其完成并返回结果，默认False
+                （回退到 execute_script 时，按 WebDriver 规范总是会等待 Promise）
+            
+        Returns:
+            脚本的返回值
+            
+        Raises:
+            BrowserException: 当浏览器未启动或脚本执行出错时抛出
+        """
+        if not self.driver:
+            raise BrowserException("浏览器未启动，无法执行脚本")
+
+        execute_cdp_cmd = getattr(self.driver, "execute_cdp_cmd", None)
+        if execute_cdp_cmd is None:
+            return self.execute_pinned_script(script, *args)
+
+        # 与 execute_pinned_script 共用页面内的脚本函数，只在顶层文档缺少定义时发送完整脚本
+        stub, full_script = self._pin_script(script)
+        encoded_args = json.dumps(list(args))
+        result = self._evaluate(execute_cdp_cmd, stub, encoded_args, await_promise)
+        if isinstance(result, str) and result == _PINNED_MISSING:
+            result = self._evaluate(execute_cdp_cmd, full_script, encoded_args, await_promise)
+        return result
+
+    @staticmethod
+    def _evaluate(execute_cdp_cmd: Callable, body: str, encoded_args: str, await_promise: bool) -> Any:
+        """通过 Runtime.evaluate 执行函数体并按值返回结果。
+        
+        Args:
+            execute_cdp_cmd: 驱动的 execute_cdp_cmd 方法
+            body: 函数体源码（通过 arguments[i] 访问参数）
+            encoded_args: JSON编码的参数列表
+            await_promise: 是否等待返回的 Promise 完成
+            
+        Returns:
+            脚本的返回值
+            
+        Raises:
+            BrowserException: 当脚本执行出错时抛出
+        """
+        expression = f"(function () {{\n{body}\n}}).apply(null, {encoded_args})"
+        response = execute_cdp_cmd("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": True,
+            "awaitPromise": await_promise,
+        })
+        if "exceptionDetails" in response:
+            details = response["exceptionDetails"]
+            description = details.get("exception", {}).get("description") or details.get("text")
+            raise BrowserException(f"脚本执行出错: {description}")
+
+        return response["result"].get("value")
+
+    def add_init_script(self, source: str) -> bool:
+        """注册在每个新文档（包括iframe）加载前执行的脚本。
+        
+        通过 CDP Page.addScriptToEvaluateOnNewDocument 实现，对之后导航或加载的文档生效，
+        当前已加载的文档不受影响。
+        
+        Args:
+            source: JavaScript脚本源码
+            
+        Returns:
+            True表示注册成功，False表示驱动不支持CDP
+            
+        Raises:
+            BrowserException: 当浏览器未启动时抛出
+        """
+        if not self.driver:
+            raise BrowserException("浏览器未启动，无法注册脚本")
+
+        execute_cdp_cmd = getattr(self.driver, "execute_cdp_cmd", None)
+        if execute_cdp_cmd is None:
+            return False
+
+        execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": source})
+        return True
+
+    def insert_text(self, element: WebElement, text: str, focus: bool = True) -> bool:
+        """让元素获得焦点，并通过 CDP Input.insertText 一次性插入整段文本。
+        
+        send_keys 会按字符逐个派发按键事件，insertText 只需一条 CDP 命令，
+        且作用于当前获得焦点的元素，不受 driver 所在 frame 的限制。
+        
+        Args:
+            element: 目标输入元素
+            text: 要插入的文本
+            focus: 是否先让元素获得焦点，调用方已完成聚焦时传False省去一次脚本调用
+            
+        Returns:
+            True表示已通过CDP插入，False表示驱动不支持CDP（调用方应回退到 send_keys）
+            
+        Raises:
+            BrowserException: 当浏览器未启动时抛出
+        """
+        if not self.driver:
+            raise BrowserException("浏览器未启动，无法输入文本")
+
+        execute_cdp_cmd = getattr(self.driver, "execute_cdp_cmd", None)
+        if execute_cdp_cmd is None:
+            return False
+
+        if focus:
+            self.execute_pinned_script(_FOCUS_JS, element)
+        execute_cdp_cmd("Input.insertText", {"text": text})
+        return True
+
+    def wait_until(
+            self,
+            condition: Callable[[Any], Any],
+            timeout: float,
+            poll_frequency: float = 0.2
+    ) -> bool:
+        """轮询等待条件成立，代替固定时长的 sleep。
+        
+        条件满足时立即返回，超时不抛出异常。
+        
+        Args:
+            condition: 接收 driver 的条件函数，返回真值表示条件成立
+            timeout: 最长等待时间（秒）
+            poll_frequency: 轮询间隔（秒），默认0.2秒
+            
+        Returns:
+            True表示条件已成立，False表示等待超时
+            
+        Raises:
+            BrowserException: 当浏览器未启动时抛出
+        """
+        if not self.driver:
+            raise BrowserException("浏览器未启动，无法等待条件")
+
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=poll_frequency).until(condition)
+            return True
+        except TimeoutException:
+            return False
+
+    def wait_for_page_ready(self, timeout: float) -> bool:
+        """等待当前文档加载完成，代替导航后固定时长的 sleep。
+        
+        页面通过脚本跳转时，会等到跳转后的文档加载完成。
+        
+        Args:
+            timeout: 最长等待时间（秒）
+            
+        Returns:
+            True表示文档已加载完成，False表示等待超时
+            
+        Raises:
+            BrowserException: 当浏览器未启动时抛出
+        """
+        return self.wait_until(
+            lambda driver: driver.execute_script(_READY_STATE_JS) == "complete",
+            timeout=timeout,
+        )
+
+    def wait_for_presence(self, selector: str, timeout: float) -> bool:
+        """等待CSS选择器匹配的元素出现。
+        
+        与 wait_for_element 不同，超时只返回False，不记录错误也不抛出异常，
+        适合作为"最多等待N秒"的就绪检查。
+        通过页面内的 MutationObserver 等待，元素插入后立即返回，不受轮询间隔限制，
+        整个等待只需一次往返。脚本超时按元素未出现处理，直接返回False；
+        脚本无法执行（如等待期间页面跳转）时才回退到轮询。
+        
+        Args:
+            selector: CSS选择器
+            timeout: 最长等待时间（秒）
+            
+        Returns:
+            True表示元素已出现，False表示等待超时
+            
+        Raises:
+            BrowserException: 当浏览器未启动时抛出
+        """
+        try:
+            return bool(self.execute_async_script(
+                _WAIT_FOR_SELECTOR_JS, selector, int(timeout * 1000), timeout=timeout + 1
+            ))
+        except TimeoutException:
+            # 页面内的等待已经用满 timeout，再轮询一次只会让等待时间加倍
+            return False
+        except WebDriverException as e:
+            logger.debug("MutationObserver等待失败，改为轮询: %s", e)
+        return self.wait_until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)), timeout)
+
     def wait_for_element(
             self,
             selector: str,
@@ -325,10 +791,10 @@ class BrowserController:
                     # 尝试添加Cookie
                     self.driver.add_cookie(cookie)
                     success_count += 1
-                    logger.debug(f"✓ 成功添加Cookie: {cookie.get('name')} (domain: {cookie.get('domain', 'N/A')})")
+                    logger.debug("✓ 成功添加Cookie: %s (domain: %s)", cookie.get('name'), cookie.get('domain', 'N/A'))
                 except Exception as e:
                     fail_count += 1
-                    logger.debug(f"✗ 添加Cookie失败: {cookie.get('name', 'unknown')} - {str(e)}")
+                    logger.debug("✗ 添加Cookie失败: %s - %s", cookie.get('name', 'unknown'), e)
 
             if success_count > 0:
                 logger.info(f"Cookie加载完成 - 成功: {success_count}, 失败: {fail_count}, 总数: {len(cookies)}")
@@ -385,10 +851,10 @@ class BrowserController:
                         'httpOnly': cookie.get('httpOnly', False),
                     })
                     success_count += 1
-                    logger.debug(f"✓ 成功添加Cookie: {cookie.get('name')} (domain: {cookie.get('domain')})")
+                    logger.debug("✓ 成功添加Cookie: %s (domain: %s)", cookie.get('name'), cookie.get('domain'))
                 except Exception as e:
                     fail_count += 1
-                    logger.debug(f"✗ 添加Cookie失败: {cookie.get('name', 'unknown')} - {str(e)}")
+                    logger.debug("✗ 添加Cookie失败: %s - %s", cookie.get('name', 'unknown'), e)
 
             logger.info(f"CDP Cookie加载完成 - 成功: {success_count}, 失败: {fail_count}, 总数: {len(cookies)}")
 
@@ -501,7 +967,7 @@ class BrowserController:
 
                             self.driver.add_cookie(cookie_to_add)
                             success_count += 1
-                            logger.debug(f"✓ 成功添加Cookie: {cookie.get('name')} (domain: {cookie_to_add['domain']})")
+                            logger.debug("✓ 成功添加Cookie: %s (domain: %s)", cookie.get('name'), cookie_to_add['domain'])
                         except Exception as e:
                             # 如果失败，尝试使用原始域名（带点）
                             try:
@@ -559,23 +1025,13 @@ class BrowserController:
             logger.debug(f"当前URL: {current_url}")
 
             # 检查是否在登录页面（包括淘宝登录和1688登录）
-            login_indicators = [
-                "login.taobao.com",
-                "login.1688.com",
-                "/login"
-            ]
-            if any(indicator in current_url.lower() for indicator in login_indicators):
+            if _LOGIN_URL_RE.search(current_url):
                 logger.info(f"当前在登录页面: {current_url}，未登录")
                 return False
 
             # 检查是否在1688的404错误页面
             # https://page.1688.com/shtml/static/wrongpage.html 是1688的标准404页面
-            error_indicators = [
-                "page.1688.com/shtml/static/wrongpage.html",
-                "wrongpage.html",
-                "/wrongpage"
-            ]
-            if any(indicator in current_url.lower() for indicator in error_indicators):
+            if _ERROR_URL_RE.search(current_url):
                 logger.warning(f"当前在1688错误页面(404): {current_url}，判定为未登录或无权限访问")
                 return False
 
@@ -3,24 +3,529 @@
 负责处理旺旺消息的接收、发送和解析功能。
 """
 
+import hashlib
+import logging
+import random
+import re
 import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Set
+from typing import Dict, Hashable, List, Optional, Set, Tuple
 
 from selenium.common.exceptions import (
-    NoSuchElementException,
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    NoSuchFrameException,
     StaleElementReferenceException,
+    WebDriverException,
 )
 from selenium.webdriver.remote.webelement import WebElement
 
 from src.core.browser_controller import BrowserController
 from src.models.message import Message
+from src.utils.bloom_filter import BloomFilter
 from src.utils.captcha_handler import CaptchaHandler
-from src.utils.exceptions import MessageException
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.exceptions import BrowserException, MessageException
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 消息元素内各字段的候选类名片段，按从具体到宽泛的顺序排列
+_FIELD_CLASS_CANDIDATES: Dict[str, Tuple[str, ...]] = {
+    "content": ("message-content", "msg-content", "content"),
+    "sender": ("sender-name", "user-name", "sender", "username"),
+    "time": ("message-time", "msg-time", "timestamp", "time"),
+}
+
+# 每个字段按优先级排列的CSS选择器
+_FIELD_SELECTORS: Dict[str, List[str]] = {
+    field: [f"[class*='{name}']" for name in candidates]
+    for field, candidates in _FIELD_CLASS_CANDIDATES.items()
+}
+
+# 页面内执行的JavaScript脚本，通过 BrowserController.execute_pinned_script 复用
+_SCROLL_TO_TOP_JS = "arguments[0].scrollTop = 0;"
+
+# 查找联系人的会话项：arguments = [联系人名称或ID, 等待会话列表出现的最长时间（毫秒）, 回调]
+# 在页面内每200毫秒检查一次会话列表，列表出现后按以下顺序查找：
+# 名称（class 恰好为 name 的 div，空白按 XPath normalize-space 规则合并）完全相等、id（getElementById 直接查找）或 data-* 属性相等。
+# 不做部分匹配：联系人不在列表中时宁可失败，也不能把发给"张三"的消息发给"张三丰"。
+# 回调返回 [会话项总数, 匹配的会话项或null]，匹配项会先滚动到可见位置
+_FIND_CONVERSATION_JS = """
+var target = arguments[0], deadline = Date.now() + arguments[1], done = arguments[arguments.length - 1];
+// 联系人以参数传入、在页面内比较，不拼接进选择器，名称中的引号等字符无需转义
+var targetName = normalize(target);
+var dataNames = ['data-contact-id', 'data-user-id', 'data-userid', 'data-id', 'data-nick'];
+function normalize(text) {
+    return text.replace(/\\s+/g, ' ').trim();
+}
+function nameOf(item) {
+    var names = item.querySelectorAll("div[class='name']");
+    return Array.prototype.map.call(names, function (name) { return normalize(name.innerText); });
+}
+function locate(items) {
+    var i, j;
+    var names = Array.prototype.map.call(items, nameOf);
+    for (i = 0; i < items.length; i++) {
+        // names[i] 是该会话项内全部名称组成的数组，indexOf 逐个比较是否完全相等
+        if (names[i].indexOf(targetName) !== -1) {
+            return items[i];
+        }
+    }
+    var byId = document.getElementById(target);
+    if (byId && byId.classList.contains('conversation-item')) {
+        return byId;
+    }
+    for (i = 0; i < items.length; i++) {
+        for (j = 0; j < dataNames.length; j++) {
+            if (items[i].getAttribute(dataNames[j]) === target) {
+                return items[i];
+            }
+        }
+    }
+    return null;
+}
+(function poll() {
+    var items = document.getElementsByClassName('conversation-item');
+    if (!items.length && Date.now() < deadline) {
+        setTimeout(poll, 200);
+        return;
+    }
+    var item = locate(items);
+    if (item) {
+        item.scrollIntoView({block: 'center'});
+    }
+    done([items.length, item]);
+})();
+"""
+
+# 准备输入框并写入普通输入框：arguments = [元素, 文本]，返回 [是否为 contenteditable, 普通输入框写入后的值]
+# 可编辑元素只清空并获得焦点（文本随后通过 insert_text 插入），第二项为null；
+# 普通输入框在同一次调用中聚焦、覆盖 value 并派发 input/change 事件，
+# 通过原型上的 value setter 赋值，使 React 等框架记录的旧值失效，能感知到这次输入；
+# 元素已不可见（如切换会话后被隐藏）时不做任何操作，返回null
+_PREPARE_INPUT_JS = """
+var el = arguments[0];
+if (!el.getClientRects().length) {
+    return null;
+}
+if (el.getAttribute('contenteditable') === 'true') {
+    el.innerHTML = '';
+    el.textContent = '';
+    el.focus();
+    return [true, null];
+}
+var proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+el.focus();
+Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, arguments[1]);
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+return [false, el.value];
+"""
+
+# 滚动到元素并在页面内点击：arguments = [元素]，两步合并为一次往返
+_SCROLL_AND_CLICK_JS = """
+arguments[0].scrollIntoView({block: 'center'});
+arguments[0].click();
+"""
+
+# 读取输入框当前的文本：arguments = [元素, 是否为 contenteditable]
+# 输入框类型在准备输入时已确定，由调用方传入，轮询时不再重复读取属性
+_INPUT_TEXT_JS = """
+return arguments[1] ? arguments[0].textContent : arguments[0].value;
+"""
+
+# 直接写入可编辑元素的文本并派发 input 事件：arguments = [元素, 文本]
+_SET_INNER_TEXT_JS = """
+arguments[0].innerText = arguments[1];
+arguments[0].dispatchEvent(new InputEvent('input', {bubbles: true}));
+"""
+
+# 搜索框的 placeholder 关键字（用于排除）
+_SEARCH_KEYWORDS = ["搜索", "联系人", "你好", "在吗", "search", "contact"]
+# 排除搜索框的CSS后缀，由浏览器在匹配时直接过滤，不再逐个元素检查 placeholder；
+# i 标志使 Search、CONTACT 等大小写变体也被排除
+_NOT_SEARCH_BOX = "".join(f":not([placeholder*='{keyword}' i])" for keyword in _SEARCH_KEYWORDS)
+
+# 消息输入框的候选选择器，按优先级排列（已排除搜索框）
+_INPUT_SELECTORS = [
+    f"[contenteditable='true']{_NOT_SEARCH_BOX}",
+    f"input[type='text']{_NOT_SEARCH_BOX}",
+]
+# 任一候选匹配即可，用于等待输入框渲染
+_INPUT_ANY_SELECTOR = ", ".join(_INPUT_SELECTORS)
+# 首轮没有找到时，放宽到全部输入控件，并排除类名含 search（不区分大小写）的元素
+_INPUT_FALLBACK_SELECTORS = [
+    f"{tag}{_NOT_SEARCH_BOX}:not([class*='search' i])"
+    for tag in ("input", "textarea", "[contenteditable='true']")
+]
+
+# 元素是否可见/可交互（近似 Selenium 的 is_displayed、is_enabled），容错的 querySelectorAll，
+# 以及按选择器优先级返回第一个满足条件的元素：全部候选合并为一次查询（一次DOM遍历），
+# 再用 matches 按优先级挑选，每个元素的可用性只判断一次
+_USABLE_FUNCTIONS_JS = """
+function isVisible(el) {
+    if (!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)) {
+        return false;
+    }
+    var style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.opacity !== '0';
+}
+function isUsable(el) {
+    return !el.disabled && isVisible(el);
+}
+function queryAll(selector) {
+    try {
+        return document.querySelectorAll(selector);
+    } catch (e) {
+        return [];
+    }
+}
+function firstMatch(selectors, test) {
+    var elements;
+    try {
+        elements = document.querySelectorAll(selectors.join(', '));
+    } catch (e) {
+        // 含有浏览器不支持的选择器时合并查询整体失败，退回逐个查询
+        for (var k = 0; k < selectors.length; k++) {
+            var found = Array.prototype.find.call(queryAll(selectors[k]), test);
+            if (found) {
+                return found;
+            }
+        }
+        return null;
+    }
+    var usable = [];
+    for (var i = 0; i < selectors.length && elements.length; i++) {
+        for (var j = 0; j < elements.length; j++) {
+            if (!elements[j].matches(selectors[i])) {
+                continue;
+            }
+            if (usable[j] === undefined) {
+                usable[j] = test(elements[j]);
+            }
+            if (usable[j]) {
+                return elements[j];
+            }
+        }
+    }
+    return null;
+}
+"""
+
+# 发送按钮的候选选择器，按优先级排列
+_SEND_BUTTON_SELECTORS = [
+    "button[class*='send']",
+    ".send-button",
+    "[class*='btn-send']",
+    "button[type='submit']",
+    "span[class*='send']",
+    "div[class*='send']",
+]
+
+# 在页面内一次完成输入框和发送按钮的查找：
+# arguments = [候选选择器, 兜底选择器, 发送按钮选择器]（搜索框已由选择器排除）
+# 输入框首轮跳过不可见/禁用的元素，优先取明确的消息输入框，否则取第一个候选，再尝试兜底选择器。
+# 发送按钮此时若仍处于禁用状态（输入内容前）则返回null，由调用方在输入内容后再单独查找。
+# 返回 [输入框或null, placeholder, 发送按钮或null]
+_FIND_SEND_CONTROLS_JS = _USABLE_FUNCTIONS_JS + """
+var selectors = arguments[0], fallbackSelectors = arguments[1];
+function placeholderOf(el) {
+    return el.getAttribute('placeholder') || '';
+}
+function findInput() {
+    var candidate = null;
+    for (var i = 0; i < selectors.length; i++) {
+        var elements = queryAll(selectors[i]);
+        for (var j = 0; j < elements.length; j++) {
+            if (!isUsable(elements[j])) {
+                continue;
+            }
+            var placeholder = placeholderOf(elements[j]);
+            if (placeholder.indexOf('请输入消息') !== -1
+                    || (placeholder.indexOf('Enter') !== -1 && placeholder.indexOf('发送') !== -1)) {
+                return elements[j];
+            }
+            if (!candidate) {
+                candidate = elements[j];
+            }
+        }
+    }
+    return candidate || firstMatch(fallbackSelectors, isUsable);
+}
+var input = findInput();
+return [input, input ? placeholderOf(input) : '', firstMatch(arguments[2], isUsable)];
+"""
+
+# 按优先级返回第一个可交互的发送按钮：arguments = [候选选择器]，都没有找到时返回null
+_FIND_SEND_BUTTON_JS = _USABLE_FUNCTIONS_JS + """
+return firstMatch(arguments[0], isUsable);
+"""
+
+# 一次性读取消息元素解析所需的全部属性和文本，避免逐个属性的WebDriver往返
+# snapshot(el, fields, prop, withAlign)：fields 为字段名到按优先级排列的选择器列表，
+# prop 为读取文本使用的属性（textContent 或 innerText），
+# withAlign 为真时一并读取元素是否靠右对齐（计算样式的 text-align 或 float 为 right）
+_SNAPSHOT_FUNCTION_JS = """
+function snapshot(el, fields, prop, withAlign) {
+    // 没有子元素时不可能匹配到任何字段或图片，整段文本就是消息内容，跳过全部子元素查询
+    var leaf = !el.firstElementChild;
+    var result = {
+        id: el.getAttribute('data-message-id'),
+        domId: el.id,
+        cls: el.getAttribute('class') || '',
+        text: el[prop] || '',
+        hasImg: !leaf && el.querySelector("img, [class*='image']") !== null
+    };
+    Object.keys(fields).forEach(function (name) {
+        // 按优先级尝试各选择器，跳过文本为空的匹配
+        var selectors = fields[name], found = null;
+        for (var i = 0; i < selectors.length && !found && !leaf; i++) {
+            var candidate = el.querySelector(selectors[i]);
+            if (candidate && (candidate[prop] || '').trim()) {
+                found = candidate;
+            }
+        }
+        result[name] = found ? (found[prop] || '') : null;
+        // 只有发送者需要 data-user-id，其余字段不读取属性
+        if (name === 'sender') {
+            result.senderUserId = found ? found.getAttribute('data-user-id') : null;
+        }
+    });
+    if (withAlign) {
+        var style = window.getComputedStyle(el);
+        result.alignRight = style.textAlign === 'right' || style.cssFloat === 'right';
+    }
+    return result;
+}
+"""
+
+# 单个元素：arguments = [元素, fields, prop]
+_MESSAGE_SNAPSHOT_JS = _SNAPSHOT_FUNCTION_JS + """
+return snapshot(arguments[0], arguments[1], arguments[2]);
+"""
+
+# 在聊天记录中按优先级查找第一个有可见元素的选择器，取最后若干条并一次返回快照（含对齐方式）
+# arguments = [选择器列表, 最多读取的消息数量, fields, prop, 上次的列表签名]
+# 返回 [命中的选择器, 可见消息总数, 列表签名, 快照列表]，都没有可见元素时返回 [null, 0, null, []]；
+# 列表签名由读取的消息数量和首尾消息的ID（或文本）组成，与上次相同时不生成快照，快照列表返回null
+_COLLECT_CHAT_SNAPSHOTS_JS = _USABLE_FUNCTIONS_JS + _SNAPSHOT_FUNCTION_JS + """
+var selectors = arguments[0], limit = arguments[1], fields = arguments[2], prop = arguments[3];
+var known = arguments[4];
+function keyOf(el) {
+    return el.getAttribute('data-message-id') || el.id || el[prop];
+}
+for (var i = 0; i < selectors.length; i++) {
+    var visible = Array.prototype.filter.call(queryAll(selectors[i]), isVisible);
+    if (visible.length) {
+        var total = visible.length;
+        visible = visible.slice(Math.max(0, total - limit));
+        var signature = visible.length + ':' + keyOf(visible[0]) + ':' + keyOf(visible[visible.length - 1]);
+        if (signature === known) {
+            return [selectors[i], total, signature, null];
+        }
+        return [selectors[i], total, signature, visible.map(function (el) {
+            return snapshot(el, fields, prop, true);
+        })];
+    }
+}
+return [null, 0, null, []];
+"""
+
+# 按优先级查找消息元素并直接返回快照，不在Python侧创建 WebElement
+# arguments = [选择器列表, fields, prop, 上次的列表签名, 上次最后一条消息的 data-message-id]
+# 返回 [命中的选择器, 快照列表, 列表签名, 最后一条消息的 data-message-id]
+# 列表签名由元素数量和最后一条消息的ID（或文本）组成，与上次相同时不生成快照，快照列表返回null；
+# 上次最后一条消息仍在列表中时，只为它之后的元素生成快照
+_COLLECT_MESSAGE_SNAPSHOTS_JS = _SNAPSHOT_FUNCTION_JS + """
+var selectors = arguments[0], fields = arguments[1], prop = arguments[2], known = arguments[3];
+var anchorId = arguments[4];
+for (var i = 0; i < selectors.length; i++) {
+    var elements;
+    try {
+        elements = document.querySelectorAll(selectors[i]);
+    } catch (e) {
+        continue;
+    }
+    if (elements.length) {
+        var last = elements[elements.length - 1];
+        var lastId = last.getAttribute('data-message-id');
+        var signature = elements.length + ':' + (lastId || last.textContent);
+        if (signature === known) {
+            return [selectors[i], null, signature, lastId];
+        }
+        var start = 0;
+        if (anchorId) {
+            // 从后往前找，新消息通常只有几条
+            for (var j = elements.length - 1; j >= 0; j--) {
+                if (elements[j].getAttribute('data-message-id') === anchorId) {
+                    start = j + 1;
+                    break;
+                }
+            }
+        }
+        return [selectors[i], Array.prototype.slice.call(elements, start).map(function (el) {
+            return snapshot(el, fields, prop);
+        }), signature, lastId];
+    }
+}
+return [null, [], null, null];
+"""
+
+# 通过 MutationObserver 收集新增的消息元素，轮询时只读取新增部分
+# arguments = [消息元素选择器, fields, prop]
+# 观察器尚未安装（首次调用、页面刷新后）或选择器变化时重新安装并返回null，调用方需做一次完整扫描；
+# 否则返回自上次调用以来新增的、仍在文档中的消息元素快照
+_DRAIN_ADDED_MESSAGES_JS = _SNAPSHOT_FUNCTION_JS + """
+var selector = arguments[0], fields = arguments[1], prop = arguments[2];
+if (!window.__autoimObserver || window.__autoimObservedSelector !== selector) {
+    if (window.__autoimObserver) {
+        window.__autoimObserver.disconnect();
+    }
+    window.__autoimPending = [];
+    window.__autoimObservedSelector = selector;
+    window.__autoimObserver = new MutationObserver(function (mutations) {
+        mutations.forEach(function (mutation) {
+            mutation.addedNodes.forEach(function (node) {
+                if (node.nodeType !== 1) {
+                    return;
+                }
+                if (node.matches(selector)) {
+                    window.__autoimPending.push(node);
+                }
+                Array.prototype.push.apply(window.__autoimPending, node.querySelectorAll(selector));
+            });
+        });
+    });
+    window.__autoimObserver.observe(document.body || document.documentElement, {childList: true, subtree: true});
+    return null;
+}
+var pending = window.__autoimPending, seen = new Set();
+window.__autoimPending = [];
+return pending.filter(function (el) {
+    if (seen.has(el) || !el.isConnected) {
+        return false;
+    }
+    seen.add(el);
+    return true;
+}).map(function (el) { return snapshot(el, fields, prop); });
+"""
+
+# 等待 _DRAIN_ADDED_MESSAGES_JS 的观察器记录到新增消息：arguments = [最长等待时间（毫秒）]
+# 返回 Promise：已有或出现新增消息时为true，超时为false，观察器尚未安装（如页面刷新后）时为null。
+# 新注册的 MutationObserver 回调排在收集新增消息的观察器之后执行，检查时新增节点已被记录
+_WAIT_ADDED_MESSAGES_JS = """
+var timeout = arguments[0];
+return new Promise(function (resolve) {
+    if (!window.__autoimObserver) {
+        resolve(null);
+        return;
+    }
+    if (window.__autoimPending.length) {
+        resolve(true);
+        return;
+    }
+    var timer;
+    var observer = new MutationObserver(function () {
+        if (window.__autoimPending.length) {
+            observer.disconnect();
+            clearTimeout(timer);
+            resolve(true);
+        }
+    });
+    observer.observe(document.body || document.documentElement, {childList: true, subtree: true});
+    timer = setTimeout(function () {
+        observer.disconnect();
+        resolve(false);
+    }, timeout);
+});
+"""
+
+# 聊天记录中消息元素的候选选择器，按优先级排列
+_CHAT_MESSAGE_SELECTORS = [
+    ".message-item",
+    ".chat-message",
+    "[class*='message-item']",
+    "[class*='chat-message']",
+    ".message",
+    "[class*='message']",
+]
+# 任一候选匹配即可，用于等待消息加载
+_CHAT_MESSAGE_ANY_SELECTOR = ", ".join(_CHAT_MESSAGE_SELECTORS)
+
+# 聊天记录中各字段按优先级排列的候选选择器（格式与 _FIELD_SELECTORS 相同，供 _COLLECT_CHAT_SNAPSHOTS_JS 使用）；
+# 不合并为一条，否则 querySelector 按文档顺序返回，外层的宽泛匹配会抢在具体的类名之前
+_CHAT_FIELD_SELECTORS: Dict[str, List[str]] = {
+    "content": [".message-content", ".msg-content", ".content", "[class*='content']", "[class*='text']"],
+    "sender": [".sender-name", ".user-name", ".name", "[class*='sender']", "[class*='username']", "[class*='name']"],
+    "time": [".message-time", ".msg-time", ".time", "[class*='time']", "[class*='timestamp']"],
+}
+
+# 聊天记录滚动容器的候选选择器，按优先级排列
+_MESSAGE_CONTAINER_SELECTORS = [
+    ".message-list",
+    ".chat-message-list",
+    "[class*='message-list']",
+    "[class*='chat-content']",
+    ".chat-content",
+]
+
+# 类名按空白、连字符和下划线切分为单词，按整词判断消息方向，
+# 避免 presenter、owner、another 之类的类名被子串匹配误判
+_CLASS_TOKEN_SPLIT_RE = re.compile(r"[\s_-]+")
+# 通过类名判断消息方向的单词（小写），可以是 msg-sent、item_self 这类复合类名中的一个单词
+_SENT_CLASS_TOKENS = frozenset(("sent", "self", "own", "outgoing"))
+_CHAT_RECEIVED_CLASS_TOKENS = frozenset(("received", "other", "incoming"))
+# 聊天记录中还会用对齐方向和 me 标记消息方向。这几个词也常出现在 toolbar-left-panel、
+# float-right 之类与消息无关的布局类名中，因此只认完整的类名：单独的 left/right/me，
+# 或带消息前缀的 msg-right、message_left 等
+_MESSAGE_CLASS_PREFIXES = ("", "msg-", "msg_", "message-", "message_")
+_CHAT_SENT_CLASS_NAMES = frozenset(prefix + word for prefix in _MESSAGE_CLASS_PREFIXES for word in ("right", "me"))
+_CHAT_RECEIVED_CLASS_NAMES = frozenset(prefix + "left" for prefix in _MESSAGE_CLASS_PREFIXES)
+# 系统消息的类名关键字（不区分大小写），省去先整体转小写再查找
+_SYSTEM_CLASS_RE = re.compile(r"system", re.IGNORECASE)
+
+# 当前frame未知（初始状态，或被验证码处理等外部代码切换过）
+_UNKNOWN_FRAME = object()
+
+# 旺旺聊天iframe的选择器
+_CHAT_IFRAME_SELECTOR = "iframe[src*='def_cbu_web_im_core']"
+
+# 消息列表的候选选择器，按优先级排列
+# 这些选择器需要根据实际的旺旺网页版DOM结构调整
+_MESSAGE_LIST_SELECTORS = [
+    ".message-list .message-item",
+    ".chat-message-list .message",
+    "[class*='message-item']",
+    "[class*='chat-message']",
+]
+
+# 最近发送记录的最大条数，超出后淘汰最早的记录
+_RECENT_SENDS_MAXLEN = 1000
+
+# 已处理消息ID的最大缓存条数，超出后淘汰最久未出现的ID
+_PROCESSED_IDS_MAXLEN = 10000
+
+# 缓存输入框和发送按钮的联系人数量上限，超出后淘汰最久未发送的联系人
+_SEND_CONTROLS_CACHE_SIZE = 32
+
+# 保留发送熔断器的联系人数量上限，超出后淘汰最久未发送的联系人
+_SEND_BREAKERS_MAXLEN = 32
+
+# 切换联系人失败时打印联系人列表结构的最小间隔（秒），仅在开启调试日志时打印
+_CONTACT_LIST_DUMP_INTERVAL = 30
+
+# 输入框已在文档中但尚不可用（渲染中、被遮罩禁用等）时，等待其变为可用的最长时间（秒）
+_SEND_CONTROLS_WAIT = 2
+
+# 发送消息时可以重试的临时性错误（页面未就绪、元素失效、等待超时等）
+_TRANSIENT_SEND_EXCEPTIONS = (WebDriverException, BrowserException)
+
+# 同一联系人连续发送失败多少次后暂停向其发送，以及暂停时长（秒）
+_SEND_FAILURE_THRESHOLD = 3
+_SEND_BREAKER_TIMEOUT = 60
+
 
 class MessageHandler:
     """消息处理器类。
@@ -29,19 +534,65 @@ class MessageHandler:
     
     Attributes:
         browser: 浏览器控制器实例
-        processed_message_ids: 已处理的消息ID集合，用于去重
+        processed_message_ids: 已处理消息ID的8字节摘要（LRU，最多保留 _PROCESSED_IDS_MAXLEN 条），用于去重
+        send_dedup_window: 发送去重时间窗口（秒），距上次向同一联系人发送相同内容不足该时长时不再发送，0表示关闭
     """
 
-    def __init__(self, browser: BrowserController):
+    def __init__(self, browser: BrowserController, send_dedup_window: int = 0):
         """初始化消息处理器。
         
         Args:
             browser: 浏览器控制器实例
+            send_dedup_window: 发送去重时间窗口（秒），默认0，即关闭去重
         """
         self.browser = browser
-        self.processed_message_ids: Set[str] = set()
+        self.processed_message_ids: OrderedDict[bytes, None] = OrderedDict()
+
+        # processed_message_ids 的布隆过滤器前置，判定一定不存在的ID直接插入，不再查询精确集合
+        self._processed_bloom = BloomFilter(capacity=_PROCESSED_IDS_MAXLEN * 2)
+
+        # 由 (data-message-id, class, 文本前缀) 计算的廉价键，命中时跳过完整解析；只用于带 data-message-id 的元素
+        self._seen_cheap_keys: OrderedDict[int, None] = OrderedDict()
         self.captcha_handler = CaptchaHandler(browser)
 
+        # 最近成功发送的 (联系人ID, 内容摘要) 到发送时间（time.monotonic）的映射，按发送时间从早到晚排列，
+        # 超出去重窗口或 _RECENT_SENDS_MAXLEN 条时从最早的开始淘汰
+        self.send_dedup_window = send_dedup_window
+        self._recent_sends: OrderedDict[Tuple[str, bytes], float] = OrderedDict()
+
+        # 各调用点上次命中的选择器，key为调用点名称，下次优先尝试
+        self._selector_cache: Dict[str, str] = {}
+
+        # 各调用点上次读取的消息列表签名，列表没有变化时跳过解析
+        self._list_signatures: Dict[str, Optional[str]] = {}
+        # 各调用点上次读取到的最后一条消息的 data-message-id，下次只读取它之后的消息
+        self._list_anchors: Dict[str, Optional[str]] = {}
+
+        # 各联系人上次获取的聊天消息及对应的列表签名（消息数量和首尾消息），
+        # 签名相同时页面内不生成快照，直接返回上次的结果
+        self._chat_message_cache: Dict[str, Tuple[str, List[Message]]] = {}
+
+        # 缓存的聊天iframe元素，失效（页面刷新等）时重新查找
+        self._chat_iframe: Optional[WebElement] = None
+        # 聊天iframe的 id 属性，重新查找时优先按 id 直接定位
+        self._chat_iframe_id: Optional[str] = None
+
+        # 各联系人会话中已定位的输入框和发送按钮（LRU，最多 _SEND_CONTROLS_CACHE_SIZE 个联系人），
+        # 失效或不可见时重新查找；聊天iframe重新加载时整体清空
+        self._input_cache: OrderedDict[str, WebElement] = OrderedDict()
+        self._send_button_cache: OrderedDict[str, WebElement] = OrderedDict()
+
+        # 各联系人的发送熔断器，连续失败后在冷却时间内直接拒绝发送（LRU，最多 _SEND_BREAKERS_MAXLEN 个联系人）；
+        # 发送成功时熔断器已无失败记录，直接移除
+        self._send_breakers: OrderedDict[str, CircuitBreaker] = OrderedDict()
+
+        # 上次打印联系人列表结构的时间（time.monotonic），用于限制调试输出的频率
+        self._last_contact_list_dump = float("-inf")
+
+        # driver 当前所在的frame（None表示主文档），与目标相同时跳过切换命令；
+        # 被其他组件切换过、状态不确定时为 _UNKNOWN_FRAME
+        self._current_frame = _UNKNOWN_FRAME
+
         logger.info("消息处理器初始化完成")
 
     def check_new_messages(self) -> List[Message]:
@@ -57,27 +608,270 @@ class MessageHandler:
         """
         logger.debug("检查新消息...")
 
-        # 获取当前页面的消息元素列表
-        message_elements = self.get_message_list()
+        # 优先只读取页面观察器记录的新增消息；观察器不可用时一次往返读取全部消息
+        try:
+            # CDP 脚本始终在顶层文档中执行，可以直接留在聊天iframe中；回退到 execute_script 时才需切回
+            if not self.browser.supports_cdp:
+                self._switch_frame(None)
+            snapshots = self._drain_added_messages("message_list")
+            if snapshots is None:
+                snapshots = self._collect_snapshots("message_list", _MESSAGE_LIST_SELECTORS)
+        except Exception as e:
+            error_msg = f"获取消息列表失败: {str(e)}"
+            logger.error(error_msg)
+            raise MessageException(error_msg) from e
+
+        if snapshots is None:
+            logger.debug("消息列表没有变化")
+            return []
 
-        if not message_elements:
+        if not snapshots:
             logger.debug("未找到消息元素")
             return []
 
-        new_messages = []
+        # 先解析本轮全部新元素，全部成功后才记录廉价键和消息ID；
+        # 中途解析失败时什么都不记录，下次轮询会重新解析这些元素，不会丢消息
+        parsed: List[Tuple[Optional[int], Message]] = []
+        batch_keys = set()
+        for snapshot in snapshots:
+            # 带 data-message-id 的元素先用廉价键过滤，只有首次出现的才做完整解析和摘要计算；
+            # 没有真实ID的元素可能文本相同（如客户连发两次"在吗"），必须完整解析，
+            # 由包含时间文本和元素ID的确定性消息ID去重
+            cheap_key = None
+            if snapshot["id"]:
+                cheap_key = hash((snapshot["id"], snapshot["cls"], snapshot["text"][:64]))
+                if cheap_key in self._seen_cheap_keys:
+                    self._seen_cheap_keys.move_to_end(cheap_key)
+                    continue
+                if cheap_key in batch_keys:
+                    continue
+                batch_keys.add(cheap_key)
 
-        # 解析每个消息元素
-        for element in message_elements:
-            message = self.parse_message_element(element)
+            try:
+                parsed.append((cheap_key, self._parse_snapshot(snapshot)))
+            except Exception as e:
+                # 本轮未处理完，清除签名和锚点使下次轮询重新读取全部消息
+                self._list_signatures.pop("message_list", None)
+                self._list_anchors.pop("message_list", None)
+                error_msg = f"解析消息元素失败: {str(e)}"
+                logger.error(error_msg)
+                raise MessageException(error_msg) from e
 
+        new_messages = []
+        for cheap_key, message in parsed:
+            if cheap_key is not None:
+                self._remember(self._seen_cheap_keys, cheap_key, known_new=True)
             # 检查是否已处理过该消息
-            if message.message_id not in self.processed_message_ids:
+            if self._remember_processed(message.message_id):
                 new_messages.append(message)
-                self.processed_message_ids.add(message.message_id)
-            else:
-                continue
         return new_messages
 
+    def wait_for_new_messages(self, timeout: float) -> List[Message]:
+        """等待新消息到达并返回，代替"检查后固定休眠"的轮询。
+        
+        页面内的观察器已安装时，由页面在新增消息节点插入时立即通知，
+        等待期间不发送任何命令；有新消息时马上读取，没有新消息时在 timeout 后返回空列表。
+        观察器不可用（首次调用、页面刷新后）时执行一次普通检查，没有新消息则休眠到 timeout。
+        
+        Args:
+            timeout: 最长等待时间（秒）
+            
+        Returns:
+            新消息列表，等待超时则返回空列表
+            
+        Raises:
+            MessageException: 当检查消息失败时抛出
+        """
+        deadline = time.monotonic() + timeout
+
+        if self._drain_ready("message_list"):
+            try:
+                if not self.browser.supports_cdp:
+                    self._switch_frame(None)
+                arrived = self.browser.cdp_extract(
+                    _WAIT_ADDED_MESSAGES_JS, int(timeout * 1000), await_promise=True
+                )
+            except Exception as e:
+                error_msg = f"等待新消息失败: {str(e)}"
+                logger.error(error_msg)
+                raise MessageException(error_msg) from e
+
+            if arrived is False:
+                return []
+            if arrived:
+                return self.check_new_messages()
+
+        # 观察器不可用，执行一次检查（同时重新安装观察器），没有新消息时休眠到超时
+        new_messages = self.check_new_messages()
+        if not new_messages:
+            time.sleep(max(0.0, deadline - time.monotonic()))
+        return new_messages
+
+    @staticmethod
+    def _snapshot_content(snapshot: Dict) -> str:
+        """从快照中提取消息内容，没有找到内容元素时使用整个元素的文本。
+        
+        Args:
+            snapshot: 消息元素的快照
+            
+        Returns:
+            去除首尾空白的消息内容
+        """
+        content = (snapshot["content"] or "").strip()
+        return content or snapshot["text"].strip()
+
+    @staticmethod
+    def _snapshot_timestamp(snapshot: Dict) -> datetime:
+        """根据快照中的时间文本确定消息时间戳。
+        
+        Args:
+            snapshot: 消息元素的快照
+            
+        Returns:
+            消息时间戳，目前为当前时间
+        """
+        if snapshot["time"] is not None and logger.isEnabledFor(logging.DEBUG):
+            time_text = snapshot["time"].strip()
+            if time_text:
+                # 这里简化处理，实际应用中需要解析时间字符串
+                # 例如: "10:30", "昨天 15:20" 等格式
+                logger.debug("消息时间文本: %s", time_text)
+        # TODO: 实现时间字符串解析
+        return datetime.now()
+
+    @staticmethod
+    def _message_type(snapshot: Dict, content: str) -> str:
+        """根据快照判断消息类型。
+        
+        是否包含图片已在读取快照时于页面内判断（hasImg），这里不再查询元素。
+        
+        Args:
+            snapshot: 消息元素的快照
+            content: 已提取的消息内容
+            
+        Returns:
+            消息类型（text/image/system）
+        """
+        if snapshot["hasImg"]:
+            return "image"
+        # 先查较短的类名，命中时不必再扫描整段消息内容
+        if _SYSTEM_CLASS_RE.search(snapshot["cls"]) or "系统消息" in content:
+            return "system"
+        return "text"
+
+    @staticmethod
+    def _class_tokens(element_class: str) -> Set[str]:
+        """将 class 属性切分为小写单词集合。
+        
+        Args:
+            element_class: 元素的 class 属性值
+            
+        Returns:
+            小写单词集合，如 "msg-item Self_Msg" 得到 {"msg", "item", "self"}
+        """
+        return set(_CLASS_TOKEN_SPLIT_RE.split(element_class.lower()))
+
+    @classmethod
+    def _chat_direction(cls, element_class: str) -> Optional[bool]:
+        """根据聊天记录中消息元素的类名判断消息方向。
+        
+        Args:
+            element_class: 元素的 class 属性值
+            
+        Returns:
+            True表示自己发送的消息，False表示接收的消息，无法从类名判断时返回None
+        """
+        class_names = element_class.lower().split()
+        class_tokens = cls._class_tokens(element_class)
+        if not (_SENT_CLASS_TOKENS.isdisjoint(class_tokens) and _CHAT_SENT_CLASS_NAMES.isdisjoint(class_names)):
+            return True
+        if not (_CHAT_RECEIVED_CLASS_TOKENS.isdisjoint(class_tokens)
+                and _CHAT_RECEIVED_CLASS_NAMES.isdisjoint(class_names)):
+            return False
+        return None
+
+    @staticmethod
+    def _make_message_id(contact_id: str, content: str, dom_id: Optional[str], time_text: Optional[str]) -> str:
+        """根据联系人、内容、元素ID和时间文本生成确定性的消息ID。
+        
+        不包含读取时刻，同一条消息多次轮询得到相同的ID；
+        时间文本参与计算，同一联系人不同时间发送的相同内容不会被当成同一条消息。
+        
+        Args:
+            contact_id: 联系人ID
+            content: 消息内容
+            dom_id: 消息元素的 id 属性
+            time_text: 消息元素中的时间文本
+            
+        Returns:
+            32位十六进制的消息ID
+        """
+        key = f"{dom_id or ''}|{content}|{contact_id}|{(time_text or '').strip()}"
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _processed_key(message_id: str) -> bytes:
+        """计算消息ID在已处理缓存中的键。
+        
+        data-message-id 可能是UUID长度的字符串，统一压缩为8字节摘要后，
+        布隆过滤器和LRU缓存的多次哈希、比较都只作用于短键。
+        摘要碰撞的概率极低，且缓存有界，碰撞最多导致一条消息被跳过。
+        
+        Args:
+            message_id: 消息ID
+            
+        Returns:
+            8字节的摘要
+        """
+        return hashlib.blake2b(message_id.encode("utf-8"), digest_size=8).digest()
+
+    def _remember_processed(self, message_id: str) -> bool:
+        """将消息ID记录为已处理，先经过布隆过滤器判断。
+        
+        Args:
+            message_id: 消息ID
+            
+        Returns:
+            True表示该ID是首次出现，False表示已处理过
+        """
+        key = self._processed_key(message_id)
+        bloom = self._processed_bloom
+        if key in bloom:
+            return self._remember(self.processed_message_ids, key)
+
+        # 布隆过滤器判定一定不存在：直接插入，跳过精确集合的查找
+        bloom.add(key)
+        if bloom.count > bloom.capacity:
+            # 精确集合已淘汰过旧ID，按当前内容重建，避免位数组饱和
+            bloom.rebuild(self.processed_message_ids)
+            bloom.add(key)
+        self._remember(self.processed_message_ids, key, known_new=True)
+        return True
+
+    @staticmethod
+    def _remember(seen: OrderedDict, key: Hashable, known_new: bool = False) -> bool:
+        """将键记录到LRU缓存中。
+        
+        已存在的键会被移动到最近使用的位置，避免仍在页面上的消息被淘汰后重复上报；
+        超过容量时淘汰最久未出现的键。
+        
+        Args:
+            seen: 已处理记录的LRU缓存
+            key: 消息ID或廉价键
+            known_new: 调用方已确定该键不存在时为True，跳过存在性检查
+            
+        Returns:
+            True表示该键是首次出现，False表示已处理过
+        """
+        if not known_new and key in seen:
+            seen.move_to_end(key)
+            return False
+
+        seen[key] = None
+        if len(seen) > _PROCESSED_IDS_MAXLEN:
+            seen.popitem(last=False)
+        return True
+
     def get_message_list(self) -> List[WebElement]:
         """获取当前页面的消息元素列表。
         
@@ -89,25 +883,13 @@ class MessageHandler:
         """
         try:
             logger.debug("获取消息元素列表...")
+            self._switch_frame(None)
 
-            # 尝试多个可能的选择器
-            # 这些选择器需要根据实际的旺旺网页版DOM结构调整
-            selectors = [
-                ".message-list .message-item",
-                ".chat-message-list .message",
-                "[class*='message-item']",
-                "[class*='chat-message']",
-            ]
-
-            for selector in selectors:
-                try:
-                    elements = self.browser.find_elements(selector)
-                    if elements:
-                        logger.debug(f"使用选择器 '{selector}' 找到 {len(elements)} 个消息元素")
-                        return elements
-                except Exception as e:
-                    logger.debug(f"选择器 '{selector}' 未找到元素: {str(e)}")
-                    continue
+            # 按优先级尝试多个可能的选择器，一次往返完成
+            elements = self._find_elements_cached("message_list", _MESSAGE_LIST_SELECTORS)
+            if elements:
+                logger.debug("找到 %s 个消息元素", len(elements))
+                return elements
 
             logger.debug("未找到任何消息元素")
             return []
@@ -121,6 +903,7 @@ class MessageHandler:
         """从DOM元素中提取消息信息。
         
         解析消息元素，提取消息内容、发送者、时间戳、类型等信息。
+        所需的属性和文本通过一次 execute_script 批量读取。
         
         Args:
             element: 消息DOM元素
@@ -132,273 +915,78 @@ class MessageHandler:
             MessageException: 当解析失败时抛出
         """
         try:
-            # 生成消息ID（使用时间戳和内容的组合）
-            # 实际应用中可能需要从元素属性中获取真实的消息ID
-            message_id = element.get_attribute("data-message-id")
-            if not message_id:
-                # 如果没有消息ID属性，使用元素的其他属性生成唯一ID
-                message_id = f"{element.get_attribute('id') or ''}{element.text[:20]}{int(time.time() * 1000)}"
-
-            # 提取消息内容
-            # 尝试多个可能的选择器
-            content = ""
-            content_selectors = [
-                ".message-content",
-                ".msg-content",
-                "[class*='content']",
-            ]
-
-            for selector in content_selectors:
-                try:
-                    content_element = element.find_element("css selector", selector)
-                    content = content_element.text.strip()
-                    if content:
-                        break
-                except NoSuchElementException:
-                    continue
-
-            # 如果没有找到内容元素，使用整个元素的文本
-            if not content:
-                content = element.text.strip()
-
-            # 提取发送者信息
-            contact_name = "未知用户"
-            contact_id = "unknown"
-            sender_selectors = [
-                ".sender-name",
-                ".user-name",
-                "[class*='sender']",
-                "[class*='username']",
-            ]
-
-            for selector in sender_selectors:
-                try:
-                    sender_element = element.find_element("css selector", selector)
-                    contact_name = sender_element.text.strip()
-                    contact_id = sender_element.get_attribute("data-user-id") or contact_name
-                    if contact_name:
-                        break
-                except NoSuchElementException:
-                    continue
-
-            # 提取时间戳
-            timestamp = datetime.now()
-            time_selectors = [
-                ".message-time",
-                ".msg-time",
-                "[class*='time']",
-                "[class*='timestamp']",
-            ]
-
-            for selector in time_selectors:
-                try:
-                    time_element = element.find_element("css selector", selector)
-                    time_text = time_element.text.strip()
-                    # 这里简化处理，实际应用中需要解析时间字符串
-                    # 例如: "10:30", "昨天 15:20" 等格式
-                    logger.debug(f"消息时间文本: {time_text}")
-                    break
-                except NoSuchElementException:
-                    continue
-
-            # 判断消息类型
-            message_type = "text"
-            if element.find_elements("css selector", "img, [class*='image']"):
-                message_type = "image"
-            elif "系统消息" in content or element.get_attribute("class") and "system" in element.get_attribute("class"):
-                message_type = "system"
-
-            # 判断是否为发送的消息（通常通过CSS类名判断）
-            is_sent = False
-            element_class = element.get_attribute("class") or ""
-            if any(keyword in element_class.lower() for keyword in ["sent", "self", "own", "outgoing"]):
-                is_sent = True
-
-            message = Message(
-                message_id=message_id,
-                contact_id=contact_id,
-                contact_name=contact_name,
-                content=content,
-                message_type=message_type,
-                timestamp=timestamp,
-                is_sent=is_sent,
+            snapshot = self.browser.execute_pinned_script(
+                _MESSAGE_SNAPSHOT_JS, element, _FIELD_SELECTORS, "textContent"
             )
-
-            logger.debug(f"成功解析消息: {message.message_id}")
-            return message
+            return self._parse_snapshot(snapshot)
 
         except Exception as e:
             error_msg = f"解析消息元素失败: {str(e)}"
             logger.error(error_msg)
             raise MessageException(error_msg) from e
 
+    def _parse_snapshot(self, snapshot: Dict) -> Message:
+        """根据消息元素的属性快照构造消息对象。
+        
+        文本统一通过 textContent 读取，不触发浏览器布局计算；与 .text 相比，
+        隐藏元素的文本也会被包含，空白字符不会按渲染结果折叠。
+        
+        Args:
+            snapshot: _MESSAGE_SNAPSHOT_JS 返回的属性字典
+            
+        Returns:
+            解析后的Message对象
+        """
+        content = self._snapshot_content(snapshot)
+
+        # 提取发送者信息
+        contact_name = "未知用户"
+        contact_id = "unknown"
+        sender_name = (snapshot["sender"] or "").strip()
+        if sender_name:
+            contact_name = sender_name
+            contact_id = snapshot["senderUserId"] or sender_name
+
+        # 优先使用元素上的真实消息ID；没有时根据联系人和内容生成确定性ID，
+        # 保证同一条消息多次轮询得到相同的ID
+        message_id = snapshot["id"]
+        if not message_id:
+            message_id = self._make_message_id(contact_id, content, snapshot["domId"], snapshot["time"])
+
+        timestamp = self._snapshot_timestamp(snapshot)
+        message_type = self._message_type(snapshot, content)
+
+        # 判断是否为发送的消息（通常通过CSS类名判断）
+        is_sent = not _SENT_CLASS_TOKENS.isdisjoint(self._class_tokens(snapshot["cls"]))
+
+        message = Message(
+            message_id=message_id,
+            contact_id=contact_id,
+            contact_name=contact_name,
+            content=content,
+            message_type=message_type,
+            timestamp=timestamp,
+            is_sent=is_sent,
+        )
+
+        logger.debug("成功解析消息: %s", message.message_id)
+        return message
+
     def debug_contact_list(self) -> None:
         """调试方法：打印当前页面的联系人列表结构。
         
         用于帮助开发者了解实际的DOM结构，以便调整选择器。
+        实现位于 src.core._debug_helpers，只在调用时导入。
         """
-        try:
-            logger.info("=== 开始调试联系人列表结构 ===")
-
-            # 等待页面加载
-            logger.info("等待页面加载...")
-            time.sleep(2)
-
-            # 检查是否有iframe
-            logger.info("\n检查页面iframe结构:")
-            try:
-                iframes = self.browser.find_elements("iframe")
-                logger.info(f"找到 {len(iframes)} 个iframe")
-
-                for i, iframe in enumerate(iframes):
-                    iframe_src = iframe.get_attribute("src") or "无src"
-                    iframe_id = iframe.get_attribute("id") or "无ID"
-                    logger.info(f"  [{i + 1}] iframe: id={iframe_id}, src={iframe_src[:100]}")
-
-                    # 如果是旺旺聊天的iframe，切换进去
-                    if "1688" in iframe_src and "im" in iframe_src.lower():
-                        logger.info(f"  ✓ 找到旺旺聊天iframe，尝试切换...")
-                        try:
-                            self.browser.driver.switch_to.frame(iframe)
-                            logger.info("  ✓ 成功切换到iframe")
-                            time.sleep(1)
-                            break
-                        except Exception as e:
-                            logger.warning(f"  ✗ 切换iframe失败: {str(e)}")
-                            continue
-            except Exception as e:
-                logger.debug(f"检查iframe失败: {str(e)}")
-
-            # 首先尝试查找旺旺特定的.conversation-item元素
-            logger.info("\n检查旺旺会话列表 (.conversation-item):")
-            try:
-                # 等待元素出现，最多等待10秒
-                max_wait = 10
-                conversation_items = []
-
-                for i in range(max_wait):
-                    conversation_items = self.browser.find_elements(".conversation-item")
-                    if conversation_items:
-                        break
-                    logger.info(f"  等待联系人列表加载... ({i + 1}/{max_wait}秒)")
-                    time.sleep(1)
-
-                if conversation_items:
-                    logger.info(f"✓ 找到 {len(conversation_items)} 个会话项 (.conversation-item)")
-
-                    # 打印前5个会话项的详细信息
-                    for i, item in enumerate(conversation_items[:5]):
-                        try:
-                            item_id = item.get_attribute("id") or "无ID"
-                            item_class = item.get_attribute("class") or "无class"
-
-                            # 查找.name元素
-                            try:
-                                name_elem = item.find_element("css selector", ".name")
-                                name_text = name_elem.text.strip()
-                            except NoSuchElementException:
-                                name_text = "未找到.name元素"
-
-                            # 查找.desc元素
-                            try:
-                                desc_elem = item.find_element("css selector", ".desc")
-                                desc_text = desc_elem.text.strip()[:30]
-                            except NoSuchElementException:
-                                desc_text = "无描述"
-
-                            logger.info(f"\n  [{i + 1}] 会话项:")
-                            logger.info(f"      ID: {item_id}")
-                            logger.info(f"      联系人名称: {name_text}")
-                            logger.info(f"      最后消息: {desc_text}")
-
-                        except Exception as e:
-                            logger.debug(f"  [{i + 1}] 无法获取会话项信息: {str(e)}")
-
-                    logger.info("\n" + "=" * 60)
-                    # 切换回主文档
-                    self.browser.driver.switch_to.default_content()
-                    return  # 找到了旺旺结构，直接返回
-                else:
-                    logger.info("未找到.conversation-item元素")
-            except Exception as e:
-                logger.debug(f"查找.conversation-item失败: {str(e)}")
-
-            # 如果没有找到旺旺特定结构，尝试通用的联系人列表选择器
-            logger.info("\n检查通用联系人列表结构:")
-            list_selectors = [
-                ".contact-list",
-                ".user-list",
-                ".session-list",
-                "[class*='contact-list']",
-                "[class*='user-list']",
-                "[class*='session-list']",
-                "[class*='conversation']",
-                "ul[class*='list']",
-            ]
-
-            for selector in list_selectors:
-                try:
-                    elements = self.browser.find_elements(selector)
-                    if elements:
-                        logger.info(f"\n✓ 找到列表容器: {selector} (数量: {len(elements)})")
-
-                        # 获取第一个列表的子元素
-                        list_element = elements[0]
-                        children = list_element.find_elements("css selector", "*")
-                        logger.info(f"  列表包含 {len(children)} 个子元素")
-
-                        # 打印前5个子元素的信息
-                        for i, child in enumerate(children[:5]):
-                            try:
-                                tag = child.tag_name
-                                classes = child.get_attribute("class") or "无class"
-                                elem_id = child.get_attribute("id") or "无ID"
-                                text = child.text.strip()[:50] or "无文本"
-                                data_attrs = []
-
-                                # 检查常见的data属性
-                                for attr in ["data-id", "data-user-id", "data-contact-id", "data-userid", "data-nick"]:
-                                    value = child.get_attribute(attr)
-                                    if value:
-                                        data_attrs.append(f"{attr}={value}")
-
-                                logger.info(f"\n  [{i + 1}] <{tag}>")
-                                logger.info(f"      class: {classes}")
-                                logger.info(f"      id: {elem_id}")
-                                logger.info(f"      text: {text}")
-                                if data_attrs:
-                                    logger.info(f"      data属性: {', '.join(data_attrs)}")
-                            except Exception as e:
-                                logger.debug(f"  [{i + 1}] 无法获取元素信息: {str(e)}")
-
-                        break
-                except Exception as e:
-                    logger.debug(f"选择器 '{selector}' 未找到列表: {str(e)}")
-                    continue
-
-            logger.info("\n" + "=" * 60)
-            logger.info("联系人列表结构调试完成")
-            logger.info("=" * 60)
-
-            # 切换回主文档
-            try:
-                self.browser.driver.switch_to.default_content()
-            except Exception:
-                pass
-
-        except Exception as e:
-            logger.error(f"调试联系人列表时出错: {str(e)}")
-            # 确保切换回主文档
-            try:
-                self.browser.driver.switch_to.default_content()
-            except Exception:
-                pass
+        from src.core._debug_helpers import debug_contact_list
+        debug_contact_list(self)
 
-    def switch_to_chat(self, contact_id: str) -> bool:
+    def switch_to_chat(self, contact_id: str, enter_iframe: bool = True) -> bool:
         """切换到指定联系人的聊天窗口。
         
         Args:
             contact_id: 联系人ID或联系人名称
+            enter_iframe: 是否先切换到聊天iframe，调用方已在iframe内时传False
             
         Returns:
             True表示切换成功，False表示切换失败
@@ -407,52 +995,39 @@ class MessageHandler:
             MessageException: 当切换失败时抛出
         """
         try:
-            iframes = self.browser.find_elements("iframe")
-            for iframe in iframes:
-                iframe_src = iframe.get_attribute("src") or ""
-                # 查找旺旺聊天的iframe
-                if "1688" in iframe_src and "im" in iframe_src.lower():
-                    logger.debug(f"找到旺旺iframe，切换进入: {iframe_src[:100]}")
-                    self.browser.driver.switch_to.frame(iframe)
-                    time.sleep(1)
-                    break
-            logger.debug(f"遍历所有会话项查找联系人")
-            conversation_items = self.browser.find_elements(".conversation-item")
-            if conversation_items:
-                for idx, item in enumerate(conversation_items):
+            if enter_iframe:
+                try:
+                    self._enter_chat_iframe(timeout=0)
+                except BrowserException as e:
+                    logger.debug("未找到旺旺iframe，在当前文档中查找: %s", e)
+
+            logger.debug("遍历所有会话项查找联系人")
+            # 等待会话列表渲染、按名称/ID依次精确匹配都在页面内完成，只需一次往返，
+            # 只返回匹配的会话项（已滚动到可见位置）
+            item_count, item = self.browser.execute_async_script(
+                _FIND_CONVERSATION_JS, contact_id, 3000, timeout=5
+            )
+            if item is not None:
+                try:
+                    # 点击整个会话项；被遮挡或尚不可交互（如滚动动画未结束）时改为页面内滚动并点击
                     try:
-                        # 使用 XPath 在当前 item 下查找 .name 元素
-                        name_element = item.find_element("xpath", ".//div[@class='name']")
-                        name_text = name_element.text.strip()
-
-                        if name_text == contact_id:
-                            # 滚动到元素可见
-                            self.browser.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});",
-                                                               item)
-                            time.sleep(0.5)
-
-                            # 点击整个会话项
-                            item.click()
-                            logger.info(f"成功切换到联系人 {contact_id}")
-                            # time.sleep(1)
-                            return True
-                    except NoSuchElementException:
-                        logger.debug(f"  [{idx + 1}] 未找到 .name 元素")
-                        continue
-                    except StaleElementReferenceException:
-                        logger.debug(f"  [{idx + 1}] 元素已过期，跳过")
-                        continue
-                    except Exception as e:
-                        logger.debug(f"  [{idx + 1}] 处理失败: {str(e)}")
-                        continue
-            else:
+                        item.click()
+                    except (ElementClickInterceptedException, ElementNotInteractableException):
+                        self._scroll_and_click(item)
+                    logger.info("成功切换到联系人 %s", contact_id)
+                    return True
+                except StaleElementReferenceException:
+                    logger.debug("会话项已过期，点击失败")
+                except Exception as e:
+                    logger.debug("点击会话项失败: %s", e)
+            elif not item_count:
                 logger.warning("未找到任何 .conversation-item 元素")
 
             # 所有策略都失败
             logger.info("提示: 请确保联系人在当前页面可见，或者检查联系人ID/名称是否正确")
 
             # 切换回主文档
-            self.browser.driver.switch_to.default_content()
+            self._switch_frame(None)
             return False
 
         except Exception as e:
@@ -460,7 +1035,7 @@ class MessageHandler:
             logger.error(error_msg)
 
             # 确保切换回主文档
-            self.browser.driver.switch_to.default_content()
+            self._switch_frame(None)
             raise MessageException(error_msg) from e
 
     def get_chat_messages(self, contact_id: str, max_messages: int = 100) -> List[Message]:
@@ -484,125 +1059,97 @@ class MessageHandler:
             # 切换到聊天iframe
             logger.debug("切换到聊天iframe...")
             try:
-                self.browser.driver.switch_to.default_content()
-                iframe_selector = "iframe[src*='def_cbu_web_im_core']"
-                chat_iframe = self.browser.wait_for_element(iframe_selector, timeout=5)
-
-                if chat_iframe:
-                    self.browser.driver.switch_to.frame(chat_iframe)
-                    logger.debug("✓ 成功切换到聊天iframe")
-                    time.sleep(1)
-                else:
-                    logger.warning("未找到聊天iframe")
+                self._enter_chat_iframe()
+                logger.debug("✓ 成功切换到聊天iframe")
             except Exception as e:
                 logger.warning(f"切换到iframe失败: {str(e)}")
                 raise MessageException("无法切换到聊天iframe") from e
 
             # 切换到目标联系人的聊天窗口
-            logger.debug(f"切换到联系人 {contact_id} 的聊天窗口...")
-            if not self.switch_to_chat(contact_id):
-                self.browser.driver.switch_to.default_content()
+            logger.debug("切换到联系人 %s 的聊天窗口...", contact_id)
+            if not self.switch_to_chat(contact_id, enter_iframe=False):
+                self._switch_frame(None)
                 raise MessageException(f"无法切换到联系人 {contact_id} 的聊天窗口")
 
             # 等待聊天消息加载
             logger.debug("等待聊天消息加载...")
-            time.sleep(2)
+            self.browser.wait_for_presence(_CHAT_MESSAGE_ANY_SELECTOR, timeout=2)
 
             # 尝试滚动到顶部加载更多历史消息
             logger.debug("尝试滚动加载历史消息...")
             try:
                 # 查找消息容器
-                message_container_selectors = [
-                    ".message-list",
-                    ".chat-message-list",
-                    "[class*='message-list']",
-                    "[class*='chat-content']",
-                    ".chat-content",
-                ]
-
                 message_container = None
-                for selector in message_container_selectors:
-                    try:
-                        containers = self.browser.find_elements(selector)
-                        if containers:
-                            message_container = containers[0]
-                            logger.debug(f"找到消息容器: {selector}")
-                            break
-                    except Exception:
-                        continue
+                containers = self._find_elements_cached("message_container", _MESSAGE_CONTAINER_SELECTORS)
+                if containers:
+                    message_container = containers[0]
+                    logger.debug("找到消息容器")
 
                 # 滚动到顶部加载历史消息
                 if message_container:
                     for _ in range(3):  # 滚动3次尝试加载更多历史消息
-                        self.browser.driver.execute_script(
-                            "arguments[0].scrollTop = 0;",
-                            message_container
-                        )
-                        time.sleep(1)
+                        previous_height = message_container.get_property("scrollHeight")
+                        self.browser.execute_pinned_script(_SCROLL_TO_TOP_JS, message_container)
+                        # 有更早的消息加载进来时容器高度会变化；1秒内没有变化说明没有更多历史消息
+                        if not self.browser.wait_until(
+                                lambda _, h=previous_height: message_container.get_property("scrollHeight") != h,
+                                timeout=1,
+                        ):
+                            break
                     logger.debug("✓ 完成历史消息滚动加载")
             except Exception as e:
-                logger.debug(f"滚动加载历史消息失败: {str(e)}")
-
-            # 获取所有消息元素
-            logger.debug("获取消息元素...")
-            message_elements = []
-
-            # 尝试多个可能的消息选择器
-            message_selectors = [
-                ".message-item",
-                ".chat-message",
-                "[class*='message-item']",
-                "[class*='chat-message']",
-                ".message",
-                "[class*='message']",
-            ]
-
-            for selector in message_selectors:
-                try:
-                    elements = self.browser.find_elements(selector)
-                    if elements:
-                        # 过滤掉非消息元素（如系统提示等）
-                        message_elements = [
-                            elem for elem in elements
-                            if elem.is_displayed()
-                        ]
-                        if message_elements:
-                            logger.debug(f"使用选择器 '{selector}' 找到 {len(message_elements)} 个消息元素")
-                            break
-                except Exception as e:
-                    logger.debug(f"选择器 '{selector}' 查找失败: {str(e)}")
-                    continue
+                logger.debug("滚动加载历史消息失败: %s", e)
+
+            # 获取消息：按优先级尝试多个可能的消息选择器，过滤掉不可见的元素（如隐藏的系统提示等），
+            # 只取最新的 max_messages 条；查找、可见性判断、变化检测和读取快照在页面内一次完成
+            logger.debug("获取消息快照...")
+            cached = self._chat_message_cache.get(contact_id)
+            try:
+                selector, total, signature, snapshots = self.browser.execute_pinned_script(
+                    _COLLECT_CHAT_SNAPSHOTS_JS,
+                    self._ordered_selectors("chat_message", _CHAT_MESSAGE_SELECTORS),
+                    max_messages,
+                    _CHAT_FIELD_SELECTORS,
+                    "innerText",
+                    cached[0] if cached is not None else None,
+                )
+            except Exception as e:
+                logger.debug("消息选择器查找失败: %s", e)
+                selector, total, signature, snapshots = None, 0, None, []
+            if selector:
+                self._selector_cache["chat_message"] = selector
+                logger.debug("使用选择器 '%s' 找到 %s 个消息元素", selector, total)
 
-            if not message_elements:
+            if not total:
                 logger.warning(f"未找到联系人 {contact_id} 的任何消息")
-                self.browser.driver.switch_to.default_content()
+                self._switch_frame(None)
                 return []
 
-            # 限制消息数量
-            if len(message_elements) > max_messages:
-                logger.debug(
-                    f"消息数量 ({len(message_elements)}) 超过限制 ({max_messages})，只获取最新的 {max_messages} 条")
-                message_elements = message_elements[-max_messages:]
+            if total > max_messages:
+                logger.debug("消息数量 (%s) 超过限制 (%s)，只获取最新的 %s 条", total, max_messages, max_messages)
+
+            if snapshots is None:
+                logger.info(f"✓ 聊天消息没有变化，返回缓存的 {len(cached[1])} 条消息")
+                return list(cached[1])
 
-            # 解析每个消息元素
+            # 解析每条消息
             messages = []
-            logger.debug(f"开始解析 {len(message_elements)} 条消息...")
+            logger.debug("开始解析 %s 条消息...", len(snapshots))
 
-            for idx, element in enumerate(message_elements):
+            for idx, snapshot in enumerate(snapshots):
                 try:
-                    message = self._parse_chat_message_element(element, contact_id)
+                    message = self._parse_chat_snapshot(snapshot, contact_id)
                     messages.append(message)
-                    logger.debug(f"  [{idx + 1}/{len(message_elements)}] 解析成功: {message.content[:30]}...")
+                    logger.debug("  [%s/%s] 解析成功: %s...", idx + 1, len(snapshots), message.content[:30])
                 except Exception as e:
-                    logger.warning(f"  [{idx + 1}/{len(message_elements)}] 解析失败: {str(e)}")
+                    logger.warning("  [%s/%s] 解析失败: %s", idx + 1, len(snapshots), e)
                     continue
 
             logger.info(f"✓ 成功获取 {len(messages)} 条聊天消息")
+            self._chat_message_cache[contact_id] = (signature, messages)
 
-            # 切换回主文档
-            self.browser.driver.switch_to.default_content()
-
-            return messages
+            # 成功时留在聊天iframe中，后续的发送、读取可直接复用；需要主文档的方法会自行切回
+            return list(messages)
 
         except Exception as e:
             error_msg = f"获取聊天消息失败: {str(e)}"
@@ -610,20 +1157,20 @@ class MessageHandler:
 
             # 确保切换回主文档
             try:
-                self.browser.driver.switch_to.default_content()
+                self._switch_frame(None)
             except Exception:
                 pass
 
             raise MessageException(error_msg) from e
 
-    def _parse_chat_message_element(self, element: WebElement, contact_id: str) -> Message:
-        """解析聊天消息元素（内部方法）。
+    def _parse_chat_snapshot(self, snapshot: Dict, contact_id: str) -> Message:
+        """根据聊天消息元素的属性快照构造消息对象（内部方法）。
         
-        从聊天记录的消息元素中提取消息信息。
-        与 parse_message_element 类似，但针对聊天记录的DOM结构优化。
+        从聊天记录的消息快照中提取消息信息。
+        与 _parse_snapshot 类似，但针对聊天记录的DOM结构优化。
         
         Args:
-            element: 消息DOM元素
+            snapshot: _COLLECT_CHAT_SNAPSHOTS_JS 返回的单个元素的属性字典（含对齐方式）
             contact_id: 当前聊天的联系人ID
             
         Returns:
@@ -633,59 +1180,13 @@ class MessageHandler:
             MessageException: 当解析失败时抛出
         """
         try:
-            # 生成消息ID
-            message_id = element.get_attribute("data-message-id")
-            if not message_id:
-                # 使用元素的其他属性生成唯一ID
-                message_id = f"{element.get_attribute('id') or ''}{element.text[:20]}{int(time.time() * 1000000)}"
-
-            # 提取消息内容
-            content = ""
-            content_selectors = [
-                ".message-content",
-                ".msg-content",
-                ".content",
-                "[class*='content']",
-                "[class*='text']",
-            ]
-
-            for selector in content_selectors:
-                try:
-                    content_element = element.find_element("css selector", selector)
-                    content = content_element.text.strip()
-                    if content:
-                        break
-                except NoSuchElementException:
-                    continue
-
-            # 如果没有找到内容元素，使用整个元素的文本
-            if not content:
-                content = element.text.strip()
-
-            # 判断是否为发送的消息
-            is_sent = False
-            element_class = element.get_attribute("class") or ""
+            content = self._snapshot_content(snapshot)
 
             # 通过CSS类名判断消息方向
-            sent_keywords = ["sent", "self", "own", "outgoing", "right", "me"]
-            received_keywords = ["received", "other", "incoming", "left"]
-
-            element_class_lower = element_class.lower()
-            if any(keyword in element_class_lower for keyword in sent_keywords):
-                is_sent = True
-            elif any(keyword in element_class_lower for keyword in received_keywords):
-                is_sent = False
-            else:
-                # 如果无法从类名判断，尝试通过元素位置判断
-                try:
-                    # 检查元素的对齐方式
-                    text_align = element.value_of_css_property("text-align")
-                    float_prop = element.value_of_css_property("float")
-
-                    if text_align == "right" or float_prop == "right":
-                        is_sent = True
-                except Exception:
-                    pass
+            is_sent = self._chat_direction(snapshot["cls"])
+            if is_sent is None:
+                # 如果无法从类名判断，通过元素的对齐方式判断（已随快照一并读取）
+                is_sent = bool(snapshot.get("alignRight"))
 
             # 提取发送者信息
             if is_sent:
@@ -698,57 +1199,17 @@ class MessageHandler:
                 sender_id = contact_id
 
                 # 尝试从元素中提取发送者名称
-                sender_selectors = [
-                    ".sender-name",
-                    ".user-name",
-                    ".name",
-                    "[class*='sender']",
-                    "[class*='username']",
-                    "[class*='name']",
-                ]
-
-                for selector in sender_selectors:
-                    try:
-                        sender_element = element.find_element("css selector", selector)
-                        sender_name = sender_element.text.strip()
-                        if sender_name:
-                            contact_name = sender_name
-                            break
-                    except NoSuchElementException:
-                        continue
-
-            # 提取时间戳
-            timestamp = datetime.now()
-            time_selectors = [
-                ".message-time",
-                ".msg-time",
-                ".time",
-                "[class*='time']",
-                "[class*='timestamp']",
-            ]
-
-            for selector in time_selectors:
-                try:
-                    time_element = element.find_element("css selector", selector)
-                    time_text = time_element.text.strip()
-                    if time_text:
-                        # 这里简化处理，实际应用中需要解析时间字符串
-                        # 例如: "10:30", "昨天 15:20" 等格式
-                        logger.debug(f"消息时间文本: {time_text}")
-                        # TODO: 实现时间字符串解析
-                        break
-                except NoSuchElementException:
-                    continue
+                sender_name = (snapshot["sender"] or "").strip()
+                if sender_name:
+                    contact_name = sender_name
 
-            # 判断消息类型
-            message_type = "text"
-            try:
-                if element.find_elements("css selector", "img, [class*='image']"):
-                    message_type = "image"
-                elif "系统消息" in content or "system" in element_class_lower:
-                    message_type = "system"
-            except Exception:
-                pass
+            # 生成消息ID，没有真实ID时使用确定性ID，同一条消息重复获取时保持不变
+            message_id = snapshot["id"]
+            if not message_id:
+                message_id = self._make_message_id(sender_id, content, snapshot["domId"], snapshot["time"])
+
+            timestamp = self._snapshot_timestamp(snapshot)
+            message_type = self._message_type(snapshot, content)
 
             message = Message(
                 message_id=message_id,
@@ -778,224 +1239,547 @@ class MessageHandler:
         
         实现消息发送功能，包含重试机制。
         修复了iframe切换和输入框定位问题。
+        开启发送去重时，距上次向同一联系人发送相同内容不足 send_dedup_window 秒的发送
+        会被跳过（记录警告日志）并直接返回True。
+        只有临时性错误会按指数退避（带随机抖动）重试；同一联系人连续失败
+        _SEND_FAILURE_THRESHOLD 次后，冷却时间内的发送直接失败。
+        发送成功后 driver 停留在聊天iframe中。
         
         Args:
             contact_id: 联系人ID
             content: 消息内容
             retry_times: 失败时的重试次数，默认2次
-            retry_delay: 重试间隔（秒），默认1秒
+            retry_delay: 首次重试前的等待时间（秒），之后每次翻倍，默认1秒
             
         Returns:
             True表示发送成功，False表示发送失败
             
         Raises:
-            MessageException: 当发送失败且重试次数用尽时抛出
+            MessageException: 当发送失败且重试次数用尽、遇到不可重试的错误
+                或该联系人的发送熔断器处于打开状态时抛出
         """
+        send_key = self._make_send_key(contact_id, content)
+        if send_key is not None and self._sent_recently(send_key):
+            logger.warning(
+                "%s 秒内已向联系人 %s 发送过相同内容，跳过本次发送", self.send_dedup_window, contact_id
+            )
+            return True
+
+        breaker = self._send_breakers.get(contact_id)
+        if breaker is None:
+            breaker = CircuitBreaker(_SEND_FAILURE_THRESHOLD, _SEND_BREAKER_TIMEOUT)
+            self._send_breakers[contact_id] = breaker
+            if len(self._send_breakers) > _SEND_BREAKERS_MAXLEN:
+                self._send_breakers.popitem(last=False)
+        else:
+            self._send_breakers.move_to_end(contact_id)
+        if not breaker.allow():
+            raise MessageException(f"联系人 {contact_id} 连续发送失败，暂停发送 {_SEND_BREAKER_TIMEOUT} 秒")
+
         # 尝试发送消息，包含重试机制
         for attempt in range(retry_times + 1):
             try:
                 if attempt > 0:
-                    logger.warning(f"第 {attempt} 次重试发送消息...")
-                    time.sleep(retry_delay)
-
-                iframe_switched = False
-                self.browser.driver.switch_to.default_content()
-
-                iframe_selector = "iframe[src*='def_cbu_web_im_core']"
+                    # 指数退避，叠加随机抖动避免多个账号同时重试
+                    delay = retry_delay * 2 ** (attempt - 1)
+                    delay += random.uniform(0, delay / 2)
+                    logger.warning("第 %s 次重试发送消息（等待 %.1f 秒）...", attempt, delay)
+                    time.sleep(delay)
 
-                chat_iframe = self.browser.wait_for_element(iframe_selector, timeout=5)
-
-                if chat_iframe:
-                    self.browser.driver.switch_to.frame(chat_iframe)
-                    iframe_switched = True
-                else:
-                    logger.warning("未找到聊天iframe，尝试在主文档中查找输入框")
-
-                if not iframe_switched:
-                    logger.error("未能切换到聊天iframe，消息发送可能失败")
-                    self.browser.driver.switch_to.default_content()
+                self._enter_chat_iframe()
 
                 logger.debug("切换到目标联系人...")
-                if not self.switch_to_chat(contact_id):
-                    logger.warning(f"无法切换到联系人 {contact_id} 的聊天窗口")
-                    # if attempt == 0:
-                    # logger.info("尝试调试联系人列表结构...")
-                    # self.debug_contact_list()
+                if not self.switch_to_chat(contact_id, enter_iframe=False):
+                    logger.warning("无法切换到联系人 %s 的聊天窗口", contact_id)
+                    # 联系人列表结构只在开启调试日志时打印，并限制频率，重试期间不重复枚举
+                    now = time.monotonic()
+                    if (logger.isEnabledFor(logging.DEBUG)
+                            and now - self._last_contact_list_dump > _CONTACT_LIST_DUMP_INTERVAL):
+                        self._last_contact_list_dump = now
+                        logger.debug("尝试调试联系人列表结构...")
+                        self.debug_contact_list()
+                        # 调试结束后停留在主文档，重新进入聊天iframe
+                        self._enter_chat_iframe()
                 else:
-                    logger.info(f"✓ 已切换到联系人 {contact_id}")
+                    logger.info("✓ 已切换到联系人 %s", contact_id)
 
-                time.sleep(1)
+                # 等待聊天窗口的输入框渲染，出现后立即继续
+                self.browser.wait_for_presence(_INPUT_ANY_SELECTOR, timeout=1)
 
                 # 检测并处理滑动验证码
-                if self.captcha_handler.detect_slider_captcha():
+                captcha_detected = self.captcha_handler.detect_slider_captcha()
+                # 验证码检测和处理会自行切换iframe，之后的当前frame未知
+                self._current_frame = _UNKNOWN_FRAME
+                if captcha_detected:
                     logger.warning("检测到滑动验证码，开始处理...")
                     if not self.captcha_handler.handle_slider_captcha():
                         logger.error("滑动验证码处理失败")
                         if attempt < retry_times:
                             continue
                         else:
-                            self.browser.driver.switch_to.default_content()
+                            self._switch_frame(None)
                             raise MessageException("滑动验证码处理失败，无法发送消息")
                     logger.info("✓ 滑动验证码处理成功")
-                    time.sleep(1)
-
-                input_selectors = [
-                    "[contenteditable='true']",
-                    "input[type='text']",
-                ]
-
-                # 搜索框关键字（用于排除）
-                search_keywords = ["搜索", "联系人", "你好", "在吗", "search", "contact"]
-
-                input_element = None
-                for selector in input_selectors:
-                    try:
-                        elements = self.browser.find_elements(selector)
-
-                        for idx, elem in enumerate(elements):
-                            try:
-                                is_displayed = elem.is_displayed()
-                                is_enabled = elem.is_enabled()
-                                placeholder = elem.get_attribute("placeholder") or ""
-
-                                is_search_box = any(kw in placeholder for kw in search_keywords)
-                                if is_search_box:
-                                    continue
-
-                                # 优先选择明确的消息输入框
-                                if is_displayed and is_enabled:
-                                    if "请输入消息" in placeholder or (
-                                            "Enter" in placeholder and "发送" in placeholder):
-                                        input_element = elem
-                                        break
-                                    elif not input_element:
-                                        # 暂存作为候选
-                                        input_element = elem
-
-                            except Exception as e:
-                                logger.debug(f"  元素[{idx}] 检查失败: {e}")
-                                continue
-
-                        # 如果找到了明确的消息输入框，停止搜索
-                        if input_element:
-                            ph = input_element.get_attribute("placeholder") or ""
-                            if "请输入消息" in ph:
-                                logger.info("✓ 确认找到消息输入框，停止搜索")
-                                break
-                    except Exception:
-                        continue
-                    try:
-                        all_inputs = self.browser.find_elements("input")
-                        all_textareas = self.browser.find_elements("textarea")
-                        all_contenteditable = self.browser.find_elements("[contenteditable='true']")
-
-                        for i, elem in enumerate(all_inputs + all_textareas + all_contenteditable):
-                            try:
-                                ph = elem.get_attribute("placeholder") or ""
-                                cls = elem.get_attribute("class") or ""
-                                vis = elem.is_displayed()
-                                ena = elem.is_enabled()
-                                if vis and ena:
-                                    # 排除搜索框
-                                    if not any(kw in ph for kw in search_keywords) and not any(
-                                            kw in cls.lower() for kw in ["search"]):
-                                        input_element = elem
-                                        break
-                            except Exception as e:
-                                logger.debug(f"  [{i}] 检查失败: {e}")
-                                continue
-                    except Exception as e:
-                        logger.error(f"重试失败: {e}")
-
-                    if not input_element:
-                        self.browser.driver.switch_to.default_content()
-                        raise MessageException("未找到消息输入框，请查看日志中的调试信息")
-
-                # 获取输入框类型
-                is_contenteditable = input_element.get_attribute("contenteditable") == "true"
-
-                if is_contenteditable:
-                    self.browser.driver.execute_script("arguments[0].innerHTML = '';", input_element)
-                    self.browser.driver.execute_script("arguments[0].textContent = '';", input_element)
-                else:
-                    input_element.clear()
+                    # 验证码关闭后等待输入框重新可用，出现后立即继续
+                    self.browser.wait_for_presence(_INPUT_ANY_SELECTOR, timeout=1)
 
-                time.sleep(1)
+                input_element, is_contenteditable, current_value = self._prepare_input(contact_id, content)
 
                 try:
-                    input_element.click()  # 先点击获得焦点
-                    time.sleep(0.3)
-                    input_element.send_keys(content)
-
-                    # 验证内容是否输入成功
-                    time.sleep(0.5)
                     if is_contenteditable:
-                        current_value = input_element.text or input_element.get_attribute("textContent") or ""
-                    else:
-                        current_value = input_element.get_attribute("value") or ""
-
-                    logger.debug(f"输入后的内容: {current_value[:50]}...")
-
-                    if content in current_value or current_value.strip():
-                        input_success = True
-                        logger.debug("✓ 方式1 (send_keys) 输入成功")
+                        # 整段文本通过一条 CDP 命令插入，驱动不支持时回退到逐字符的 send_keys；
+                        # 输入结果不在此处回读，只在发送后输入框未清空时才检查
+                        if not self.browser.insert_text(input_element, content, focus=False):
+                            input_element.click()  # 先点击获得焦点
+                            input_element.send_keys(content)
+                    elif content not in (current_value or ""):
+                        # 普通输入框已在 _prepare_input 中写入，写入结果不完整时才改用 send_keys
+                        logger.debug("输入框内容不完整，改用 send_keys 输入")
+                        input_element.clear()
+                        input_element.send_keys(content)
                 except Exception as e:
-                    logger.warning(f"(send_keys) 输入失败: {str(e)}")
-
-                # 定位并点击发送按钮
-                send_button_selectors = [
-                    "button[class*='send']",
-                    ".send-button",
-                    "[class*='btn-send']",
-                    "button[type='submit']",
-                    "span[class*='send']",
-                    "div[class*='send']",
-                ]
-
-                send_button = None
-                for selector in send_button_selectors:
-                    elements = self.browser.find_elements(selector)
-                    for elem in elements:
-                        if elem.is_displayed() and elem.is_enabled():
-                            send_button = elem
-                            break
+                    logger.warning("文本输入失败: %s", e)
 
-                    if send_button:
-                        break
-                if not send_button:
-                    from selenium.webdriver.common.keys import Keys
-                    input_element.send_keys(Keys.RETURN)
-                else:
-                    send_button.click()
+                self._click_send_button(contact_id, input_element)
 
-                # 等待一下，检查是否出现验证码
-                time.sleep(1)
+                # 等待输入框被清空（消息已发出）；未清空时才回读输入框内容，内容不完整则补救后再发送
+                if not self._wait_input_cleared(input_element, is_contenteditable, timeout=1):
+                    self._resend_uncleared_input(contact_id, input_element, content, is_contenteditable)
 
                 # 检测并处理发送后可能出现的验证码
-                if self.captcha_handler.detect_slider_captcha():
+                captcha_detected = self.captcha_handler.detect_slider_captcha()
+                # 验证码检测和处理会自行切换iframe，之后的当前frame未知
+                self._current_frame = _UNKNOWN_FRAME
+                if captcha_detected:
                     logger.warning("发送消息后出现滑动验证码，开始处理...")
                     if not self.captcha_handler.handle_slider_captcha():
                         logger.error("滑动验证码处理失败")
                         if attempt < retry_times:
-                            self.browser.driver.switch_to.default_content()
+                            self._switch_frame(None)
                             continue
                         else:
-                            self.browser.driver.switch_to.default_content()
+                            self._switch_frame(None)
                             raise MessageException("滑动验证码处理失败，消息可能未发送成功")
                     logger.info("✓ 滑动验证码处理成功")
-                    time.sleep(1)
+                    self._wait_input_cleared(input_element, is_contenteditable, timeout=1)
 
-                logger.info(f"✓ 消息发送成功: {content[:50]}...")
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("✓ 消息发送成功: %s...", content[:50])
 
-                self.browser.driver.switch_to.default_content()
+                if send_key is not None:
+                    self._remember_send(send_key)
 
+                # 发送成功，熔断器回到初始状态，不再保留
+                self._send_breakers.pop(contact_id, None)
+
+                # 成功时留在聊天iframe中，连续发送时省去切出再切入；需要主文档的方法会自行切回
                 return True
 
             except Exception as e:
-                self.browser.driver.switch_to.default_content()
-                if attempt >= retry_times:
+                self._switch_frame(None)
+                transient = isinstance(e, _TRANSIENT_SEND_EXCEPTIONS)
+                if transient and attempt < retry_times:
+                    logger.warning("发送消息出现临时错误: %s", e)
+                    continue
+
+                breaker.record_failure()
+                if transient:
                     error_msg = f"发送消息失败，已重试 {retry_times} 次: {str(e)}"
-                    logger.error(error_msg)
-                    raise MessageException(error_msg) from e
+                else:
+                    error_msg = f"发送消息失败: {str(e)}"
+                logger.error(error_msg)
+                raise MessageException(error_msg) from e
+
+    def _wait_input_cleared(self, input_element: WebElement, is_contenteditable: bool, timeout: float) -> bool:
+        """等待输入框被清空，代替发送后固定时长的等待。
+        
+        页面发出消息后会清空输入框；输入框已被移除或重新渲染时也视为已发出。
+        
+        Args:
+            input_element: 消息输入框元素
+            is_contenteditable: 输入框是否为contenteditable元素
+            timeout: 最长等待时间（秒）
+            
+        Returns:
+            True表示输入框已清空，False表示等待超时
+        """
+        def input_cleared(_driver) -> bool:
+            try:
+                text = self.browser.execute_pinned_script(_INPUT_TEXT_JS, input_element, is_contenteditable)
+            except StaleElementReferenceException:
+                return True
+            return not (text or "").strip()
+
+        return self.browser.wait_until(input_cleared, timeout, poll_frequency=0.1)
+
+    def _resend_uncleared_input(
+            self,
+            contact_id: str,
+            input_element: WebElement,
+            content: str,
+            is_contenteditable: bool
+    ) -> None:
+        """发送后输入框未清空时，回读输入框内容，内容不完整则重新写入后再发送一次。
+        
+        正常发送时输入框会被页面清空，不会走到这里，因此回读校验只在异常情况下发生。
+        内容完整时不重复点击发送（可能是验证码遮挡），交给之后的验证码检测处理。
+        
+        Args:
+            contact_id: 联系人ID
+            input_element: 消息输入框元素
+            content: 消息内容
+            is_contenteditable: 输入框是否为contenteditable元素
+        """
+        try:
+            current_value = self.browser.execute_pinned_script(
+                _INPUT_TEXT_JS, input_element, is_contenteditable
+            ) or ""
+        except StaleElementReferenceException:
+            return
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("发送后输入框未清空，当前内容: %s...", current_value[:50])
+
+        if content in current_value:
+            return
+
+        if is_contenteditable:
+            # 部分可编辑元素不响应 insertText，直接写入文本并通知页面
+            logger.debug("输入框内容不完整，改为直接写入文本")
+            self.browser.execute_pinned_script(_SET_INNER_TEXT_JS, input_element, content)
+        else:
+            logger.debug("输入框内容不完整，改用 send_keys 输入")
+            input_element.clear()
+            input_element.send_keys(content)
+
+        self._click_send_button(contact_id, input_element)
+        self._wait_input_cleared(input_element, is_contenteditable, timeout=1)
+
+    def _prepare_input(self, contact_id: str, content: str) -> Tuple[WebElement, bool, Optional[str]]:
+        """取得联系人会话的输入框，可编辑元素会被清空并获得焦点，普通输入框直接写入消息内容。
+        
+        优先复用该会话上次定位到的输入框，失效时重新查找并缓存，
+        同一次查找中找到的发送按钮一并缓存。普通输入框的旧内容在写入时直接覆盖，
+        准备和写入在同一次脚本调用中完成。
+        
+        Args:
+            contact_id: 联系人ID
+            content: 消息内容
+            
+        Returns:
+            (输入框元素, 是否为contenteditable元素, 普通输入框写入后的值（可编辑元素为None）)
+            
+        Raises:
+            BrowserException: 当找不到消息输入框时抛出（页面可能尚未就绪，可重试）
+        """
+        input_element = self._input_cache.get(contact_id)
+        if input_element is not None:
+            try:
+                # 检查可见性、读取输入框类型、清空或写入输入框，合并为一次脚本调用
+                prepared = self.browser.execute_pinned_script(_PREPARE_INPUT_JS, input_element, content)
+            except StaleElementReferenceException:
+                prepared = None
+            if prepared is None:
+                logger.debug("缓存的输入框已失效或不可见，重新查找")
+                del self._input_cache[contact_id]
+                input_element = None
+            else:
+                self._input_cache.move_to_end(contact_id)
+
+        if input_element is None:
+            input_element, send_button = self._find_send_controls()
+            if input_element is None:
+                # 按条件轮询，输入框可用后立即继续，不再等到下一次重试
+                input_element, send_button = self._wait_send_controls(_SEND_CONTROLS_WAIT)
+            if input_element is None:
+                # 诊断信息只在开启调试日志时收集
+                if logger.isEnabledFor(logging.DEBUG):
+                    from src.core._debug_helpers import debug_dump_inputs
+                    debug_dump_inputs(self)
+                self._switch_frame(None)
+                raise BrowserException("未找到消息输入框，请查看日志中的调试信息")
+            self._cache_send_control(self._input_cache, contact_id, input_element)
+            if send_button is not None:
+                self._cache_send_control(self._send_button_cache, contact_id, send_button)
+            prepared = self.browser.execute_pinned_script(_PREPARE_INPUT_JS, input_element, content) or [False, ""]
+
+        is_contenteditable, current_value = prepared
+        return input_element, bool(is_contenteditable), current_value
+
+    @staticmethod
+    def _cache_send_control(cache: OrderedDict, contact_id: str, element: WebElement) -> None:
+        """缓存联系人会话的输入框或发送按钮，超过容量时淘汰最久未使用的联系人。
+        
+        Args:
+            cache: 输入框或发送按钮的LRU缓存
+            contact_id: 联系人ID
+            element: 要缓存的元素
+        """
+        cache[contact_id] = element
+        cache.move_to_end(contact_id)
+        if len(cache) > _SEND_CONTROLS_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    def _click_send_button(self, contact_id: str, input_element: WebElement) -> None:
+        """点击联系人会话的发送按钮，找不到按钮时在输入框中按回车发送。
+        
+        优先复用该会话上次定位到的按钮，失效或不可点击时重新查找并缓存。
+        
+        Args:
+            contact_id: 联系人ID
+            input_element: 消息输入框元素
+        """
+        send_button = self._send_button_cache.get(contact_id)
+        if send_button is not None:
+            try:
+                send_button.click()
+                self._send_button_cache.move_to_end(contact_id)
+                return
+            except (StaleElementReferenceException, ElementNotInteractableException):
+                logger.debug("缓存的发送按钮已失效，重新查找")
+                del self._send_button_cache[contact_id]
+
+        # 全部候选选择器在页面内一次筛选完成
+        send_button = self.browser.execute_pinned_script(_FIND_SEND_BUTTON_JS, _SEND_BUTTON_SELECTORS)
+        if not send_button:
+            from selenium.webdriver.common.keys import Keys
+            input_element.send_keys(Keys.RETURN)
+            return
+
+        self._cache_send_control(self._send_button_cache, contact_id, send_button)
+        send_button.click()
+
+    def _find_send_controls(self) -> Tuple[Optional[WebElement], Optional[WebElement]]:
+        """在当前frame中查找消息输入框和发送按钮。
+        
+        可见性、可用状态和 placeholder 的筛选都在页面内完成，
+        两个元素的查找只需一次脚本调用，不再逐个元素往返查询。
+        
+        Returns:
+            (消息输入框, 发送按钮)，未找到的元素为None
+        """
+        input_element, placeholder, send_button = self.browser.execute_pinned_script(
+            _FIND_SEND_CONTROLS_JS,
+            _INPUT_SELECTORS,
+            _INPUT_FALLBACK_SELECTORS,
+            _SEND_BUTTON_SELECTORS,
+        )
+        if "请输入消息" in placeholder:
+            logger.info("✓ 确认找到消息输入框")
+        return input_element, send_button
+
+    def _wait_send_controls(self, timeout: float) -> Tuple[Optional[WebElement], Optional[WebElement]]:
+        """等待消息输入框变为可用，每次轮询都在页面内完成一次完整查找。
+        
+        Args:
+            timeout: 最长等待时间（秒）
+            
+        Returns:
+            (消息输入框, 发送按钮)，超时仍未找到输入框时输入框为None
+        """
+        controls: Tuple[Optional[WebElement], Optional[WebElement]] = (None, None)
+
+        def input_ready(_) -> bool:
+            nonlocal controls
+            controls = self._find_send_controls()
+            return controls[0] is not None
+
+        self.browser.wait_until(input_ready, timeout=timeout)
+        return controls
+
+    def _scroll_and_click(self, element: WebElement) -> None:
+        """滚动到元素并在页面内点击，一次脚本调用完成，不需要等待滚动结束。
+        
+        Args:
+            element: 要点击的元素
+        """
+        self.browser.execute_pinned_script(_SCROLL_AND_CLICK_JS, element)
+
+    def _switch_frame(self, frame: Optional[WebElement]) -> None:
+        """切换到指定的frame，已处于该frame时不发送任何命令。
+        
+        Args:
+            frame: 目标iframe元素，None表示主文档
+        """
+        if frame is self._current_frame:
+            return
 
-        return False
+        if frame is None or self._current_frame is not None:
+            self.browser.driver.switch_to.default_content()
+            self._current_frame = None
+        if frame is not None:
+            self.browser.driver.switch_to.frame(frame)
+            self._current_frame = frame
+
+    def _enter_chat_iframe(self, timeout: int = 5) -> None:
+        """切换到聊天iframe。
+        
+        优先使用缓存的iframe元素，已处于该iframe时不发送任何命令；
+        缓存失效时重新查找并缓存，iframe有 id 时下次优先按 id 查找。
+        
+        Args:
+            timeout: 查找iframe的超时时间（秒）
+            
+        Raises:
+            BrowserException: 当等待iframe超时时抛出
+        """
+        if self._chat_iframe is not None:
+            try:
+                self._switch_frame(self._chat_iframe)
+                return
+            except (StaleElementReferenceException, NoSuchFrameException):
+                logger.debug("缓存的聊天iframe已失效，重新查找")
+                self._chat_iframe = None
+                self._current_frame = _UNKNOWN_FRAME
+
+        self._switch_frame(None)
+        chat_iframe = None
+        if self._chat_iframe_id:
+            # 按上次记录的 id 直接定位，省去按 src 子串逐个匹配iframe
+            matches = self.browser.driver.find_elements("id", self._chat_iframe_id)
+            chat_iframe = matches[0] if matches else None
+        if chat_iframe is None:
+            chat_iframe = self.browser.wait_for_element(_CHAT_IFRAME_SELECTOR, timeout=timeout)
+            self._chat_iframe_id = chat_iframe.get_attribute("id") or None
+        self._switch_frame(chat_iframe)
+        self._chat_iframe = chat_iframe
+        # iframe重新加载后，其中缓存的元素都已失效
+        self._input_cache.clear()
+        self._send_button_cache.clear()
+
+    def _ordered_selectors(self, key: str, selectors: List[str]) -> List[str]:
+        """将该调用点上次命中的选择器排到最前面。
+        
+        Args:
+            key: 调用点名称
+            selectors: 按默认优先级排列的选择器列表
+            
+        Returns:
+            调整顺序后的选择器列表
+        """
+        cached = self._selector_cache.get(key)
+        if cached is None or cached not in selectors:
+            return selectors
+        return [cached] + [selector for selector in selectors if selector != cached]
+
+    def _drain_added_messages(self, key: str) -> Optional[List[Dict]]:
+        """读取页面内 MutationObserver 记录的新增消息快照。
+        
+        观察器以该调用点上次完整扫描命中的选择器安装。还没有完成过完整扫描，
+        或观察器刚刚（重新）安装时返回None，调用方应改做完整扫描。
+        
+        Args:
+            key: 调用点名称
+            
+        Returns:
+            新增消息的快照列表，无法使用观察器时返回None
+        """
+        if not self._drain_ready(key):
+            return None
+
+        return self.browser.cdp_extract(
+            _DRAIN_ADDED_MESSAGES_JS, self._selector_cache[key], _FIELD_SELECTORS, "textContent"
+        )
+
+    def _drain_ready(self, key: str) -> bool:
+        """该调用点是否已完成过完整扫描，可以安装或使用新增消息观察器。
+        
+        Args:
+            key: 调用点名称
+            
+        Returns:
+            True表示已有命中的选择器和列表签名
+        """
+        return self._selector_cache.get(key) is not None and self._list_signatures.get(key) is not None
+
+    def _collect_snapshots(self, key: str, selectors: List[str]) -> Optional[List[Dict]]:
+        """按优先级查找消息元素并一次性返回全部快照，缓存命中的选择器。
+        
+        消息列表与上次调用相比没有变化（数量和最后一条消息都相同）时，
+        页面内不生成快照，直接返回None；上次最后一条消息仍在列表中时，
+        只返回它之后新增的消息快照。
+        
+        Args:
+            key: 调用点名称
+            selectors: 按默认优先级排列的选择器列表
+            
+        Returns:
+            命中的选择器对应的消息快照列表，都没有匹配则返回空列表，列表没有变化时返回None
+        """
+        # 脚本只读取数据，参数和返回值都是纯JSON，直接走 CDP 省去 WebDriver 命令封装
+        selector, snapshots, signature, last_id = self.browser.cdp_extract(
+            _COLLECT_MESSAGE_SNAPSHOTS_JS,
+            self._ordered_selectors(key, selectors),
+            _FIELD_SELECTORS,
+            "textContent",
+            self._list_signatures.get(key),
+            self._list_anchors.get(key),
+        )
+        self._list_signatures[key] = signature
+        self._list_anchors[key] = last_id
+        if snapshots is None:
+            return None
+        if selector:
+            self._selector_cache[key] = selector
+            logger.debug("选择器 '%s' 匹配到 %s 条消息", selector, len(snapshots))
+        return snapshots
+
+    def _find_elements_cached(self, key: str, selectors: List[str]) -> List[WebElement]:
+        """按优先级查找元素，并缓存命中的选择器供下次优先使用。
+        
+        Args:
+            key: 调用点名称
+            selectors: 按默认优先级排列的选择器列表
+            
+        Returns:
+            命中的选择器对应的元素列表，都没有匹配则返回空列表
+        """
+        selector, elements = self.browser.find_first_matching(self._ordered_selectors(key, selectors))
+        if selector:
+            self._selector_cache[key] = selector
+        return elements
+
+    def _make_send_key(self, contact_id: str, content: str) -> Optional[Tuple[str, bytes]]:
+        """生成发送去重键。
+        
+        Args:
+            contact_id: 联系人ID
+            content: 消息内容
+            
+        Returns:
+            (联系人ID, 内容摘要) 元组，去重关闭时返回None
+        """
+        if self.send_dedup_window <= 0:
+            return None
+
+        digest = hashlib.blake2b(content.encode("utf-8"), digest_size=8).digest()
+        return contact_id, digest
+
+    def _sent_recently(self, send_key: Tuple[str, bytes]) -> bool:
+        """判断距上次成功发送相同内容是否还不足一个去重窗口。
+        
+        Args:
+            send_key: 由 _make_send_key 生成的去重键
+            
+        Returns:
+            True表示应跳过本次发送
+        """
+        sent_at = self._recent_sends.get(send_key)
+        return sent_at is not None and time.monotonic() - sent_at < self.send_dedup_window
+
+    def _remember_send(self, send_key: Tuple[str, bytes]) -> None:
+        """记录一次成功发送的时间，并淘汰超出去重窗口或容量的最早记录。
+        
+        Args:
+            send_key: 由 _make_send_key 生成的去重键
+        """
+        now = time.monotonic()
+        self._recent_sends[send_key] = now
+        self._recent_sends.move_to_end(send_key)
+
+        cutoff = now - self.send_dedup_window
+        while self._recent_sends and (
+                len(self._recent_sends) > _RECENT_SENDS_MAXLEN
+                or next(iter(self._recent_sends.values())) <= cutoff
+        ):
+            self._recent_sends.popitem(last=False)
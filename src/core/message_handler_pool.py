@@ -0,0 +1,297 @@
+"""消息处理器池模块。
+
+将批量发送、批量读取聊天记录的任务分摊到多个独立浏览器会话的消息处理器上并行执行。
+"""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from selenium.common.exceptions import InvalidSessionIdException, NoSuchWindowException
+from urllib3.exceptions import MaxRetryError
+
+from src.core.message_handler import MessageHandler
+from src.models.message import Message
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 说明浏览器会话已不可用的异常：会话已失效、浏览器窗口已关闭，或与驱动进程的连接已断开
+_SESSION_ERRORS = (InvalidSessionIdException, NoSuchWindowException, MaxRetryError, ConnectionError)
+
+
+def _is_session_error(error: Optional[BaseException]) -> bool:
+    """沿异常链判断错误是否由浏览器会话不可用引起。
+    
+    MessageHandler 会把底层异常包装为 MessageException 再抛出，
+    因此需要检查 __cause__ / __context__ 上的原始异常。
+    
+    Args:
+        error: 捕获到的异常
+        
+    Returns:
+        True表示浏览器会话已不可用
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, _SESSION_ERRORS):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class MessageHandlerPool:
+    """消息处理器池类。
+    
+    每个消息处理器绑定一个独立的浏览器会话（WebDriver不是线程安全的），
+    同一时刻只会被一个线程使用。发送和读取聊天记录都可以分摊到各会话并行执行。处理器在首次需要时通过工厂函数按需创建，
+    最多创建 size 个。使用过程中浏览器会话不可用（会话失效、窗口关闭、驱动连接断开，
+    包括被包装在 MessageException 中的情况）的处理器会被关闭并移出池，下次需要时重新创建；
+    发送失败、联系人不存在、元素等待超时等错误只视为本次操作失败。
+    
+    WebDriver 命令在等待浏览器响应时会释放GIL，各会话又彼此独立，
+    因此使用线程即可重叠各会话的等待时间，不需要多进程。
+    
+    Examples:
+        >>> def create_handler():
+        ...     rpa = WangWangRPA(config_path="config/config.yaml")
+        ...     rpa.start()
+        ...     return rpa.message_handler
+        >>> pool = MessageHandlerPool(create_handler, size=3)
+        >>> results = pool.send_many([("联系人A", "你好"), ("联系人B", "在吗")])
+        >>> pool.close()
+    
+    Attributes:
+        size: 处理器（浏览器会话）的最大数量
+    """
+
+    def __init__(self, handler_factory: Callable[[], MessageHandler], size: int = 2):
+        """初始化消息处理器池。
+        
+        Args:
+            handler_factory: 创建消息处理器的工厂函数，返回的处理器需已启动浏览器并打开聊天页面
+            size: 处理器的最大数量，默认2
+        """
+        if size < 1:
+            raise ValueError("处理器池大小必须大于0")
+
+        self.size = size
+        self._handler_factory = handler_factory
+        self._handlers: List[MessageHandler] = []
+        self._idle: "queue.Queue[MessageHandler]" = queue.Queue()
+        # 正在创建中的处理器数量，创建前先在锁内占位，避免并发时超出 size
+        self._creating = 0
+        # 保护 _handlers 和 _creating；工厂函数（启动浏览器、登录）在锁外执行
+        self._lock = threading.Lock()
+
+        logger.info(f"消息处理器池初始化完成 - 最大会话数: {size}")
+
+    def _acquire(self) -> MessageHandler:
+        """取得一个空闲的处理器，没有空闲且未达上限时创建新的处理器。
+        
+        Returns:
+            独占使用的消息处理器
+        """
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                reserved = len(self._handlers) + self._creating < self.size
+                if reserved:
+                    self._creating += 1
+
+            if reserved:
+                # 多个会话可以同时启动，互不等待
+                try:
+                    handler = self._handler_factory()
+                except Exception:
+                    with self._lock:
+                        self._creating -= 1
+                    raise
+                with self._lock:
+                    self._creating -= 1
+                    self._handlers.append(handler)
+                    count = len(self._handlers)
+                logger.info(f"创建新的消息处理器，当前数量: {count}")
+                return handler
+
+            # 已达上限，等待其他线程归还；期间有处理器被移除时重新检查能否创建新的处理器
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    def _release(self, handler: MessageHandler, failed: bool = False) -> None:
+        """归还处理器。
+        
+        处理器的浏览器会话出错时，会话可能已不可用，关闭并移出池。
+        
+        Args:
+            handler: 使用完毕的消息处理器
+            failed: 使用过程中浏览器会话是否出错，默认False
+        """
+        if failed:
+            self._discard(handler)
+            return
+
+        self._idle.put(handler)
+
+    def _discard(self, handler: MessageHandler) -> None:
+        """关闭处理器的浏览器并将其移出池。
+        
+        Args:
+            handler: 要移除的消息处理器
+        """
+        with self._lock:
+            if handler in self._handlers:
+                self._handlers.remove(handler)
+        logger.info(f"移除会话出错的消息处理器，当前数量: {len(self._handlers)}")
+        handler.browser.stop()
+
+    def send(self, contact_id: str, content: str, retry_times: int = 2, retry_delay: int = 1) -> bool:
+        """使用池中的一个处理器发送消息。
+        
+        Args:
+            contact_id: 联系人ID
+            content: 消息内容
+            retry_times: 失败时的重试次数，默认2次
+            retry_delay: 首次重试前的等待时间（秒），默认1秒
+        
+        Returns:
+            True表示发送成功，False表示发送失败
+        """
+        try:
+            handler = self._acquire()
+        except Exception as e:
+            logger.error(f"创建消息处理器失败: {str(e)}")
+            return False
+
+        failed = False
+        try:
+            return handler.send_message(contact_id, content, retry_times=retry_times, retry_delay=retry_delay)
+        except Exception as e:
+            failed = _is_session_error(e)
+            if failed:
+                logger.error(f"浏览器会话出错 - 联系人: {contact_id}, 错误: {str(e)}")
+            else:
+                logger.error(f"发送消息失败 - 联系人: {contact_id}, 错误: {str(e)}")
+            return False
+        finally:
+            self._release(handler, failed=failed)
+
+    def send_many(
+            self,
+            contact_messages: Sequence[Tuple[str, str]],
+            retry_times: int = 2,
+            retry_delay: int = 1
+    ) -> List[bool]:
+        """并行发送多条消息。
+        
+        Args:
+            contact_messages: (联系人ID, 消息内容) 列表
+            retry_times: 每条消息失败时的重试次数，默认2次
+            retry_delay: 首次重试前的等待时间（秒），默认1秒
+        
+        Returns:
+            与输入顺序一致的发送结果列表
+        """
+        if not contact_messages:
+            return []
+
+        workers = min(self.size, len(contact_messages))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="message-sender") as executor:
+            results = list(executor.map(
+                lambda pair: self.send(pair[0], pair[1], retry_times, retry_delay),
+                contact_messages,
+            ))
+
+        logger.info(f"批量发送完成 - 成功: {sum(results)}/{len(results)}")
+        return results
+
+    def get_chat_messages(self, contact_id: str, max_messages: int = 100) -> List[Message]:
+        """使用池中的一个处理器获取与指定联系人的聊天消息。
+        
+        Args:
+            contact_id: 联系人ID或联系人名称
+            max_messages: 最多获取的消息数量，默认100条
+        
+        Returns:
+            消息列表，获取失败时返回空列表
+        """
+        try:
+            handler = self._acquire()
+        except Exception as e:
+            logger.error(f"创建消息处理器失败: {str(e)}")
+            return []
+
+        failed = False
+        try:
+            return handler.get_chat_messages(contact_id, max_messages=max_messages)
+        except Exception as e:
+            failed = _is_session_error(e)
+            if failed:
+                logger.error(f"浏览器会话出错 - 联系人: {contact_id}, 错误: {str(e)}")
+            else:
+                logger.error(f"获取聊天消息失败 - 联系人: {contact_id}, 错误: {str(e)}")
+            return []
+        finally:
+            self._release(handler, failed=failed)
+
+    def get_chat_messages_many(
+            self,
+            contact_ids: Sequence[str],
+            max_messages: int = 100
+    ) -> Dict[str, List[Message]]:
+        """并行获取多个联系人的聊天消息。
+        
+        读取聊天记录的耗时主要在等待浏览器响应上，各会话同时读取不同联系人，
+        总耗时接近单个联系人的耗时乘以 联系人数/会话数。
+        同一个会话内的命令仍然串行执行（WebDriver 会话不支持并发命令）。
+        
+        Args:
+            contact_ids: 联系人ID或名称列表
+            max_messages: 每个联系人最多获取的消息数量，默认100条
+        
+        Returns:
+            联系人ID到消息列表的字典，获取失败的联系人对应空列表
+        """
+        if not contact_ids:
+            return {}
+
+        workers = min(self.size, len(contact_ids))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="message-reader") as executor:
+            results = list(executor.map(
+                lambda contact_id: self.get_chat_messages(contact_id, max_messages),
+                contact_ids,
+            ))
+
+        logger.info(f"批量读取聊天记录完成 - 联系人数: {len(contact_ids)}")
+        return dict(zip(contact_ids, results))
+
+    @property
+    def handlers(self) -> List[MessageHandler]:
+        """已创建的全部消息处理器（用于关闭浏览器等清理工作）。"""
+        with self._lock:
+            return list(self._handlers)
+
+    def close(self) -> None:
+        """关闭池中全部处理器的浏览器会话。"""
+        with self._lock:
+            handlers = list(self._handlers)
+            self._handlers.clear()
+
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+        for handler in handlers:
+            handler.browser.stop()
+
+        logger.info("消息处理器池已关闭")
@@ -3,8 +3,10 @@
 负责在多账号之间分发消息和聚合接收到的消息。
 """
 
-import queue
+import itertools
 import threading
+import uuid
+from collections import deque
 from datetime import datetime
 from typing import Dict, List, Optional
 from dataclasses import dataclass
@@ -14,11 +16,18 @@ from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 任务ID由本进程的随机前缀和自增序号组成：前缀只生成一次，
+# 之后每个任务只需取一次序号，不再每次调用 uuid4 读取系统随机数
+_TASK_ID_PREFIX = uuid.uuid4().hex[:12]
+_task_counter = itertools.count(1)
 
-@dataclass
+
+@dataclass(slots=True)
 class MessageTask:
     """消息任务数据结构。
     
+    使用 __slots__ 存储字段，持续路由时大量创建的任务对象不再各自携带 __dict__。
+    
     Attributes:
         account_id: 目标账号ID
         contact_id: 联系人ID
@@ -39,8 +48,7 @@ class MessageTask:
     def __post_init__(self):
         """初始化任务ID和创建时间。"""
         if self.task_id is None:
-            import uuid
-            self.task_id = str(uuid.uuid4())
+            self.task_id = f"{_TASK_ID_PREFIX}-{next(_task_counter)}"
         if self.created_at is None:
             self.created_at = datetime.now()
 
@@ -50,6 +58,9 @@ class MessageRouter:
     
     管理多账号之间的消息分发和聚合。
     
+    队列使用 deque，每个队列配一个 Condition 负责满/空时的等待和唤醒，
+    入队、出队只需一次加锁，不再经过 queue.Queue 的多层锁和计数。
+    
     Attributes:
         send_queues: 发送消息队列字典，key为账号ID
         receive_queue: 接收消息队列（所有账号共享）
@@ -62,8 +73,11 @@ class MessageRouter:
         Args:
             max_queue_size: 队列最大大小
         """
-        self.send_queues: Dict[str, queue.Queue] = {}
-        self.receive_queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self.send_queues: Dict[str, deque] = {}
+        # 各发送队列的条件变量，key为账号ID
+        self._send_conditions: Dict[str, threading.Condition] = {}
+        self.receive_queue: deque = deque()
+        self._receive_condition = threading.Condition()
         self.max_queue_size = max_queue_size
         self._lock = threading.Lock()
         
@@ -77,7 +91,8 @@ class MessageRouter:
         """
         with self._lock:
             if account_id not in self.send_queues:
-                self.send_queues[account_id] = queue.Queue(maxsize=self.max_queue_size)
+                self.send_queues[account_id] = deque()
+                self._send_conditions[account_id] = threading.Condition()
                 logger.info(f"为账号 {account_id} 创建发送队列")
             else:
                 logger.warning(f"账号 {account_id} 的发送队列已存在")
@@ -90,14 +105,12 @@ class MessageRouter:
         """
         with self._lock:
             if account_id in self.send_queues:
-                # 清空队列
-                try:
-                    while not self.send_queues[account_id].empty():
-                        self.send_queues[account_id].get_nowait()
-                except queue.Empty:
-                    pass
-                
-                del self.send_queues[account_id]
+                # 清空队列，并唤醒因队列已满而等待的生产者
+                send_queue = self.send_queues.pop(account_id)
+                condition = self._send_conditions.pop(account_id)
+                with condition:
+                    send_queue.clear()
+                    condition.notify_all()
                 logger.info(f"账号 {account_id} 的发送队列已清理")
             else:
                 logger.warning(f"账号 {account_id} 的发送队列不存在")
@@ -124,7 +137,9 @@ class MessageRouter:
         Returns:
             True表示成功加入队列，False表示失败
         """
-        if account_id not in self.send_queues:
+        send_queue = self.send_queues.get(account_id)
+        condition = self._send_conditions.get(account_id)
+        if send_queue is None or condition is None:
             logger.error(f"账号 {account_id} 未注册")
             return False
         
@@ -136,17 +151,22 @@ class MessageRouter:
             retry_delay=retry_delay
         )
         
-        try:
-            if timeout is None:
-                self.send_queues[account_id].put(task)
-            else:
-                self.send_queues[account_id].put(task, timeout=timeout)
-            
-            logger.debug(f"消息任务已加入队列 - 账号: {account_id}, 联系人: {contact_id}")
-            return True
-        except queue.Full:
-            logger.error(f"账号 {account_id} 的发送队列已满")
-            return False
+        with condition:
+            # 队列已满时等待消费者取走任务；等待期间账号被注销也会被唤醒
+            if not condition.wait_for(
+                    lambda: len(send_queue) < self.max_queue_size or not self._registered(account_id, send_queue),
+                    timeout
+            ):
+                logger.error(f"账号 {account_id} 的发送队列已满")
+                return False
+            if not self._registered(account_id, send_queue):
+                logger.error(f"账号 {account_id} 已注销")
+                return False
+            send_queue.append(task)
+            condition.notify_all()
+        
+        logger.debug("消息任务已加入队列 - 账号: %s, 联系人: %s", account_id, contact_id)
+        return True
     
     def get_send_task(self, account_id: str, timeout: Optional[float] = 1.0) -> Optional[MessageTask]:
         """从指定账号的发送队列获取消息任务。
@@ -158,15 +178,34 @@ class MessageRouter:
         Returns:
             消息任务对象，如果队列为空则返回None
         """
-        if account_id not in self.send_queues:
+        send_queue = self.send_queues.get(account_id)
+        condition = self._send_conditions.get(account_id)
+        if send_queue is None or condition is None:
             logger.error(f"账号 {account_id} 未注册")
             return None
         
-        try:
-            task = self.send_queues[account_id].get(timeout=timeout)
+        with condition:
+            # 等待期间账号被注销时同样返回None
+            if not condition.wait_for(
+                    lambda: send_queue or not self._registered(account_id, send_queue), timeout
+            ) or not send_queue:
+                return None
+            task = send_queue.popleft()
+            # 唤醒因队列已满而等待的生产者
+            condition.notify_all()
             return task
-        except queue.Empty:
-            return None
+    
+    def _registered(self, account_id: str, send_queue: deque) -> bool:
+        """判断发送队列是否仍是该账号当前注册的队列。
+        
+        Args:
+            account_id: 账号ID
+            send_queue: 调用方之前取得的发送队列
+            
+        Returns:
+            True表示账号仍使用该队列，False表示账号已注销（或注销后重新注册）
+        """
+        return self.send_queues.get(account_id) is send_queue
     
     def receive_message(self, message: Message, account_id: str) -> bool:
         """接收消息并加入接收队列。
@@ -178,39 +217,41 @@ class MessageRouter:
         Returns:
             True表示成功加入队列，False表示失败
         """
-        try:
-            # 在消息中添加账号信息
-            if not hasattr(message, 'account_id'):
-                message.account_id = account_id
-            
-            self.receive_queue.put_nowait(message)
-            logger.debug(f"收到消息 - 账号: {account_id}, 联系人: {message.contact_name}")
-            return True
-        except queue.Full:
-            logger.error("接收队列已满，消息被丢弃")
-            return False
+        # 在消息中添加账号信息
+        if message.account_id is None:
+            message.account_id = account_id
+        
+        with self._receive_condition:
+            if len(self.receive_queue) >= self.max_queue_size:
+                logger.error("接收队列已满，消息被丢弃")
+                return False
+            self.receive_queue.append(message)
+            self._receive_condition.notify()
+        
+        logger.debug("收到消息 - 账号: %s, 联系人: %s", account_id, message.contact_name)
+        return True
     
     def get_received_messages(self, max_count: int = 100, timeout: float = 0.1) -> List[Message]:
         """获取接收到的消息列表。
         
+        队列为空时最多等待 timeout 秒，有消息后一次取出队列中已有的消息，
+        不再为最后一条之后的空队列多等一个超时。
+        
         Args:
             max_count: 最多获取的消息数量
-            timeout: 每次获取的超时时间（秒）
+            timeout: 队列为空时等待第一条消息的超时时间（秒）
             
         Returns:
             消息列表
         """
-        messages = []
-        
-        for _ in range(max_count):
-            try:
-                message = self.receive_queue.get(timeout=timeout)
-                messages.append(message)
-            except queue.Empty:
-                break
+        with self._receive_condition:
+            if not self._receive_condition.wait_for(lambda: self.receive_queue, timeout):
+                return []
+            count = min(max_count, len(self.receive_queue))
+            messages = [self.receive_queue.popleft() for _ in range(count)]
         
         if messages:
-            logger.debug(f"获取到 {len(messages)} 条接收消息")
+            logger.debug("获取到 %s 条接收消息", len(messages))
         
         return messages
     
@@ -221,13 +262,13 @@ class MessageRouter:
             队列状态字典
         """
         status = {
-            "receive_queue_size": self.receive_queue.qsize(),
+            "receive_queue_size": len(self.receive_queue),
             "send_queues": {}
         }
         
         for account_id, send_queue in self.send_queues.items():
             status["send_queues"][account_id] = {
-                "size": send_queue.qsize(),
+                "size": len(send_queue),
                 "max_size": self.max_queue_size
             }
         
@@ -238,18 +279,16 @@ class MessageRouter:
         logger.info("清空所有消息队列")
         
         # 清空接收队列
-        try:
-            while not self.receive_queue.empty():
-                self.receive_queue.get_nowait()
-        except queue.Empty:
-            pass
-        
-        # 清空所有发送队列
-        for account_id in list(self.send_queues.keys()):
-            try:
-                while not self.send_queues[account_id].empty():
-                    self.send_queues[account_id].get_nowait()
-            except queue.Empty:
-                pass
+        with self._receive_condition:
+            self.receive_queue.clear()
+        
+        # 清空所有发送队列，并唤醒因队列已满而等待的生产者
+        with self._lock:
+            queues = [(self.send_queues[account_id], self._send_conditions[account_id])
+                      for account_id in self.send_queues]
+        for send_queue, condition in queues:
+            with condition:
+                send_queue.clear()
+                condition.notify_all()
         
         logger.info("所有消息队列已清空")
@@ -3,13 +3,15 @@
 管理多个账号的生命周期，协调消息路由和状态监控。
 """
 
+import queue
 import time
 import multiprocessing as mp
+from collections import deque
 from datetime import datetime
 from typing import Dict, List, Optional
 from pathlib import Path
 
-from src.models.account import Account, AccountStatus
+from src.models.account import _STATUS_BY_VALUE, Account, AccountStatus
 from src.core.account_worker import account_worker_process
 from src.core.message_router import MessageRouter, MessageTask
 from src.models.message import Message
@@ -18,6 +20,9 @@ from src.utils.exceptions import WangWangRPAException
 
 logger = get_logger(__name__)
 
+# 每次更新状态时最多处理的状态报告数量（与状态队列的容量一致）
+_MAX_STATUS_BATCH = 1000
+
 
 class MultiAccountManager:
     """多账号管理器类。
@@ -43,8 +48,11 @@ class MultiAccountManager:
         self.processes: Dict[str, mp.Process] = {}
         self.send_queues: Dict[str, mp.Queue] = {}
         self.control_queues: Dict[str, mp.Queue] = {}
+        # 工作进程每轮把本轮的新消息作为一个列表整体放入，一批只需一次序列化和一次管道写入
         self.receive_queue: mp.Queue = mp.Queue(maxsize=10000)
-        self.status_queue: mp.Queue = mp.Queue(maxsize=1000)
+        # 已从接收队列取出、尚未返回给调用方的消息（一批超出 max_count 时的剩余部分）
+        self._received: deque = deque()
+        self.status_queue: mp.Queue = mp.Queue(maxsize=_MAX_STATUS_BATCH)
         
         self.message_router = MessageRouter(max_queue_size=1000)
         self.config_path = config_path
@@ -294,7 +302,6 @@ class MultiAccountManager:
             return False
         
         try:
-            from src.core.message_router import MessageTask
             task = MessageTask(
                 account_id=account_id,
                 contact_id=contact_id,
@@ -310,62 +317,69 @@ class MultiAccountManager:
             logger.error(f"发送消息失败: {str(e)}")
             return False
     
-    def get_received_messages(self, max_count: int = 100) -> List[Message]:
+    def get_received_messages(self, max_count: int = 100, timeout: float = 0) -> List[Message]:
         """获取所有账号接收到的消息。
         
+        没有待取的消息时最多等待 timeout 秒，之后只取出已经到达的消息，不再逐条等待。
+        接收队列中的每个元素是一批消息，超出 max_count 的部分留到下次返回。
+        
         Args:
             max_count: 最多获取的消息数量
+            timeout: 没有待取消息时等待第一批消息的超时时间（秒），默认0表示不等待
             
         Returns:
             消息列表
         """
-        messages = []
+        received = self._received
         
         try:
-            for _ in range(max_count):
-                try:
-                    message = self.receive_queue.get_nowait()
-                    messages.append(message)
-                except:
-                    break
+            if max_count > 0 and not received and timeout > 0:
+                received.extend(self.receive_queue.get(timeout=timeout))
+            while len(received) < max_count:
+                received.extend(self.receive_queue.get_nowait())
+        except queue.Empty:
+            pass
         except Exception as e:
             logger.error(f"获取接收消息失败: {str(e)}")
         
-        return messages
+        return [received.popleft() for _ in range(min(max_count, len(received)))]
     
     def update_status(self) -> None:
-        """更新所有账号的状态信息。"""
+        """更新所有账号的状态信息。
+        
+        每次最多处理 _MAX_STATUS_BATCH 条状态报告，队列取空（queue.Empty）时结束；
+        不使用不可靠的 mp.Queue.empty() 判断。
+        """
         try:
-            while not self.status_queue.empty():
+            for _ in range(_MAX_STATUS_BATCH):
                 try:
                     status_info = self.status_queue.get_nowait()
-                    account_id = status_info.get("account_id")
-                    
-                    if account_id in self.accounts:
-                        account = self.accounts[account_id]
-                        
-                        # 更新状态
-                        status_str = status_info.get("status")
-                        if status_str:
-                            account.status = AccountStatus(status_str)
-                        
-                        # 更新消息计数
-                        if "message_count" in status_info:
-                            account.message_count = status_info["message_count"]
-                        
-                        # 更新错误计数
-                        if "error_count" in status_info:
-                            account.error_count = status_info["error_count"]
-                        
-                        # 更新错误信息
-                        if status_str == "error" and "message" in status_info:
-                            account.last_error = status_info["message"]
-                        
-                        # 更新活跃时间
-                        account.last_active_time = datetime.now()
-                        
-                except:
+                except queue.Empty:
                     break
+                
+                account = self.accounts.get(status_info.get("account_id"))
+                if account is None:
+                    continue
+                
+                # 更新状态，未知的状态值保留原状态
+                status_str = status_info.get("status")
+                if status_str:
+                    account.status = _STATUS_BY_VALUE.get(status_str, account.status)
+                
+                # 更新消息计数
+                if "message_count" in status_info:
+                    account.message_count = status_info["message_count"]
+                
+                # 更新错误计数
+                if "error_count" in status_info:
+                    account.error_count = status_info["error_count"]
+                
+                # 更新错误信息
+                if status_str == "error" and "message" in status_info:
+                    account.last_error = status_info["message"]
+                
+                # 更新活跃时间
+                account.last_active_time = datetime.now()
         except Exception as e:
             logger.error(f"更新状态失败: {str(e)}")
     
@@ -402,9 +416,15 @@ class MultiAccountManager:
             统计信息字典
         """
         total_accounts = len(self.accounts)
-        running_accounts = sum(1 for a in self.accounts.values() if a.status == AccountStatus.RUNNING)
-        total_messages = sum(a.message_count for a in self.accounts.values())
-        total_errors = sum(a.error_count for a in self.accounts.values())
+        running_accounts = 0
+        total_messages = 0
+        total_errors = 0
+        # 一次遍历同时统计运行数、消息数和错误数
+        for account in self.accounts.values():
+            if account.status is AccountStatus.RUNNING:
+                running_accounts += 1
+            total_messages += account.message_count
+            total_errors += account.error_count
         
         return {
             "total_accounts": total_accounts,
@@ -412,6 +432,7 @@ class MultiAccountManager:
             "stopped_accounts": total_accounts - running_accounts,
             "total_messages": total_messages,
             "total_errors": total_errors,
-            "receive_queue_size": self.receive_queue.qsize(),
+            # 接收队列中的元素是批次，这里是待取消息数的下限
+            "receive_queue_size": len(self._received) + self.receive_queue.qsize(),
             "timestamp": datetime.now().isoformat()
         }
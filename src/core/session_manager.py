@@ -63,9 +63,9 @@ class SessionManager:
         """
         session = self._sessions.get(contact_id)
         if session:
-            logger.debug(f"获取会话: {session.contact_name} (ID: {contact_id})")
+            logger.debug("获取会话: %s (ID: %s)", session.contact_name, contact_id)
         else:
-            logger.debug(f"会话不存在: ID={contact_id}")
+            logger.debug("会话不存在: ID=%s", contact_id)
         return session
     
     def get_active_sessions(self) -> List[Session]:
@@ -83,7 +83,7 @@ class SessionManager:
             session for session in self._sessions.values()
             if session.is_active
         ]
-        logger.debug(f"当前活跃会话数: {len(active_sessions)}")
+        logger.debug("当前活跃会话数: %s", len(active_sessions))
         return active_sessions
     
     def update_session_activity(self, contact_id: str) -> None:
@@ -110,7 +110,7 @@ class SessionManager:
         
         session.last_activity_time = datetime.now()
         session.is_active = True
-        logger.debug(f"更新会话活跃时间: {session.contact_name} (ID: {contact_id})")
+        logger.debug("更新会话活跃时间: %s (ID: %s)", session.contact_name, contact_id)
     
     def cleanup_inactive_sessions(self, timeout: int = 1800) -> int:
         """清理超过指定时间无活动的会话。
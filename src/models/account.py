@@ -19,6 +19,10 @@ class AccountStatus(Enum):
     ERROR = "error"  # 错误状态
 
 
+# 状态值到枚举成员的映射，工作进程上报状态时按字符串直接查表，不经过 Enum.__call__
+_STATUS_BY_VALUE = {status.value: status for status in AccountStatus}
+
+
 @dataclass
 class Account:
     """账号数据模型。
@@ -5,12 +5,18 @@
 
 from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional
 
+# 有效的消息类型，每条消息创建时都要校验，定义为模块级常量避免每次重建列表
+_VALID_MESSAGE_TYPES = frozenset(("text", "image", "system"))
 
-@dataclass
+
+@dataclass(slots=True)
 class Message:
     """消息数据模型。
     
+    使用 __slots__ 存储字段，轮询时大量创建的消息对象不再各自携带 __dict__。
+    
     Attributes:
         message_id: 消息的唯一标识符
         contact_id: 联系人ID
@@ -19,6 +25,7 @@ class Message:
         message_type: 消息类型（text/image/system）
         timestamp: 消息时间戳
         is_sent: 是否为发送的消息（True表示发送，False表示接收）
+        account_id: 来源账号ID，多账号模式下由工作进程填写
     """
     
     message_id: str
@@ -28,9 +35,9 @@ class Message:
     message_type: str  # "text", "image", "system"
     timestamp: datetime
     is_sent: bool
+    account_id: Optional[str] = None
     
     def __post_init__(self):
         """验证消息类型的有效性。"""
-        valid_types = ["text", "image", "system"]
-        if self.message_type not in valid_types:
-            raise ValueError(f"消息类型必须是 {valid_types} 之一")
+        if self.message_type not in _VALID_MESSAGE_TYPES:
+            raise ValueError(f"消息类型必须是 {sorted(_VALID_MESSAGE_TYPES)} 之一")
@@ -19,6 +19,9 @@ from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 旺旺聊天页面加载完成的标志：聊天iframe或会话列表出现
+_CHAT_READY_SELECTOR = "iframe[src*='def_cbu_web_im'], .conversation-item"
+
 
 class WangWangRPA:
     """旺旺RPA主控制器类。
@@ -131,14 +134,15 @@ class WangWangRPA:
             self.browser.start()
             logger.info("浏览器启动成功")
 
+            # 在打开任何页面前注册验证码观察器，之后的验证码检测可走快速路径
+            if self.message_handler.captcha_handler.install_captcha_observer():
+                logger.debug("验证码观察器已注册")
+
             # 先导航到1688首页
             logger.info(f"正在导航到1688首页: {self.config.wangwang_home_url}")
             self.browser.navigate_to(self.config.wangwang_home_url)
             logger.info("导航成功")
 
-            # 等待页面加载
-            time.sleep(1)
-
             # 优先使用手动配置的Cookie
             cookie_loaded_successfully = False
             import os
@@ -160,7 +164,7 @@ class WangWangRPA:
                     # 导航到1688首页以应用Cookie
                     logger.info("导航到1688首页以应用Cookie...")
                     self.browser.navigate_to(self.config.wangwang_home_url)
-                    time.sleep(2)  # 等待页面加载
+                    self.browser.wait_for_page_ready(timeout=2)  # 等待页面加载，完成后立即继续
 
                     # 检查登录状态
                     logger.info("验证Cookie是否有效...")
@@ -207,7 +211,7 @@ class WangWangRPA:
                     # 这样可以避免某些安全检查
                     logger.info("导航到1688首页以应用Cookie...")
                     self.browser.navigate_to(self.config.wangwang_home_url)
-                    time.sleep(2)  # 等待页面加载
+                    self.browser.wait_for_page_ready(timeout=2)  # 等待页面加载，完成后立即继续
 
                     # 检查登录状态
                     logger.info("验证Cookie是否有效...")
@@ -238,9 +242,9 @@ class WangWangRPA:
             logger.info(f"正在导航到旺旺聊天页面: {self.config.wangwang_chat_url}")
             self.browser.navigate_to(self.config.wangwang_chat_url)
 
-            # 等待SPA应用加载完成（AIR应用需要更长的加载时间）
+            # 等待SPA应用加载完成（AIR应用需要更长的加载时间），聊天iframe或会话列表出现后立即继续
             logger.info("等待旺旺聊天页面加载...")
-            time.sleep(2)  # 等待聊天页面加载
+            self.browser.wait_for_presence(_CHAT_READY_SELECTOR, timeout=2)
 
             # 检查是否成功进入聊天页面
             current_url = self.browser.driver.current_url
@@ -270,7 +274,7 @@ class WangWangRPA:
                     try:
                         logger.info(f"尝试访问: {backup_url}")
                         self.browser.navigate_to(backup_url)
-                        time.sleep(5)  # 等待页面加载
+                        self.browser.wait_for_presence(_CHAT_READY_SELECTOR, timeout=5)
 
                         current_url = self.browser.driver.current_url
                         # 检查是否还是404页面
@@ -324,7 +328,7 @@ class WangWangRPA:
             # 导航到登录页面
             logger.info(f"正在导航到登录页面: {self.config.wangwang_login_url}")
             self.browser.navigate_to(self.config.wangwang_login_url)
-            time.sleep(2)  # 等待页面加载
+            self.browser.wait_for_page_ready(timeout=2)  # 等待页面加载，完成后立即继续
 
             logger.info("=" * 60)
             logger.info("请在浏览器中手动完成登录操作")
@@ -406,10 +410,10 @@ class WangWangRPA:
             while self.is_running:
                 try:
                     message_check_count += 1
-                    logger.debug(f"第 {message_check_count} 次检查消息...")
+                    logger.debug("第 %s 次检查消息...", message_check_count)
 
-                    # 检查新消息
-                    new_messages = self.message_handler.check_new_messages()
+                    # 等待新消息：页面内有新消息插入时立即返回，最长等待一个检查间隔
+                    new_messages = self.message_handler.wait_for_new_messages(self.config.check_interval)
 
                     if new_messages:
                         logger.info(f"收到 {len(new_messages)} 条新消息")
@@ -432,9 +436,6 @@ class WangWangRPA:
                         logger.info(f"清理完成，共清理 {cleaned_count} 个非活跃会话")
                         last_cleanup_time = now
 
-                    # 等待下一次检查
-                    time.sleep(self.config.check_interval)
-
                 except MessageException as e:
                     logger.error(f"消息处理错误: {str(e)}")
                     # 继续运行，不中断监控
@@ -484,7 +485,7 @@ class WangWangRPA:
             session.last_message_time = message.timestamp
             session.message_count += 1
             self.session_manager.update_session_activity(message.contact_id)
-            logger.debug(f"更新会话: {message.contact_name}, 消息数: {session.message_count}")
+            logger.debug("更新会话: %s, 消息数: %s", message.contact_name, session.message_count)
         else:
             # 创建新会话
             session = Session(
@@ -0,0 +1,88 @@
+"""布隆过滤器模块。
+
+提供基于位数组的布隆过滤器，用于在精确集合之前快速排除一定不存在的键。
+"""
+
+import math
+from typing import Hashable, Iterable
+
+
+class BloomFilter:
+    """布隆过滤器类。
+    
+    判断结果为"不存在"时一定不存在；为"可能存在"时需要再查询精确集合确认。
+    不支持删除，插入数量超过容量后误判率会上升，可通过 rebuild 重建。
+    
+    Attributes:
+        capacity: 设计容量（预期插入的键数量）
+        error_rate: 达到设计容量时的误判率
+        count: 已插入的键数量
+    """
+
+    def __init__(self, capacity: int = 10000, error_rate: float = 0.01):
+        """初始化布隆过滤器。
+        
+        Args:
+            capacity: 设计容量，默认10000
+            error_rate: 达到设计容量时的误判率，默认1%
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.count = 0
+
+        # 位数组大小 m = -n·ln(p) / (ln2)²，哈希函数个数 k = m/n·ln2
+        self._num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self._num_hashes = max(1, round(self._num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self._num_bits + 7) // 8)
+
+    def _positions(self, key: Hashable) -> Iterable[int]:
+        """计算键对应的位位置。
+        
+        使用双重哈希由一次 hash() 派生出 k 个位置，字符串的哈希值由解释器缓存。
+        
+        Args:
+            key: 可哈希的键
+        
+        Returns:
+            位位置的迭代器
+        """
+        h = hash(key)
+        h1 = h & 0xFFFFFFFF
+        h2 = ((h >> 32) & 0xFFFFFFFF) | 1
+        return ((h1 + i * h2) % self._num_bits for i in range(self._num_hashes))
+
+    def add(self, key: Hashable) -> None:
+        """插入键。
+        
+        Args:
+            key: 可哈希的键
+        """
+        bits = self._bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        """判断键是否可能存在。
+        
+        Args:
+            key: 可哈希的键
+        
+        Returns:
+            False表示一定不存在，True表示可能存在
+        """
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def rebuild(self, keys: Iterable[Hashable]) -> None:
+        """清空并用给定的键重建过滤器。
+        
+        精确集合淘汰旧键后调用，避免位数组逐渐饱和。
+        
+        Args:
+            keys: 当前仍需保留的键
+        """
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+        for key in keys:
+            self.add(key)
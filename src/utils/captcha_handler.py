@@ -3,8 +3,9 @@
 处理各种类型的验证码，包括滑动验证、图片验证等。
 """
 
+import re
 import time
-from typing import Optional
+from typing import Callable, Optional, Tuple
 
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.remote.webelement import WebElement
@@ -13,6 +14,256 @@ from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 在每个文档加载前注册的观察器：新增节点的 class/id 带验证码特征，
+# 或新增了地址带验证码特征的iframe时，在本窗口及所有可访问的上级窗口上设置标记；
+# 跨域frame无法直接写入顶层窗口，改为向顶层窗口 postMessage，由顶层窗口设置标记
+_CAPTCHA_OBSERVER_JS = """
+(function () {
+    var pattern = /captcha|slider|nc_wrapper|nc-container|nc_iconfont/i;
+    var framePattern = /captcha|punish|verify/i;
+    window.__autoimCaptchaSeen = false;
+    if (window === window.top) {
+        window.addEventListener('message', function (event) {
+            if (event.data === '__autoimCaptchaSeen') {
+                window.__autoimCaptchaSeen = true;
+            }
+        });
+    }
+    function mark() {
+        var w = window;
+        while (true) {
+            try {
+                w.__autoimCaptchaSeen = true;
+            } catch (e) {}
+            if (w === w.parent) {
+                break;
+            }
+            w = w.parent;
+        }
+        if (window !== window.top) {
+            window.top.postMessage('__autoimCaptchaSeen', '*');
+        }
+    }
+    function isCaptcha(node) {
+        if (node.nodeType !== 1) {
+            return false;
+        }
+        var name = (node.getAttribute('class') || '') + ' ' + (node.id || '');
+        if (pattern.test(name)) {
+            return true;
+        }
+        if (node.tagName === 'IFRAME' && framePattern.test(node.getAttribute('src') || '')) {
+            return true;
+        }
+        return node.querySelector ? node.querySelector(
+            "[class*='captcha'], [class*='slider'], .nc_wrapper, .nc-container, .nc_iconfont") !== null : false;
+    }
+    new MutationObserver(function (mutations) {
+        for (var i = 0; i < mutations.length; i++) {
+            var added = mutations[i].addedNodes;
+            for (var j = 0; j < added.length; j++) {
+                if (isCaptcha(added[j])) {
+                    mark();
+                    return;
+                }
+            }
+        }
+    }).observe(document, {childList: true, subtree: true});
+})();
+"""
+
+# 滑块元素的类名特征：nc_ 前缀区分大小写，slide/btn 不区分大小写
+_SLIDER_CLASS_RE = re.compile(r"nc_|(?i:slide|btn)")
+
+# 验证码容器的选择器，合并为一条后一次查找即可取得全部容器（同时匹配多条的元素只出现一次）
+_CAPTCHA_CONTAINER_SELECTOR = ".nc_wrapper, .nc-container, [class*='captcha'], [id*='nc_']"
+
+# 在当前frame注册状态观察器并返回就绪状态：arguments = [验证码容器选择器]
+# DOM 变化时由 MutationObserver 更新 window.__autoimFrameState，之后每次调用只读取该对象，
+# 一次往返即可取得 {captchaPresent, sliderReady, verified} 全部状态；
+# 观察器只在一次等待期间存在，等待结束后由 _CAPTCHA_FRAME_STATE_STOP_JS 断开
+_CAPTCHA_FRAME_STATE_JS = """
+var state = window.__autoimFrameState;
+if (!state) {
+    var containerSelector = arguments[0];
+    state = window.__autoimFrameState = {captchaPresent: false, sliderReady: false, verified: false};
+    var isVisible = function (el) {
+        return !!(el && (el.offsetWidth || el.offsetHeight || el.getClientRects().length));
+    };
+    var anyVisible = function (selector) {
+        return Array.prototype.some.call(document.querySelectorAll(selector), isVisible);
+    };
+    var update = function () {
+        state.captchaPresent = anyVisible(containerSelector);
+        state.sliderReady = anyVisible(".nc_iconfont, .btn_slide, span[class*='nc_'], [class*='slide']");
+        state.verified = anyVisible(".nc_ok, .nc-ok, [class*='nc_success'], [class*='nc-success']");
+    };
+    update();
+    state.observer = new MutationObserver(update);
+    state.observer.observe(document.documentElement, {
+        childList: true, subtree: true, attributes: true, attributeFilter: ['class', 'style']
+    });
+}
+return {captchaPresent: state.captchaPresent, sliderReady: state.sliderReady, verified: state.verified};
+"""
+
+# 断开当前frame的状态观察器，避免在聊天页面等长期存在的文档上持续响应每次DOM变化
+_CAPTCHA_FRAME_STATE_STOP_JS = """
+var state = window.__autoimFrameState;
+if (state) {
+    if (state.observer) {
+        state.observer.disconnect();
+    }
+    window.__autoimFrameState = null;
+}
+"""
+
+# 读取顶层窗口的验证码标记，并列出顶层访问不到内容的（跨域）iframe的地址
+# 返回 [标记, 跨域iframe的 src 列表]
+_CAPTCHA_SEEN_JS = """
+var unreachable = [];
+function collect(doc) {
+    var frames = doc.getElementsByTagName('iframe');
+    for (var i = 0; i < frames.length; i++) {
+        var child = null;
+        try {
+            child = frames[i].contentDocument;
+        } catch (e) {}
+        if (child) {
+            collect(child);
+        } else {
+            unreachable.push(frames[i].getAttribute('src') || '');
+        }
+    }
+}
+collect(document);
+return [window.__autoimCaptchaSeen === true, unreachable];
+"""
+
+# 验证码iframe地址的特征（与 _CAPTCHA_OBSERVER_JS 中的 framePattern 一致），
+# 这类iframe跨域时观察器看不到其中的内容，需要完整检测
+_CAPTCHA_FRAME_SRC_RE = re.compile(r"captcha|punish|verify", re.IGNORECASE)
+
+# 清除顶层窗口的验证码标记
+_CAPTCHA_RESET_JS = "window.__autoimCaptchaSeen = false;"
+
+# 一次性收集全部候选选择器匹配的元素及其属性：arguments = [选择器列表]（// 开头为XPath）
+# 按选择器优先级和文档顺序返回 [{element, selector, cls, id, text, width, height}]，
+# 只包含可见、可用且有尺寸的元素，由调用方按特征挑选
+_VISIBLE_CANDIDATES_JS = """
+var selectors = arguments[0], result = [];
+selectors.forEach(function (selector) {
+    var found = [];
+    try {
+        if (selector.indexOf('//') === 0) {
+            var snapshot = document.evaluate(
+                selector, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (var i = 0; i < snapshot.snapshotLength; i++) {
+                found.push(snapshot.snapshotItem(i));
+            }
+        } else {
+            found = Array.prototype.slice.call(document.querySelectorAll(selector));
+        }
+    } catch (e) {
+        return;
+    }
+    found.forEach(function (el) {
+        var rect = el.getBoundingClientRect();
+        var style = window.getComputedStyle(el);
+        if (el.disabled || !rect.width || !rect.height || style.visibility === 'hidden') {
+            return;
+        }
+        result.push({
+            element: el,
+            selector: selector,
+            cls: el.getAttribute('class') || '',
+            id: el.id || '',
+            text: el.innerText || '',
+            width: rect.width,
+            height: rect.height
+        });
+    });
+});
+return result;
+"""
+
+# 滑动验证码的特征选择器，按优先级排列（// 开头为XPath）
+_CAPTCHA_SELECTORS = [
+    # 通用滑动验证码
+    ".nc_wrapper",  # 阿里系滑动验证
+    ".nc-container",
+    "[class*='slider']",
+    "[class*='captcha']",
+    "div[class*='nc']",  # 更宽泛的nc相关元素
+    "span[class*='nc']",
+    # 文本特征
+    "//div[contains(text(), '请拖动下方滑块')]",
+    "//div[contains(text(), '拖动到最右边')]",
+    "//div[contains(text(), '滑动验证')]",
+    "//span[contains(text(), '请按住滑块')]",
+    "//div[contains(@class, 'nc')]",
+]
+
+# 滑块元素的候选选择器，按优先级排列（// 开头为XPath）
+_SLIDER_SELECTORS = [
+    ".nc_iconfont",  # 阿里系滑块图标
+    ".nc-lang-cnt",
+    "span.nc_iconfont",
+    ".slidetounlock span",
+    "[class*='slider-button']",
+    "[class*='slide-button']",
+    "[class*='slider-btn']",
+    # 通过文本查找
+    "//span[contains(@class, 'nc_iconfont')]",
+    "//div[contains(@class, 'nc')]//span[contains(@class, 'btn_slide')]",
+    "//span[contains(text(), '>>')]",
+    "//div[contains(text(), '请按住滑块')]/..//span",
+    # 更通用的选择器
+    ".nc_wrapper span",
+    ".nc-container span",
+    "#nc_1_n1z",  # 阿里验证码的ID
+]
+
+# 滑轨元素的候选选择器，按优先级排列
+_TRACK_SELECTORS = [
+    ".nc_wrapper",
+    ".nc-container",
+    "[class*='slider-track']",
+    "[class*='slide-track']",
+    ".slidetounlock",
+    "#nc_1__scale_text",  # 阿里验证码滑轨
+    "[id*='nc_'][id*='scale_text']",
+]
+
+# 验证码弹窗关闭按钮的候选选择器，按优先级排列（// 开头为XPath）
+_CLOSE_BUTTON_SELECTORS = [
+    # 通用关闭按钮
+    "button.close",
+    ".close-button",
+    ".close-btn",
+    "[class*='close']",
+    "[class*='Close']",
+    # X 图标
+    "span.close",
+    "i.close",
+    "div.close",
+    # 通过文本查找
+    "//button[contains(text(), '关闭')]",
+    "//button[contains(text(), '取消')]",
+    "//span[contains(text(), '×')]",
+    "//span[contains(text(), 'X')]",
+    "//div[contains(@class, 'close')]",
+    "//i[contains(@class, 'close')]",
+    # 阿里系验证码特定的关闭按钮
+    ".nc_close",
+    "#nc_close",
+    "[id*='close']",
+    # 弹窗遮罩层（点击遮罩层也可能关闭）
+    ".modal-mask",
+    ".overlay",
+    "[class*='mask']",
+]
+
 
 class CaptchaHandler:
     """验证码处理器类。
@@ -30,8 +281,46 @@ class CaptchaHandler:
             browser: BrowserController实例
         """
         self.browser = browser
+        # 是否已注册页面内的验证码观察器，注册后未出现验证码特征时跳过完整检测
+        self._observer_installed = False
+        # 上次找到验证码的iframe在各层中的序号（从主文档开始），下次优先直接切换，命中时省去逐个iframe扫描
+        self._captcha_iframe_path: Optional[Tuple[int, ...]] = None
         logger.info("验证码处理器初始化完成")
 
+    def install_captcha_observer(self) -> bool:
+        """注册页面内的验证码观察器。
+        
+        需要在浏览器启动后、导航到目标页面前调用，对之后加载的每个文档（包括iframe）生效。
+        注册后 detect_slider_captcha 只需读取一次标记，没有出现验证码特征的节点时
+        不再逐个选择器、逐个iframe地检测。
+        
+        Returns:
+            True表示注册成功，False表示驱动不支持CDP（检测仍按完整流程进行）
+        """
+        try:
+            self._observer_installed = self.browser.add_init_script(_CAPTCHA_OBSERVER_JS)
+        except Exception as e:
+            logger.debug(f"注册验证码观察器失败: {str(e)}")
+            self._observer_installed = False
+        return self._observer_installed
+
+    def _captcha_flag_set(self) -> bool:
+        """读取观察器设置的验证码标记。
+        
+        聊天页面等与验证码无关的跨域iframe不影响判断；
+        地址带验证码特征的跨域iframe内容不可见，视为可能出现了验证码。
+        
+        Returns:
+            True表示出现过验证码特征的节点（或无法读取标记、页面中有跨域的验证码iframe），
+            False表示没有出现过
+        """
+        try:
+            seen, unreachable = self.browser.cdp_extract(_CAPTCHA_SEEN_JS)
+        except Exception as e:
+            logger.debug(f"读取验证码标记失败: {str(e)}")
+            return True
+        return bool(seen) or any(_CAPTCHA_FRAME_SRC_RE.search(src) for src in unreachable)
+
     def detect_slider_captcha(self, check_iframes: bool = True) -> bool:
         """检测是否出现滑动验证码。
         
@@ -41,46 +330,20 @@ class CaptchaHandler:
         Returns:
             True表示检测到滑动验证码，False表示未检测到
         """
+        # 观察器没有记录到验证码特征的节点、且没有跨域的验证码iframe时，
+        # 跳过完整检测（只在最外层调用时判断）
+        if check_iframes and self._observer_installed and not self._captcha_flag_set():
+            return False
+
         try:
-            captcha_selectors = [
-                # 通用滑动验证码
-                ".nc_wrapper",  # 阿里系滑动验证
-                ".nc-container",
-                "[class*='slider']",
-                "[class*='captcha']",
-                "div[class*='nc']",  # 更宽泛的nc相关元素
-                "span[class*='nc']",
-                # 文本特征
-                "//div[contains(text(), '请拖动下方滑块')]",
-                "//div[contains(text(), '拖动到最右边')]",
-                "//div[contains(text(), '滑动验证')]",
-                "//span[contains(text(), '请按住滑块')]",
-                "//div[contains(@class, 'nc')]",
-            ]
-
-            # 先在当前上下文中检测
-            for selector in captcha_selectors:
-                try:
-                    if selector.startswith("//"):
-                        elements = self.browser.find_elements(selector, by="xpath")
-                    else:
-                        elements = self.browser.find_elements(selector)
-
-                    if elements:
-                        visible_elements = [elem for elem in elements if elem.is_displayed()]
-                        if visible_elements:
-                            logger.info(f"✓ 检测到滑动验证码: {selector} (找到 {len(visible_elements)} 个可见元素)")
-                            try:
-                                first_elem = visible_elements[0]
-                                elem_class = first_elem.get_attribute('class') or ''
-                                elem_id = first_elem.get_attribute('id') or ''
-                                logger.debug(f"验证码元素详情: class='{elem_class}', id='{elem_id}'")
-                            except Exception:
-                                pass
-                            return True
-                except Exception as e:
-                    logger.debug(f"选择器 {selector} 检测失败: {str(e)}")
-                    continue
+            # 先在当前上下文中检测，所有选择器在一次脚本调用中完成
+            try:
+                matched = self.browser.find_first_visible(_CAPTCHA_SELECTORS)
+                if matched:
+                    logger.info(f"✓ 检测到滑动验证码: {matched}")
+                    return True
+            except Exception as e:
+                logger.debug("验证码选择器检测失败: %s", e)
 
             # 如果当前上下文没找到，且允许检查iframe，则递归检查所有iframe
             if check_iframes:
@@ -88,6 +351,10 @@ class CaptchaHandler:
                 if self._detect_captcha_in_iframes():
                     return True
 
+                # 完整检测确认没有验证码（如已关闭），清除标记，之后重新走快速路径
+                if self._observer_installed:
+                    self.browser.cdp_extract(_CAPTCHA_RESET_JS)
+
             logger.debug("未检测到滑动验证码")
             return False
 
@@ -95,6 +362,34 @@ class CaptchaHandler:
             logger.debug(f"检测滑动验证码时出错: {str(e)}")
             return False
 
+    def _wait_frame_state(self, predicate: Callable[[dict], bool], timeout: float) -> bool:
+        """轮询当前frame的验证码就绪状态，代替固定时长的 sleep。
+        
+        首次轮询时在frame中注册状态观察器，之后每次轮询只需一次脚本调用读取全部状态；
+        等待结束后断开观察器，不在页面上长期保留。
+        
+        Args:
+            predicate: 接收状态字典的条件函数，返回True表示条件成立
+            timeout: 最长等待时间（秒）
+            
+        Returns:
+            True表示条件已成立，False表示等待超时或无法读取状态
+        """
+        def state_ready(_driver) -> bool:
+            state = self.browser.execute_pinned_script(_CAPTCHA_FRAME_STATE_JS, _CAPTCHA_CONTAINER_SELECTOR)
+            return bool(state) and predicate(state)
+
+        try:
+            return self.browser.wait_until(state_ready, timeout, poll_frequency=0.05)
+        except Exception as e:
+            logger.debug("读取验证码状态失败: %s", e)
+            return False
+        finally:
+            try:
+                self.browser.execute_pinned_script(_CAPTCHA_FRAME_STATE_STOP_JS)
+            except Exception as e:
+                logger.debug("断开验证码状态观察器失败: %s", e)
+
     def _detect_captcha_in_iframes(self, max_depth: int = 3, current_depth: int = 0) -> bool:
         """递归检测iframe中的验证码。
         
@@ -111,13 +406,13 @@ class CaptchaHandler:
         try:
             # 查找所有iframe
             iframes = self.browser.driver.find_elements("tag name", "iframe")
-            logger.debug(f"在深度 {current_depth} 找到 {len(iframes)} 个iframe")
+            logger.debug("在深度 %s 找到 %s 个iframe", current_depth, len(iframes))
 
             for idx, iframe in enumerate(iframes):
                 try:
                     # 切换到iframe
                     self.browser.driver.switch_to.frame(iframe)
-                    logger.debug(f"切换到iframe {idx + 1}/{len(iframes)} (深度 {current_depth})")
+                    logger.debug("切换到iframe %s/%s (深度 %s)", idx + 1, len(iframes), current_depth)
 
                     # 在当前iframe中检测验证码（不递归）
                     if self.detect_slider_captcha(check_iframes=False):
@@ -133,7 +428,7 @@ class CaptchaHandler:
                     self.browser.driver.switch_to.parent_frame()
 
                 except Exception as e:
-                    logger.debug(f"检查iframe {idx + 1} 时出错: {str(e)}")
+                    logger.debug("检查iframe %s 时出错: %s", idx + 1, e)
                     # 出错时尝试切回父级
                     try:
                         self.browser.driver.switch_to.parent_frame()
@@ -189,8 +484,8 @@ class CaptchaHandler:
                 # 关闭可能存在的多余验证码窗口
                 self._close_duplicate_captcha_windows()
 
-                # 等待验证码加载
-                time.sleep(1)
+                # 等待验证码加载，滑块出现后立即继续
+                self._wait_frame_state(lambda state: state["sliderReady"], timeout=1)
 
                 # 查找滑块元素
                 slider = self._find_slider_element()
@@ -201,28 +496,30 @@ class CaptchaHandler:
                     continue
 
                 # 获取滑块和滑轨信息
-                slider_width = slider.size['width']
-                slider_height = slider.size['height']
-                logger.debug(f"滑块尺寸: {slider_width}x{slider_height}")
+                slider_size = slider.size
+                slider_width = slider_size['width']
+                slider_height = slider_size['height']
+                logger.debug("滑块尺寸: %sx%s", slider_width, slider_height)
 
                 # 查找滑轨
-                track = self._find_track_element()
-                if track:
-                    track_width = track.size['width']
-                    logger.debug(f"滑轨宽度: {track_width}")
+                track_width = self._find_track_width()
+                if track_width:
+                    logger.debug("滑轨宽度: %s", track_width)
                     # 计算需要移动的距离（滑轨宽度 - 滑块宽度）
                     distance = track_width - slider_width
                 else:
                     # 如果找不到滑轨，使用默认距离
                     distance = 300
-                    logger.debug(f"未找到滑轨，使用默认距离: {distance}")
+                    logger.debug("未找到滑轨，使用默认距离: %s", distance)
 
                 # 执行滑动
                 success = self._perform_slide(slider, distance)
 
                 if success:
-                    # 等待验证结果
-                    time.sleep(1)
+                    # 等待验证结果，验证通过或验证码消失后立即继续
+                    self._wait_frame_state(
+                        lambda state: state["verified"] or not state["captchaPresent"], timeout=1
+                    )
 
                     # 检查是否验证成功（在当前iframe上下文中）
                     if not self.detect_slider_captcha(check_iframes=False):
@@ -249,14 +546,21 @@ class CaptchaHandler:
         self.browser.driver.switch_to.default_content()
         return False
 
-    def _switch_to_captcha_iframe(self, max_depth: int = 3, current_depth: int = 0) -> bool:
+    def _switch_to_captcha_iframe(
+            self,
+            max_depth: int = 3,
+            current_depth: int = 0,
+            path: Tuple[int, ...] = ()
+    ) -> bool:
         """切换到包含验证码的iframe。
         
-        递归查找所有iframe，找到包含验证码的iframe后切换到该iframe。
+        需从主文档开始调用。优先尝试上次找到验证码的iframe，
+        未命中时递归查找所有iframe，找到包含验证码的iframe后切换到该iframe并记住其位置。
         
         Args:
             max_depth: 最大递归深度
             current_depth: 当前递归深度
+            path: 当前frame在各层中的序号，递归时使用
             
         Returns:
             True表示成功切换到包含验证码的iframe，False表示未找到
@@ -264,31 +568,38 @@ class CaptchaHandler:
         if current_depth >= max_depth:
             return False
 
+        if current_depth == 0 and self._captcha_iframe_path is not None:
+            if self._enter_cached_captcha_iframe():
+                return True
+            self._captcha_iframe_path = None
+            self.browser.driver.switch_to.default_content()
+
         try:
             # 查找所有iframe
             iframes = self.browser.driver.find_elements("tag name", "iframe")
-            logger.debug(f"在深度 {current_depth} 找到 {len(iframes)} 个iframe")
+            logger.debug("在深度 %s 找到 %s 个iframe", current_depth, len(iframes))
 
             for idx, iframe in enumerate(iframes):
                 try:
                     # 切换到iframe
                     self.browser.driver.switch_to.frame(iframe)
-                    logger.debug(f"检查iframe {idx + 1}/{len(iframes)} (深度 {current_depth})")
+                    logger.debug("检查iframe %s/%s (深度 %s)", idx + 1, len(iframes), current_depth)
 
                     # 在当前iframe中检测验证码
                     if self.detect_slider_captcha(check_iframes=False):
                         logger.info(f"✓ 在iframe {idx + 1} (深度 {current_depth}) 中找到验证码，已切换到该iframe")
+                        self._captcha_iframe_path = path + (idx,)
                         return True
 
                     # 递归检查嵌套的iframe
-                    if self._switch_to_captcha_iframe(max_depth, current_depth + 1):
+                    if self._switch_to_captcha_iframe(max_depth, current_depth + 1, path + (idx,)):
                         return True
 
                     # 切回父级继续查找
                     self.browser.driver.switch_to.parent_frame()
 
                 except Exception as e:
-                    logger.debug(f"检查iframe {idx + 1} 时出错: {str(e)}")
+                    logger.debug("检查iframe %s 时出错: %s", idx + 1, e)
                     self.browser.driver.switch_to.parent_frame()
                     continue
 
@@ -298,112 +609,72 @@ class CaptchaHandler:
             logger.debug(f"切换到验证码iframe时出错: {str(e)}")
             return False
 
+    def _enter_cached_captcha_iframe(self) -> bool:
+        """按记住的序号逐层切换到上次找到验证码的iframe，并确认其中仍有验证码。
+        
+        Returns:
+            True表示已切换到包含验证码的iframe，False表示该位置已没有iframe或验证码
+        """
+        try:
+            for index in self._captcha_iframe_path:
+                self.browser.driver.switch_to.frame(index)
+            if self.detect_slider_captcha(check_iframes=False):
+                logger.debug("使用上次的验证码iframe位置: %s", self._captcha_iframe_path)
+                return True
+        except Exception as e:
+            logger.debug("上次的验证码iframe已失效: %s", e)
+        return False
+
     def _find_slider_element(self) -> Optional[WebElement]:
         """查找滑块元素。
         
         Returns:
             滑块元素，如果未找到则返回None
         """
-        # 常见的滑块选择器
-        slider_selectors = [
-            ".nc_iconfont",  # 阿里系滑块图标
-            ".nc-lang-cnt",
-            "span.nc_iconfont",
-            ".slidetounlock span",
-            "[class*='slider-button']",
-            "[class*='slide-button']",
-            "[class*='slider-btn']",
-            # 通过文本查找
-            "//span[contains(@class, 'nc_iconfont')]",
-            "//div[contains(@class, 'nc')]//span[contains(@class, 'btn_slide')]",
-            "//span[contains(text(), '>>')]",
-            "//div[contains(text(), '请按住滑块')]/..//span",
-            # 更通用的选择器
-            ".nc_wrapper span",
-            ".nc-container span",
-            "#nc_1_n1z",  # 阿里验证码的ID
-        ]
-
-        for selector in slider_selectors:
-            try:
-                if selector.startswith("//"):
-                    elements = self.browser.find_elements(selector, by="xpath")
-                else:
-                    elements = self.browser.find_elements(selector)
-
-                for elem in elements:
-                    try:
-                        if elem.is_displayed() and elem.is_enabled():
-                            # 检查元素是否可交互
-                            size = elem.size
-                            if size['width'] > 0 and size['height'] > 0:
-                                # 检查是否包含滑块特征
-                                elem_class = elem.get_attribute('class') or ''
-                                elem_id = elem.get_attribute('id') or ''
-                                elem_text = elem.text or ''
-
-                                # 滑块通常包含这些特征
-                                if ('nc_' in elem_class or 'nc_' in elem_id or
-                                        'slide' in elem_class.lower() or
-                                        '>>' in elem_text or
-                                        'btn' in elem_class.lower()):
-                                    logger.debug(f"找到滑块元素: {selector}, 尺寸: {size}, class: {elem_class}")
-                                    return elem
-                    except Exception:
-                        continue
-            except Exception as e:
-                logger.debug(f"选择器 {selector} 查找失败: {str(e)}")
-                continue
-
-        # 如果上面都没找到，尝试通过父容器查找
+        # 可见性、尺寸和属性在页面内一次读取，Python 侧只按特征挑选
         try:
-            logger.debug("尝试通过父容器查找滑块...")
-            nc_wrapper = self.browser.find_elements(".nc_wrapper")
-            if nc_wrapper:
-                # 在nc_wrapper内查找所有span
-                spans = nc_wrapper[0].find_elements("css selector", "span")
-                for span in spans:
-                    if span.is_displayed() and span.size['width'] > 20:
-                        span_class = span.get_attribute('class') or ''
-                        logger.debug(f"检查span: class={span_class}, size={span.size}")
-                        # 查找可拖动的span
-                        if 'nc_' in span_class or 'btn' in span_class.lower():
-                            logger.debug(f"通过父容器找到滑块: {span_class}")
-                            return span
-                        continue
+            candidates = self.browser.execute_pinned_script(_VISIBLE_CANDIDATES_JS, _SLIDER_SELECTORS)
         except Exception as e:
-            logger.debug(f"通过父容器查找失败: {str(e)}")
-
+            logger.debug(f"收集滑块候选元素失败: {str(e)}")
+            candidates = []
+
+        for candidate in candidates:
+            elem_class = candidate["cls"]
+            elem_id = candidate["id"]
+
+            # 滑块通常包含这些特征
+            if (_SLIDER_CLASS_RE.search(elem_class) or 'nc_' in elem_id or
+                    '>>' in candidate["text"]):
+                logger.debug(
+                    f"找到滑块元素, 尺寸: {candidate['width']}x{candidate['height']}, class: {elem_class}"
+                )
+                return candidate["element"]
+
+        # 父容器 .nc_wrapper 内的 span 已包含在候选选择器中（".nc_wrapper span"），
+        # 其类名特征也由 _SLIDER_CLASS_RE 覆盖，不再逐个 span 查询可见性、尺寸和类名
         return None
 
-    def _find_track_element(self) -> Optional[WebElement]:
-        """查找滑轨元素。
+    def _find_track_width(self) -> Optional[int]:
+        """查找滑轨元素并返回其宽度。
+        
+        全部候选选择器在页面内一次查询，按选择器优先级取第一个可见元素，
+        不再逐个选择器查找、逐个元素判断可见性和读取尺寸。
         
         Returns:
-            滑轨元素，如果未找到则返回None
+            滑轨宽度（像素），如果未找到则返回None
         """
-        track_selectors = [
-            ".nc_wrapper",
-            ".nc-container",
-            "[class*='slider-track']",
-            "[class*='slide-track']",
-            ".slidetounlock",
-            "#nc_1__scale_text",  # 阿里验证码滑轨
-            "[id*='nc_'][id*='scale_text']",
-        ]
-
-        for selector in track_selectors:
-            try:
-                elements = self.browser.find_elements(selector)
-                for elem in elements:
-                    if elem.is_displayed():
-                        size = elem.size
-                        logger.debug(f"找到滑轨元素: {selector}, 宽度: {size['width']}px")
-                        return elem
-            except Exception:
-                continue
+        try:
+            candidates = self.browser.execute_pinned_script(_VISIBLE_CANDIDATES_JS, _TRACK_SELECTORS)
+        except Exception as e:
+            logger.debug("查找滑轨元素失败: %s", e)
+            return None
 
-        return None
+        if not candidates:
+            return None
+
+        track = candidates[0]
+        logger.debug("找到滑轨元素: %s, 宽度: %spx", track["selector"], track["width"])
+        return int(track["width"])
 
     def _perform_slide(self, slider: WebElement, distance: int) -> bool:
         """执行滑动操作。
@@ -425,7 +696,7 @@ class CaptchaHandler:
 
             # 获取滑块初始位置
             start_location = slider.location
-            logger.debug(f"滑块初始位置: {start_location}")
+            logger.debug("滑块初始位置: %s", start_location)
 
             # 创建动作链
             actions = ActionChains(self.browser.driver)
@@ -440,7 +711,7 @@ class CaptchaHandler:
 
             # 生成滑动轨迹
             tracks = self._generate_tracks(distance)
-            logger.debug(f"生成轨迹点数: {len(tracks)}, 总距离: {sum(tracks)}px")
+            logger.debug("生成轨迹点数: %s, 总距离: %spx", len(tracks), sum(tracks))
 
             # 按照轨迹移动(极速，几乎无延迟)
             for i, track in enumerate(tracks):
@@ -448,20 +719,20 @@ class CaptchaHandler:
                     actions.move_by_offset(track, 0).perform()
                     # 不添加延迟，直接连续移动
                 except Exception as e:
-                    logger.debug(f"轨迹点 {i} 移动失败: {str(e)}")
+                    logger.debug("轨迹点 %s 移动失败: %s", i, e)
                     continue
 
             # 不添加抖动，直接释放
             # 释放滑块
             time.sleep(0.05)  # 极短停顿
             actions.release().perform()
-            time.sleep(0.3)  # 等待验证结果
+            # 验证结果由调用方轮询页面状态等待，这里不再固定等待
 
             # 验证滑动距离
             try:
                 end_location = slider.location
                 actual_distance = end_location['x'] - start_location['x']
-                logger.debug(f"滑块最终位置: {end_location}, 实际移动距离: {actual_distance}px")
+                logger.debug("滑块最终位置: %s, 实际移动距离: %spx", end_location, actual_distance)
 
                 if actual_distance < distance * 0.8:
                     logger.warning(f"滑动距离不足: 目标{distance}px, 实际{actual_distance}px")
@@ -519,10 +790,10 @@ class CaptchaHandler:
         total = sum(tracks)
         if total < distance:
             remaining = distance - total
-            logger.debug(f"补充剩余距离: {remaining}px")
+            logger.debug("补充剩余距离: %spx", remaining)
             tracks.append(remaining)
 
-        logger.debug(f"生成轨迹: {len(tracks)}个点, 总距离: {sum(tracks)}px")
+        logger.debug("生成轨迹: %s个点, 总距离: %spx", len(tracks), sum(tracks))
         return tracks
 
     def wait_for_captcha_disappear(self, timeout: int = 10) -> bool:
@@ -565,107 +836,62 @@ class CaptchaHandler:
             if not captcha_found:
                 logger.debug("未找到包含验证码的iframe，尝试在主页面查找关闭按钮")
             
-            # 常见的关闭按钮选择器
-            close_button_selectors = [
-                # 通用关闭按钮
-                "button.close",
-                ".close-button",
-                ".close-btn",
-                "[class*='close']",
-                "[class*='Close']",
-                # X 图标
-                "span.close",
-                "i.close",
-                "div.close",
-                # 通过文本查找
-                "//button[contains(text(), '关闭')]",
-                "//button[contains(text(), '取消')]",
-                "//span[contains(text(), '×')]",
-                "//span[contains(text(), 'X')]",
-                "//div[contains(@class, 'close')]",
-                "//i[contains(@class, 'close')]",
-                # 阿里系验证码特定的关闭按钮
-                ".nc_close",
-                "#nc_close",
-                "[id*='close']",
-                # 弹窗遮罩层（点击遮罩层也可能关闭）
-                ".modal-mask",
-                ".overlay",
-                "[class*='mask']",
-            ]
-            
-            for selector in close_button_selectors:
+            # 可见性、可用状态、类名、ID和文本在页面内一次读取，不再逐个元素往返
+            try:
+                candidates = self.browser.execute_pinned_script(_VISIBLE_CANDIDATES_JS, _CLOSE_BUTTON_SELECTORS)
+            except Exception as e:
+                logger.debug("收集关闭按钮候选元素失败: %s", e)
+                candidates = []
+
+            for candidate in candidates:
+                selector = candidate["selector"]
+                logger.debug(
+                    "找到可能的关闭按钮: %s, class=%s, id=%s, text=%s",
+                    selector, candidate["cls"], candidate["id"], candidate["text"]
+                )
+
+                # 尝试点击关闭按钮
                 try:
-                    if selector.startswith("//"):
-                        elements = self.browser.find_elements(selector, by="xpath")
+                    candidate["element"].click()
+                    logger.info(f"✓ 点击关闭按钮: {selector}")
+                    # 容器在当前frame中消失后立即复查，代替固定等待
+                    self._wait_frame_state(lambda state: not state["captchaPresent"], timeout=0.5)
+
+                    # 检查验证码是否消失
+                    self.browser.driver.switch_to.default_content()
+                    if not self.detect_slider_captcha(check_iframes=True):
+                        logger.info("✓ 验证码弹窗已关闭")
+                        return True
                     else:
-                        elements = self.browser.find_elements(selector)
-                    
-                    for elem in elements:
-                        try:
-                            if elem.is_displayed() and elem.is_enabled():
-                                # 检查元素是否在验证码窗口附近
-                                elem_class = elem.get_attribute('class') or ''
-                                elem_id = elem.get_attribute('id') or ''
-                                elem_text = elem.text or ''
-                                
-                                logger.debug(f"找到可能的关闭按钮: {selector}, class={elem_class}, id={elem_id}, text={elem_text}")
-                                
-                                # 尝试点击关闭按钮
-                                try:
-                                    elem.click()
-                                    logger.info(f"✓ 点击关闭按钮: {selector}")
-                                    time.sleep(0.5)
-                                    
-                                    # 检查验证码是否消失
-                                    self.browser.driver.switch_to.default_content()
-                                    if not self.detect_slider_captcha(check_iframes=True):
-                                        logger.info("✓ 验证码弹窗已关闭")
-                                        return True
-                                    else:
-                                        logger.debug("点击后验证码仍然存在，继续尝试其他按钮")
-                                        # 重新切换到验证码iframe
-                                        self._switch_to_captcha_iframe()
-                                except Exception as e:
-                                    logger.debug(f"点击关闭按钮失败: {str(e)}")
-                                    continue
-                        except Exception:
-                            continue
+                        logger.debug("点击后验证码仍然存在，继续尝试其他按钮")
+                        # 重新切换到验证码iframe
+                        self._switch_to_captcha_iframe()
                 except Exception as e:
-                    logger.debug(f"选择器 {selector} 查找失败: {str(e)}")
+                    logger.debug(f"点击关闭按钮失败: {str(e)}")
                     continue
             
             # 尝试使用JavaScript直接隐藏验证码容器
             logger.debug("尝试使用JavaScript隐藏验证码容器...")
             try:
-                # 查找验证码容器
-                container_selectors = [
-                    ".nc_wrapper",
-                    ".nc-container",
-                    "[class*='captcha']",
-                    "[id*='nc_']",
-                ]
-                
-                for selector in container_selectors:
+                # 查找验证码容器，全部候选选择器一次查找
+                for elem in self.browser.find_elements(_CAPTCHA_CONTAINER_SELECTOR):
                     try:
-                        elements = self.browser.find_elements(selector)
-                        for elem in elements:
-                            if elem.is_displayed():
-                                # 尝试隐藏容器
-                                self.browser.driver.execute_script(
-                                    "arguments[0].style.display = 'none';",
-                                    elem
-                                )
-                                logger.debug(f"隐藏验证码容器: {selector}")
-                                
-                                # 检查是否成功
-                                time.sleep(0.5)
-                                self.browser.driver.switch_to.default_content()
-                                if not self.detect_slider_captcha(check_iframes=True):
-                                    logger.info("✓ 成功隐藏验证码容器")
-                                    return True
-                                # 重新切换到验证码iframe
-                                self._switch_to_captcha_iframe()
+                        if elem.is_displayed():
+                            # 尝试隐藏容器
+                            self.browser.driver.execute_script(
+                                "arguments[0].style.display = 'none';",
+                                elem
+                            )
+                            logger.debug("隐藏验证码容器")
+                            
+                            # 检查是否成功（隐藏是同步生效的，状态观察器在下一次读取前已更新）
+                            self._wait_frame_state(lambda state: not state["captchaPresent"], timeout=0.5)
+                            self.browser.driver.switch_to.default_content()
+                            if not self.detect_slider_captcha(check_iframes=True):
+                                logger.info("✓ 成功隐藏验证码容器")
+                                return True
+                            # 重新切换到验证码iframe
+                            self._switch_to_captcha_iframe()
                     except Exception:
                         continue
             except Exception as e:
@@ -692,27 +918,18 @@ class CaptchaHandler:
         只保留最上层的一个验证码窗口进行处理。
         """
         try:
-            # 查找所有验证码容器
+            # 查找所有验证码容器，合并的选择器一次返回全部匹配且不会重复
             captcha_containers = []
-            container_selectors = [
-                ".nc_wrapper",
-                ".nc-container",
-                "[class*='captcha']",
-                "[id*='nc_']",
-            ]
-
-            for selector in container_selectors:
+            for elem in self.browser.find_elements(_CAPTCHA_CONTAINER_SELECTOR):
                 try:
-                    elements = self.browser.find_elements(selector)
-                    for elem in elements:
-                        if elem.is_displayed():
-                            captcha_containers.append(elem)
+                    if elem.is_displayed():
+                        captcha_containers.append(elem)
                 except Exception:
                     continue
 
             # 如果只有一个或没有验证码窗口，不需要处理
             if len(captcha_containers) <= 1:
-                logger.debug(f"验证码窗口数量正常: {len(captcha_containers)}")
+                logger.debug("验证码窗口数量正常: %s", len(captcha_containers))
                 return
 
             logger.warning(f"检测到 {len(captcha_containers)} 个验证码窗口，尝试关闭多余窗口...")
@@ -740,7 +957,7 @@ class CaptchaHandler:
             for idx, (container, z_index) in enumerate(containers_with_zindex):
                 if idx == 0:
                     # 保留第一个（最上层）
-                    logger.debug(f"保留最上层验证码窗口 (z-index: {z_index})")
+                    logger.debug("保留最上层验证码窗口 (z-index: %s)", z_index)
                     continue
 
                 try:
@@ -749,9 +966,9 @@ class CaptchaHandler:
                         "arguments[0].style.display = 'none';",
                         container
                     )
-                    logger.debug(f"隐藏多余验证码窗口 {idx} (z-index: {z_index})")
+                    logger.debug("隐藏多余验证码窗口 %s (z-index: %s)", idx, z_index)
                 except Exception as e:
-                    logger.debug(f"隐藏验证码窗口失败: {str(e)}")
+                    logger.debug("隐藏验证码窗口失败: %s", e)
 
             logger.info(f"✓ 已处理重复验证码窗口，保留1个，隐藏{len(captcha_containers) - 1}个")
 
@@ -0,0 +1,74 @@
+"""熔断器模块。
+
+提供按连续失败次数打开的熔断器，用于暂时跳过反复失败的操作对象。
+"""
+
+import threading
+import time
+
+
+class CircuitBreaker:
+    """熔断器类。
+    
+    连续失败达到阈值后打开，打开期间 allow 返回False；
+    冷却时间过后进入半开状态，只放行一次试探（同时到来的其他调用仍被拒绝），
+    试探成功则关闭，失败则重新打开。试探一直没有报告结果时，再过一个冷却时间放行下一次试探。
+    可在多个线程间共享。
+    
+    Attributes:
+        failure_threshold: 打开熔断器所需的连续失败次数
+        reset_timeout: 打开后的冷却时间（秒）
+        failure_count: 当前的连续失败次数
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60):
+        """初始化熔断器。
+        
+        Args:
+            failure_threshold: 连续失败多少次后打开，默认3次
+            reset_timeout: 打开后的冷却时间（秒），默认60秒
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_count = 0
+        # 打开（或放行上一次试探）的时间，冷却时间从这里开始计算
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """熔断器是否拒绝调用（冷却时间内，或半开状态下试探尚未报告结果）。"""
+        return (
+            self.failure_count >= self.failure_threshold
+            and time.monotonic() - self._opened_at < self.reset_timeout
+        )
+
+    def allow(self) -> bool:
+        """判断当前是否允许执行操作。
+        
+        冷却时间过后的第一次调用作为试探放行，并重新开始冷却计时，
+        试探报告结果之前的其他调用都返回False。
+        
+        Returns:
+            True表示允许执行（熔断器关闭，或本次调用是半开状态下的试探），False表示应跳过
+        """
+        with self._lock:
+            if self.failure_count < self.failure_threshold:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            self._opened_at = now
+            return True
+
+    def record_success(self) -> None:
+        """记录一次成功，关闭熔断器。"""
+        with self._lock:
+            self.failure_count = 0
+
+    def record_failure(self) -> None:
+        """记录一次失败，达到阈值时打开熔断器并重新开始冷却计时。"""
+        with self._lock:
+            self.failure_count += 1
+            if self.failure_count >= self.failure_threshold:
+                self._opened_at = time.monotonic()
@@ -3,6 +3,7 @@
 提供Cookie字符串解析功能，将浏览器Cookie字符串转换为Selenium可用的格式。
 """
 
+import logging
 from typing import List, Dict
 from src.utils.logger import get_logger
 
@@ -62,7 +63,7 @@ def parse_cookie_string(cookie_string: str, domain: str = ".1688.com") -> List[D
                 
                 # 跳过空值Cookie
                 if not value:
-                    logger.debug(f"跳过空值Cookie: {name}")
+                    logger.debug("跳过空值Cookie: %s", name)
                     continue
                 
                 # 根据Cookie名称选择合适的域名
@@ -79,7 +80,8 @@ def parse_cookie_string(cookie_string: str, domain: str = ".1688.com") -> List[D
                 }
                 
                 cookies.append(cookie)
-                logger.debug(f"解析Cookie: {name} = {value[:20]}... (domain: {cookie_domain})")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("解析Cookie: %s = %s... (domain: %s)", name, value[:20], cookie_domain)
         
         logger.info(f"成功解析 {len(cookies)} 个Cookie")
         return cookies
@@ -0,0 +1,45 @@
+"""布隆过滤器测试。"""
+
+from src.utils.bloom_filter import BloomFilter
+
+
+def test_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"message-{i}".encode() for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    assert bloom.count == 1000
+
+
+def test_false_positive_rate_near_design():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"message-{i}")
+
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    # 设计误判率为1%，留出足够余量避免偶然波动
+    assert false_positives < 300
+
+
+def test_empty_filter_contains_nothing():
+    bloom = BloomFilter(capacity=100)
+
+    assert "message" not in bloom
+    assert bloom.count == 0
+
+
+def test_rebuild_keeps_only_given_keys():
+    bloom = BloomFilter(capacity=100, error_rate=0.001)
+    old_keys = [f"old-{i}" for i in range(100)]
+    new_keys = [f"new-{i}" for i in range(50)]
+    for key in old_keys:
+        bloom.add(key)
+
+    bloom.rebuild(new_keys)
+
+    assert bloom.count == len(new_keys)
+    assert all(key in bloom for key in new_keys)
+    # 旧键不再保留；容许极少数误判
+    assert sum(key in bloom for key in old_keys) <= 5
@@ -0,0 +1,54 @@
+"""浏览器控制器测试。"""
+
+import pytest
+from selenium.common.exceptions import JavascriptException, TimeoutException
+
+from src.core.browser_controller import BrowserController
+
+
+class _FakeDriver:
+    """异步脚本按预设结果返回或抛出异常、并记录轮询次数的 WebDriver 替身。"""
+
+    def __init__(self, async_result) -> None:
+        self.async_result = async_result
+        self.find_calls = 0
+
+    def set_script_timeout(self, timeout: float) -> None:
+        pass
+
+    def execute_async_script(self, script, *args):
+        if isinstance(self.async_result, Exception):
+            raise self.async_result
+        return self.async_result
+
+    def find_element(self, by, value):
+        self.find_calls += 1
+        return object()
+
+
+def _controller(driver: _FakeDriver) -> BrowserController:
+    controller = BrowserController(headless=True)
+    controller.driver = driver
+    return controller
+
+
+@pytest.mark.parametrize("result", [True, False])
+def test_wait_for_presence_uses_in_page_result(result):
+    driver = _FakeDriver(result)
+
+    assert _controller(driver).wait_for_presence(".message", timeout=0.1) is result
+    assert driver.find_calls == 0
+
+
+def test_wait_for_presence_script_timeout_means_absent():
+    driver = _FakeDriver(TimeoutException("script timeout"))
+
+    assert _controller(driver).wait_for_presence(".message", timeout=0.1) is False
+    assert driver.find_calls == 0
+
+
+def test_wait_for_presence_falls_back_to_polling_when_script_fails():
+    driver = _FakeDriver(JavascriptException("document unloaded"))
+
+    assert _controller(driver).wait_for_presence(".message", timeout=0.1) is True
+    assert driver.find_calls == 1
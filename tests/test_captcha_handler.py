@@ -0,0 +1,60 @@
+"""验证码处理器测试。"""
+
+import pytest
+
+from src.utils.captcha_handler import CaptchaHandler
+
+# 旺旺聊天页面中始终存在的跨域iframe
+_CHAT_IFRAME_SRC = "https://def.1688.com/page/def_cbu_web_im_core/index.html"
+
+
+class _FakeBrowser:
+    """返回预设验证码标记、记录是否做了完整检测的浏览器控制器替身。"""
+
+    def __init__(self) -> None:
+        self.seen = False
+        self.unreachable: list[str] = []
+        self.full_scans = 0
+
+    def add_init_script(self, source: str) -> bool:
+        return True
+
+    def cdp_extract(self, script, *args, **kwargs):
+        return [self.seen, list(self.unreachable)]
+
+    def find_first_visible(self, selectors):
+        self.full_scans += 1
+        return selectors[0]
+
+
+@pytest.fixture
+def browser() -> _FakeBrowser:
+    return _FakeBrowser()
+
+
+@pytest.fixture
+def handler(browser) -> CaptchaHandler:
+    handler = CaptchaHandler(browser)
+    assert handler.install_captcha_observer()
+    return handler
+
+
+def test_unrelated_cross_origin_iframe_keeps_fast_path(browser, handler):
+    browser.unreachable = [_CHAT_IFRAME_SRC]
+
+    assert handler.detect_slider_captcha() is False
+    assert browser.full_scans == 0
+
+
+def test_cross_origin_captcha_iframe_triggers_full_detection(browser, handler):
+    browser.unreachable = [_CHAT_IFRAME_SRC, "https://captcha.1688.com/punish?x5secdata=1"]
+
+    assert handler.detect_slider_captcha() is True
+    assert browser.full_scans == 1
+
+
+def test_observer_flag_triggers_full_detection(browser, handler):
+    browser.seen = True
+
+    assert handler.detect_slider_captcha() is True
+    assert browser.full_scans == 1
@@ -0,0 +1,107 @@
+"""熔断器测试。"""
+
+import pytest
+
+from src.utils import circuit_breaker
+from src.utils.circuit_breaker import CircuitBreaker
+
+
+class _FakeClock:
+    """可手动推进的单调时钟。"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> _FakeClock:
+    fake = _FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", fake.monotonic)
+    return fake
+
+
+def test_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.is_open
+
+    breaker.record_failure()
+    assert not breaker.allow()
+    assert breaker.is_open
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow()
+    assert breaker.failure_count == 1
+
+
+def test_allows_trial_after_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+
+    clock.now += 59
+    assert not breaker.allow()
+
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_with_new_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+
+    clock.now += 60
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.now += 59
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_successful_trial_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+
+    clock.now += 60
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.failure_count == 0
+
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_half_open_allows_a_single_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+
+    clock.now += 60
+    assert breaker.allow()
+    assert not breaker.allow()
+    assert not breaker.allow()
+
+
+def test_unreported_trial_is_retried_after_another_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow()
+
+    clock.now += 59
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
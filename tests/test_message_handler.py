@@ -0,0 +1,240 @@
+"""消息处理器测试。"""
+
+import pytest
+
+from src.core import message_handler
+from src.core.message_handler import MessageHandler
+from src.utils.exceptions import MessageException
+
+
+class _FakeBrowser:
+    """只实现轮询新消息所需接口的浏览器控制器替身。"""
+
+    supports_cdp = True
+
+    def __init__(self) -> None:
+        self.snapshots: list[dict] = []
+
+    def cdp_extract(self, script, *args, **kwargs):
+        # 每次都当作消息列表发生了变化，返回全部快照
+        return ".message-item", list(self.snapshots), None, None
+
+
+def _make_snapshot(
+    text: str,
+    message_id: str | None = None,
+    time_text: str | None = None,
+    cls: str = "message-item",
+) -> dict:
+    """构造 _COLLECT_MESSAGE_SNAPSHOTS_JS 返回的单条消息快照。"""
+    return {
+        "id": message_id,
+        "domId": "",
+        "cls": cls,
+        "text": text,
+        "hasImg": False,
+        "content": text,
+        "sender": "客户",
+        "senderUserId": "customer",
+        "time": time_text,
+    }
+
+
+@pytest.fixture
+def browser() -> _FakeBrowser:
+    return _FakeBrowser()
+
+
+@pytest.fixture
+def handler(browser) -> MessageHandler:
+    return MessageHandler(browser)
+
+
+def test_identical_texts_without_id_at_different_times_are_both_new(browser, handler):
+    browser.snapshots = [
+        _make_snapshot("在吗", time_text="10:00"),
+        _make_snapshot("在吗", time_text="10:05"),
+    ]
+
+    messages = handler.check_new_messages()
+
+    assert [message.content for message in messages] == ["在吗", "在吗"]
+    assert messages[0].message_id != messages[1].message_id
+
+
+def test_repeated_text_without_id_is_reported_when_it_arrives_later(browser, handler):
+    browser.snapshots = [_make_snapshot("好的", time_text="10:00")]
+    assert len(handler.check_new_messages()) == 1
+
+    browser.snapshots.append(_make_snapshot("好的", time_text="10:07"))
+    messages = handler.check_new_messages()
+
+    assert [message.content for message in messages] == ["好的"]
+
+
+def test_seen_messages_are_not_reported_again(browser, handler):
+    browser.snapshots = [
+        _make_snapshot("你好", message_id="m1"),
+        _make_snapshot("在吗", time_text="10:00"),
+    ]
+    assert len(handler.check_new_messages()) == 2
+
+    assert handler.check_new_messages() == []
+
+
+def test_messages_with_id_skip_parsing_once_seen(browser, handler, monkeypatch):
+    browser.snapshots = [_make_snapshot("你好", message_id="m1")]
+    handler.check_new_messages()
+
+    def fail_parse(snapshot):
+        raise AssertionError("已见过的消息不应再次解析")
+
+    monkeypatch.setattr(handler, "_parse_snapshot", fail_parse)
+    assert handler.check_new_messages() == []
+
+
+class _FakeClock:
+    """可手动推进的单调时钟。"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> _FakeClock:
+    fake = _FakeClock()
+    monkeypatch.setattr(message_handler.time, "monotonic", fake.monotonic)
+    return fake
+
+
+def test_send_dedup_is_off_by_default(handler):
+    assert handler._make_send_key("c", "你好") is None
+
+
+def test_send_dedup_window_slides_from_last_send(browser, clock):
+    handler = MessageHandler(browser, send_dedup_window=60)
+    key = handler._make_send_key("c", "你好")
+    handler._remember_send(key)
+
+    clock.now += 59
+    assert handler._sent_recently(key)
+    assert not handler._sent_recently(handler._make_send_key("c", "在吗"))
+    assert not handler._sent_recently(handler._make_send_key("d", "你好"))
+
+    clock.now += 1
+    assert not handler._sent_recently(key)
+
+
+def test_duplicate_send_within_window_is_skipped(browser, clock, caplog):
+    handler = MessageHandler(browser, send_dedup_window=60)
+    handler._remember_send(handler._make_send_key("c", "你好"))
+    clock.now += 1
+
+    # 替身浏览器不支持发送，真正发送会抛出异常
+    assert handler.send_message("c", "你好")
+    assert "跳过本次发送" in caplog.text
+
+
+def test_send_dedup_drops_expired_records(browser, clock):
+    handler = MessageHandler(browser, send_dedup_window=60)
+    handler._remember_send(handler._make_send_key("c", "1"))
+    clock.now += 30
+    handler._remember_send(handler._make_send_key("c", "2"))
+    clock.now += 31
+    handler._remember_send(handler._make_send_key("c", "3"))
+
+    assert len(handler._recent_sends) == 2
+
+
+def test_processed_ids_are_bounded_and_bloom_is_rebuilt(browser, monkeypatch):
+    monkeypatch.setattr(message_handler, "_PROCESSED_IDS_MAXLEN", 10)
+    handler = MessageHandler(browser)
+    bloom = handler._processed_bloom
+
+    assert all(handler._remember_processed(f"m{i}") for i in range(25))
+
+    assert len(handler.processed_message_ids) == 10
+    # 超出容量后按精确集合重建，计数不再超过设计容量
+    assert bloom.count <= bloom.capacity
+    assert not any(handler._remember_processed(f"m{i}") for i in range(15, 25))
+    # 已被淘汰的ID重新出现时按新消息处理
+    assert handler._remember_processed("m0")
+
+
+def test_processed_id_lru_keeps_recently_seen_ids(browser, monkeypatch):
+    monkeypatch.setattr(message_handler, "_PROCESSED_IDS_MAXLEN", 3)
+    handler = MessageHandler(browser)
+    for message_id in ("a", "b", "c"):
+        handler._remember_processed(message_id)
+
+    # 再次出现的ID移到最近位置，淘汰的是最久未出现的 b
+    assert not handler._remember_processed("a")
+    handler._remember_processed("d")
+
+    assert not handler._remember_processed("a")
+    assert handler._remember_processed("b")
+
+
+@pytest.fixture
+def failing_handler(handler, monkeypatch) -> MessageHandler:
+    """每次发送都因聊天页面不可用而失败的消息处理器。"""
+
+    def enter_chat_iframe(timeout=5):
+        raise MessageException("聊天页面不可用")
+
+    monkeypatch.setattr(handler, "_enter_chat_iframe", enter_chat_iframe)
+    monkeypatch.setattr(handler, "_switch_frame", lambda frame: None)
+    return handler
+
+
+def _failed_send(handler: MessageHandler, contact_id: str) -> str:
+    """发送一条必然失败的消息，返回异常信息。"""
+    with pytest.raises(MessageException) as excinfo:
+        handler.send_message(contact_id, "你好", retry_times=0)
+    return str(excinfo.value)
+
+
+def test_send_breakers_are_bounded_per_contact(failing_handler, monkeypatch):
+    handler = failing_handler
+    monkeypatch.setattr(message_handler, "_SEND_BREAKERS_MAXLEN", 2)
+
+    for contact_id in ("a", "b", "a", "c"):
+        _failed_send(handler, contact_id)
+
+    # 最久未发送的 b 被淘汰，a 因再次发送移到最近位置
+    assert list(handler._send_breakers) == ["a", "c"]
+    assert handler._send_breakers["a"].failure_count == 2
+
+
+def test_send_breaker_opens_after_repeated_failures(failing_handler):
+    handler = failing_handler
+    for _ in range(message_handler._SEND_FAILURE_THRESHOLD):
+        assert "暂停发送" not in _failed_send(handler, "a")
+
+    assert "暂停发送" in _failed_send(handler, "a")
+    assert "暂停发送" not in _failed_send(handler, "b")
+
+
+@pytest.mark.parametrize(
+    ("element_class", "expected"),
+    [
+        ("message-item msg-self", True),
+        ("message-item Item_Sent", True),
+        ("message-item right", True),
+        ("message-item msg-right", True),
+        ("chat-message me", True),
+        ("message-item msg-received", False),
+        ("message-item left", False),
+        ("message-item message_left", False),
+        # 布局类名中的方向词不代表消息方向
+        ("message-item toolbar-left-panel", None),
+        ("message-item float-right", None),
+        ("message-item owner another", None),
+        ("message-item", None),
+    ],
+)
+def test_chat_direction_from_class_name(element_class, expected):
+    assert MessageHandler._chat_direction(element_class) is expected
@@ -0,0 +1,165 @@
+"""消息处理器池测试。"""
+
+import threading
+
+import pytest
+from selenium.common.exceptions import InvalidSessionIdException, TimeoutException
+
+from src.core.message_handler_pool import MessageHandlerPool
+from src.utils.exceptions import MessageException
+
+# 等待后台线程的最长时间（秒），只在被测代码出错时才会用满
+_JOIN_TIMEOUT = 5
+
+
+class _FakeBrowser:
+    """记录是否被关闭的浏览器控制器替身。"""
+
+    def __init__(self) -> None:
+        self.stopped = False
+
+    def stop(self) -> None:
+        self.stopped = True
+
+
+class _FakeHandler:
+    """按预设的异常失败、否则成功的消息处理器替身。"""
+
+    def __init__(self) -> None:
+        self.browser = _FakeBrowser()
+        self.error = None
+
+    def _run(self, result):
+        if self.error is not None:
+            raise self.error
+        return result
+
+    def send_message(self, contact_id, content, retry_times=2, retry_delay=1):
+        return self._run(True)
+
+    def get_chat_messages(self, contact_id, max_messages=100):
+        return self._run([])
+
+
+def _wrapped(cause: Exception) -> MessageException:
+    """像 MessageHandler 一样把底层异常包装为 MessageException。"""
+    try:
+        raise MessageException(f"发送消息失败: {cause}") from cause
+    except MessageException as e:
+        return e
+
+
+class _Factory:
+    """记录已创建处理器的工厂函数。"""
+
+    def __init__(self) -> None:
+        self.created: list[_FakeHandler] = []
+
+    def __call__(self) -> _FakeHandler:
+        handler = _FakeHandler()
+        self.created.append(handler)
+        return handler
+
+
+@pytest.fixture
+def factory() -> _Factory:
+    return _Factory()
+
+
+def test_dead_session_handler_is_discarded_and_replaced(factory):
+    pool = MessageHandlerPool(factory, size=1)
+    assert pool.send("c", "你好")
+    dead = factory.created[0]
+    dead.error = _wrapped(InvalidSessionIdException("invalid session id"))
+
+    assert pool.send("c", "你好") is False
+    assert dead.browser.stopped
+    assert pool.handlers == []
+
+    assert pool.send("c", "你好")
+    assert len(factory.created) == 2
+    assert pool.handlers == [factory.created[1]]
+
+
+def test_dead_session_is_detected_when_reading_messages(factory):
+    pool = MessageHandlerPool(factory, size=1)
+    pool.send("c", "你好")
+    factory.created[0].error = _wrapped(_wrapped(ConnectionRefusedError()))
+
+    assert pool.get_chat_messages("c") == []
+    assert factory.created[0].browser.stopped
+    assert pool.handlers == []
+
+
+@pytest.mark.parametrize(
+    "error",
+    [MessageException("联系人不存在"), _wrapped(TimeoutException("等待超时"))],
+)
+def test_other_errors_keep_the_handler(factory, error):
+    pool = MessageHandlerPool(factory, size=1)
+    pool.send("c", "你好")
+    factory.created[0].error = error
+
+    assert pool.send("c", "你好") is False
+    assert not factory.created[0].browser.stopped
+
+    factory.created[0].error = None
+    assert pool.send("c", "你好")
+    assert len(factory.created) == 1
+
+
+def test_concurrent_creation_respects_size():
+    release = threading.Event()
+    created = []
+    lock = threading.Lock()
+
+    def slow_factory():
+        # 全部线程都进入工厂函数前不返回，检查占位能否阻止超额创建
+        release.wait(_JOIN_TIMEOUT)
+        handler = _FakeHandler()
+        with lock:
+            created.append(handler)
+        return handler
+
+    pool = MessageHandlerPool(slow_factory, size=2)
+    threads = [threading.Thread(target=pool.send, args=("c", "你好"), daemon=True) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(_JOIN_TIMEOUT)
+
+    assert len(created) == 2
+    assert len(pool.handlers) == 2
+
+
+def test_factory_failure_frees_the_slot():
+    attempts = []
+
+    def flaky_factory():
+        attempts.append(None)
+        if len(attempts) == 1:
+            raise RuntimeError("浏览器启动失败")
+        return _FakeHandler()
+
+    pool = MessageHandlerPool(flaky_factory, size=1)
+
+    assert pool.send("c", "你好") is False
+    assert pool.send("c", "你好")
+    assert len(pool.handlers) == 1
+
+
+def test_close_stops_all_handlers(factory):
+    pool = MessageHandlerPool(factory, size=2)
+    pool.send_many([("a", "1"), ("b", "2")])
+
+    pool.close()
+
+    assert factory.created
+    assert all(handler.browser.stopped for handler in factory.created)
+    assert pool.handlers == []
+
+
+def test_size_must_be_positive(factory):
+    with pytest.raises(ValueError):
+        MessageHandlerPool(factory, size=0)
@@ -0,0 +1,179 @@
+"""消息路由器测试。"""
+
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from src.core.message_router import MessageRouter
+from src.models.message import Message
+
+# 等待后台线程的最长时间（秒），只在被测代码出错时才会用满
+_JOIN_TIMEOUT = 5
+
+
+def _make_message(message_id: str) -> Message:
+    """构造一条测试用的接收消息。"""
+    return Message(
+        message_id=message_id,
+        contact_id="contact",
+        contact_name="联系人",
+        content="你好",
+        message_type="text",
+        timestamp=datetime.now(),
+        is_sent=False,
+    )
+
+
+def _run_in_thread(target, *args, **kwargs):
+    """在后台线程中执行函数，返回 (线程, 结果列表)。"""
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(target(*args, **kwargs)), daemon=True
+    )
+    thread.start()
+    return thread, results
+
+
+@pytest.fixture
+def router() -> MessageRouter:
+    """容量为2、已注册账号 a 的路由器。"""
+    router = MessageRouter(max_queue_size=2)
+    router.register_account("a")
+    return router
+
+
+def test_send_and_get_task_in_order(router):
+    assert router.send_message("a", "c1", "第一条")
+    assert router.send_message("a", "c2", "第二条")
+
+    assert router.get_send_task("a", timeout=0).content == "第一条"
+    assert router.get_send_task("a", timeout=0).content == "第二条"
+
+
+def test_unregistered_account(router):
+    assert router.send_message("b", "c", "内容") is False
+    assert router.get_send_task("b", timeout=0) is None
+
+
+def test_send_times_out_when_full(router):
+    router.send_message("a", "c", "1")
+    router.send_message("a", "c", "2")
+
+    start = time.monotonic()
+    assert router.send_message("a", "c", "3", timeout=0.1) is False
+    assert time.monotonic() - start >= 0.1
+    assert router.get_queue_status()["send_queues"]["a"]["size"] == 2
+
+
+def test_get_task_times_out_when_empty(router):
+    start = time.monotonic()
+    assert router.get_send_task("a", timeout=0.1) is None
+    assert time.monotonic() - start >= 0.1
+
+
+def test_blocked_producer_wakes_when_task_taken(router):
+    router.send_message("a", "c", "1")
+    router.send_message("a", "c", "2")
+
+    thread, results = _run_in_thread(router.send_message, "a", "c", "3")
+    time.sleep(0.05)
+    assert thread.is_alive()
+
+    assert router.get_send_task("a", timeout=0).content == "1"
+    thread.join(_JOIN_TIMEOUT)
+    assert results == [True]
+    assert [router.get_send_task("a", timeout=0).content for _ in range(2)] == [
+        "2",
+        "3",
+    ]
+
+
+def test_blocked_consumer_wakes_when_task_sent(router):
+    thread, results = _run_in_thread(router.get_send_task, "a", timeout=None)
+    time.sleep(0.05)
+    assert thread.is_alive()
+
+    router.send_message("a", "c", "内容")
+    thread.join(_JOIN_TIMEOUT)
+    assert results[0].content == "内容"
+
+
+def test_unregister_wakes_blocked_producer(router):
+    router.send_message("a", "c", "1")
+    router.send_message("a", "c", "2")
+
+    thread, results = _run_in_thread(router.send_message, "a", "c", "3")
+    time.sleep(0.05)
+    router.unregister_account("a")
+    thread.join(_JOIN_TIMEOUT)
+
+    assert results == [False]
+    assert "a" not in router.get_queue_status()["send_queues"]
+
+
+def test_unregister_wakes_blocked_consumer(router):
+    thread, results = _run_in_thread(router.get_send_task, "a", timeout=None)
+    time.sleep(0.05)
+    router.unregister_account("a")
+    thread.join(_JOIN_TIMEOUT)
+
+    assert results == [None]
+
+
+def test_clear_all_queues_wakes_blocked_producer(router):
+    router.send_message("a", "c", "1")
+    router.send_message("a", "c", "2")
+
+    thread, results = _run_in_thread(router.send_message, "a", "c", "3")
+    time.sleep(0.05)
+    router.clear_all_queues()
+    thread.join(_JOIN_TIMEOUT)
+
+    assert results == [True]
+    assert router.get_send_task("a", timeout=0).content == "3"
+
+
+def test_task_ids_are_unique(router):
+    router.send_message("a", "c", "1")
+    router.send_message("a", "c", "2")
+
+    first = router.get_send_task("a", timeout=0)
+    second = router.get_send_task("a", timeout=0)
+    assert first.task_id != second.task_id
+
+
+def test_receive_fills_account_and_drops_when_full(router):
+    assert router.receive_message(_make_message("m1"), "a")
+    assert router.receive_message(_make_message("m2"), "a")
+    assert router.receive_message(_make_message("m3"), "a") is False
+
+    messages = router.get_received_messages(timeout=0)
+    assert [message.message_id for message in messages] == ["m1", "m2"]
+    assert all(message.account_id == "a" for message in messages)
+
+
+def test_get_received_messages_respects_max_count(router):
+    router.receive_message(_make_message("m1"), "a")
+    router.receive_message(_make_message("m2"), "a")
+
+    assert len(router.get_received_messages(max_count=1, timeout=0)) == 1
+    assert len(router.get_received_messages(max_count=1, timeout=0)) == 1
+    assert router.get_received_messages(timeout=0) == []
+
+
+def test_get_received_messages_waits_for_first_message(router):
+    thread, results = _run_in_thread(router.get_received_messages, timeout=None)
+    time.sleep(0.05)
+    assert thread.is_alive()
+
+    router.receive_message(_make_message("m1"), "a")
+    thread.join(_JOIN_TIMEOUT)
+    assert [message.message_id for message in results[0]] == ["m1"]
+
+
+def test_get_received_messages_times_out_when_empty(router):
+    start = time.monotonic()
+    assert router.get_received_messages(timeout=0.1) == []
+    assert time.monotonic() - start >= 0.1